@@ -0,0 +1,141 @@
+"""
+Admission control for expensive endpoints.
+
+Each guarded endpoint has a limit on concurrent requests and a bounded wait
+queue. A request that finds the queue full, or waits longer than the queue
+timeout, is shed right away with a Retry-After estimate. The estimate comes
+from the endpoint's recent service time, so a burst of slow requests cannot
+take every worker away from cheap cached hits. A token bucket per client key
+optionally caps request rates.
+"""
+
+import asyncio
+import math
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Optional
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; carries the HTTP status and Retry-After seconds."""
+
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class EndpointLimiter:
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.running = 0
+        self.waiting = 0
+        self.counters = Counter()
+        # Moving average of how long an admitted request holds its slot
+        self.avg_service_seconds = None
+
+    def retry_after(self) -> int:
+        """Seconds until the requests ahead are likely done."""
+        service = self.avg_service_seconds or 1.0
+        return max(1, math.ceil(service * (self.waiting + 1) / self.max_concurrent))
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns the admission time to pass to release()."""
+        if self.semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self.counters['shed_queue_full'] += 1
+                raise AdmissionRejected(503, self.retry_after(), f"{self.name} is at capacity")
+            self.waiting += 1
+            self.counters['queued'] += 1
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.counters['shed_timeout'] += 1
+                raise AdmissionRejected(503, self.retry_after(), f"{self.name} queue wait timed out")
+            finally:
+                self.waiting -= 1
+        else:
+            await self.semaphore.acquire()
+
+        self.running += 1
+        self.counters['admitted'] += 1
+        return time.perf_counter()
+
+    def release(self, admitted_at: float):
+        elapsed = time.perf_counter() - admitted_at
+        self.avg_service_seconds = (elapsed if self.avg_service_seconds is None
+                                    else 0.8 * self.avg_service_seconds + 0.2 * elapsed)
+        self.running -= 1
+        self.semaphore.release()
+
+    def get_stats(self) -> Dict:
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'running': self.running,
+            'waiting': self.waiting,
+            'admitted': self.counters['admitted'],
+            'queued': self.counters['queued'],
+            'shed_queue_full': self.counters['shed_queue_full'],
+            'shed_timeout': self.counters['shed_timeout'],
+            'avg_service_ms': round(self.avg_service_seconds * 1000, 3) if self.avg_service_seconds is not None else None
+        }
+
+
+class TokenBucketLimiter:
+    """Requests per second with bursts, per client key; the least recently seen keys are forgotten first."""
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.counters = Counter()
+
+    def take(self, key: str) -> float:
+        """Spend a token for the key; returns 0 if allowed, else seconds until a token is available."""
+        now = time.monotonic()
+        tokens, updated = self.buckets.pop(key, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+
+        if tokens >= 1.0:
+            tokens -= 1.0
+            wait = 0.0
+            self.counters['allowed'] += 1
+        else:
+            wait = (1.0 - tokens) / self.rate
+            self.counters['limited'] += 1
+
+        self.buckets[key] = (tokens, now)
+        if len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return wait
+
+    def get_stats(self) -> Dict:
+        return {
+            'rate_per_second': self.rate,
+            'burst': self.burst,
+            'tracked_keys': len(self.buckets),
+            'allowed': self.counters['allowed'],
+            'limited': self.counters['limited']
+        }
+
+
+class AdmissionController:
+    def __init__(self, limits: Dict[str, int], max_queue: int = 8, queue_timeout: float = 2.0):
+        self.limiters = {
+            name: EndpointLimiter(name, limit, max_queue, queue_timeout)
+            for name, limit in limits.items() if limit > 0
+        }
+
+    def limiter(self, name: str) -> Optional[EndpointLimiter]:
+        return self.limiters.get(name)
+
+    def get_stats(self) -> Dict:
+        return {name: limiter.get_stats() for name, limiter in self.limiters.items()}
@@ -0,0 +1,233 @@
+"""
+Who is busy when, from swap intervals.
+
+Swap dates are parsed once into day numbers. For the current day a bitmap
+holds one bit per user (set while they are learning or teaching), so a
+status check or a filter over candidate teachers is a bit test. Every user
+also has their intervals sorted by start, with a running maximum of the
+ends, so any other date is answered with one binary search. New swaps are
+added to today's bitmap by setting their bits, and their intervals are
+merged into the sorted lists: only the new intervals are sorted, and the
+flat arrays are copied once (linear, no re-sort of existing intervals).
+When the date rolls over, the bitmap is rebuilt from the intervals on the
+next lookup.
+"""
+
+import copy
+import logging
+import time
+from datetime import date
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_aggregates import memory_footprint
+
+logger = logging.getLogger(__name__)
+
+EMPTY_DAYS = np.empty(0, dtype=np.int64)
+
+
+def day_number(day: date) -> int:
+    """Days since 1970-01-01."""
+    return int(np.datetime64(day, 'D').astype(np.int64))
+
+
+def _parse_days(values: pd.Series) -> np.ndarray:
+    """Day numbers of a date column; unparseable dates become -1."""
+    parsed = pd.to_datetime(values, errors='coerce', format='%Y-%m-%d')
+    days = parsed.to_numpy(dtype='datetime64[D]').astype(np.int64)
+    days[parsed.isna().to_numpy()] = -1
+    return days
+
+
+def _segmented_running_max(values: np.ndarray, owners: np.ndarray) -> np.ndarray:
+    """Running max of values restarting at each owner, for entries grouped by owner."""
+    if not len(values):
+        return values
+    # Lifting each owner's values above the previous owner's keeps them apart
+    low = values.min()
+    span = int(values.max() - low) + 1
+    return np.maximum.accumulate(values - low + owners * span) - owners * span + low
+
+
+class AvailabilityIndex:
+    def __init__(self, clock: Callable[[], date] = date.today):
+        self.clock = clock
+
+        # Bit position of every user appearing in a swap
+        self.positions = {}
+
+        # One entry per swap, in swaps_df order
+        self.learners = EMPTY_DAYS
+        self.teachers = EMPTY_DAYS
+        self.starts = EMPTY_DAYS
+        self.ends = EMPTY_DAYS
+
+        # Per user (by bit position): intervals sorted by start
+        self.interval_offsets = np.zeros(1, dtype=np.int64)
+        self.interval_starts = EMPTY_DAYS
+        self.interval_max_ends = EMPTY_DAYS
+
+        self.day = None
+        self.active = np.empty(0, dtype=bool)
+        self.busy_bits = np.empty(0, dtype=np.uint8)
+        self.build_seconds = None
+        self.rollovers = 0
+
+    @classmethod
+    def from_swaps(cls, swaps_df: pd.DataFrame, clock: Callable[[], date] = date.today) -> 'AvailabilityIndex':
+        index = cls(clock)
+        start = time.perf_counter()
+        index.add_swaps(swaps_df)
+        index.build_seconds = time.perf_counter() - start
+        return index
+
+    def clone(self) -> 'AvailabilityIndex':
+        """A copy that add_swaps can extend while this one keeps serving."""
+        clone = copy.copy(self)
+        clone.positions = dict(self.positions)
+        return clone
+
+    def add_swaps(self, swaps_df: pd.DataFrame):
+        """Append swaps; today's bitmap is updated with just the new ones."""
+        day = day_number(self.clock())
+        if swaps_df is None or swaps_df.empty:
+            if self.day != day:
+                self._rebuild_day(day)
+            return
+
+        learners = swaps_df['user_id_of_learner'].to_numpy(dtype=np.int64)
+        teachers = swaps_df['user_id_of_teacher'].to_numpy(dtype=np.int64)
+        starts = _parse_days(swaps_df['starting_date_of_learning_or_teaching'])
+        ends = _parse_days(swaps_df['ending_date_of_learning_or_teaching'])
+        # Unparseable dates never make a swap active, as before
+        ends[(starts < 0) | (ends < 0)] = -2
+
+        for user_id in np.concatenate([learners, teachers]).tolist():
+            if user_id not in self.positions:
+                self.positions[user_id] = len(self.positions)
+
+        self.learners = np.concatenate([self.learners, learners])
+        self.teachers = np.concatenate([self.teachers, teachers])
+        self.starts = np.concatenate([self.starts, starts])
+        self.ends = np.concatenate([self.ends, ends])
+        self._merge_intervals(self._user_positions(np.concatenate([learners, teachers])),
+                              np.concatenate([starts, starts]), np.concatenate([ends, ends]))
+
+        if self.day != day:
+            self._rebuild_day(day)
+        else:
+            active = (starts <= day) & (day <= ends)
+            self.active = np.concatenate([self.active, active])
+            # Unpacking past the old bits zero-pads for users seen for the first time
+            busy = np.unpackbits(self.busy_bits, count=len(self.positions))
+            busy[self._user_positions(np.concatenate([learners[active], teachers[active]]))] = 1
+            self.busy_bits = np.packbits(busy)
+
+    def _user_positions(self, user_ids: np.ndarray) -> np.ndarray:
+        return np.fromiter((self.positions[user_id] for user_id in user_ids.tolist()), dtype=np.int64,
+                           count=len(user_ids))
+
+    def _merge_intervals(self, owners: np.ndarray, starts: np.ndarray, ends: np.ndarray):
+        """Insert new intervals (by owner bit position) into the per-user lists, keeping each sorted by start."""
+        order = np.lexsort((starts, owners))
+        owners, starts, ends = owners[order], starts[order], ends[order]
+
+        n_old_users = len(self.interval_offsets) - 1
+        n_users = len(self.positions)
+        old_owners = np.repeat(np.arange(n_old_users), np.diff(self.interval_offsets))
+
+        # Insertion points: after the owner's intervals starting on or before the new one
+        low = min(int(starts.min()), int(self.interval_starts.min()) if len(self.interval_starts) else 0)
+        span = max(int(starts.max()), int(self.interval_starts.max()) if len(self.interval_starts) else 0) - low + 1
+        at = np.searchsorted(old_owners * span + (self.interval_starts - low), owners * span + (starts - low),
+                             side='right')
+
+        offsets = np.zeros(n_users + 1, dtype=np.int64)
+        offsets[:n_old_users + 1] = self.interval_offsets
+        offsets[n_old_users + 1:] = self.interval_offsets[-1]
+        added = np.zeros(n_users + 1, dtype=np.int64)
+        np.cumsum(np.bincount(owners, minlength=n_users), out=added[1:])
+        self.interval_offsets = offsets + added
+        self.interval_starts = np.insert(self.interval_starts, at, starts)
+
+        # An existing entry's running max already covers the ends before it, so the
+        # segmented running max over them plus the new ends is the merged running max
+        self.interval_max_ends = _segmented_running_max(
+            np.insert(self.interval_max_ends, at, ends),
+            np.repeat(np.arange(n_users), np.diff(self.interval_offsets)))
+
+    def _rebuild_day(self, day: int):
+        if self.day is not None:
+            self.rollovers += 1
+        self.day = day
+        self.active = (self.starts <= day) & (day <= self.ends)
+        busy = np.zeros(len(self.positions), dtype=np.uint8)
+        busy[self._user_positions(np.concatenate([self.learners[self.active], self.teachers[self.active]]))] = 1
+        self.busy_bits = np.packbits(busy)
+
+    def refresh(self) -> bool:
+        """Move the bitmap to today if the date rolled over; returns whether it did."""
+        day = day_number(self.clock())
+        if day == self.day:
+            return False
+        self._rebuild_day(day)
+        return True
+
+    def is_busy(self, user_id: int, day: Optional[date] = None) -> bool:
+        """Whether the user is learning or teaching on the day (today by default)."""
+        position = self.positions.get(user_id)
+        if position is None:
+            return False
+        if day is None:
+            self.refresh()
+            return bool(self.busy_bits[position >> 3] & (0x80 >> (position & 7)))
+
+        start, end = self.interval_offsets[position], self.interval_offsets[position + 1]
+        target = day_number(day)
+        started = start + int(np.searchsorted(self.interval_starts[start:end], target, side='right'))
+        return started > start and bool(self.interval_max_ends[started - 1] >= target)
+
+    def available_mask(self, user_ids: Iterable[int]) -> np.ndarray:
+        """True for each of the users who is not busy today."""
+        self.refresh()
+        positions = np.fromiter((self.positions.get(user_id, -1) for user_id in user_ids), dtype=np.int64)
+        known = positions >= 0
+        available = np.ones(len(positions), dtype=bool)
+        bits = self.busy_bits[positions[known] >> 3] & (0x80 >> (positions[known] & 7))
+        available[known] = bits == 0
+        return available
+
+    def active_swaps(self) -> np.ndarray:
+        """Boolean mask over swaps (in load order) active today."""
+        self.refresh()
+        return self.active
+
+    def active_counts(self, role: str = 'teacher', day: Optional[date] = None) -> Dict[int, int]:
+        """Active sessions per user in the role on the day (today by default)."""
+        if day is None:
+            active = self.active_swaps()
+        else:
+            target = day_number(day)
+            active = (self.starts <= target) & (target <= self.ends)
+        users = self.teachers if role == 'teacher' else self.learners
+        ids, counts = np.unique(users[active], return_counts=True)
+        return dict(zip(ids.tolist(), counts.tolist()))
+
+    def get_stats(self) -> Dict:
+        self.refresh()
+        return {
+            'users': len(self.positions),
+            'swaps': len(self.starts),
+            'busy_today': int(np.unpackbits(self.busy_bits).sum()),
+            'active_swaps_today': int(self.active.sum()),
+            'rollovers': self.rollovers,
+            'build_seconds': round(self.build_seconds, 4) if self.build_seconds is not None else None,
+            'memory_bytes': memory_footprint(
+                learners=self.learners, teachers=self.teachers, starts=self.starts, ends=self.ends,
+                interval_offsets=self.interval_offsets, interval_starts=self.interval_starts,
+                interval_max_ends=self.interval_max_ends, active=self.active, busy_bits=self.busy_bits
+            )['total']
+        }
@@ -0,0 +1,359 @@
+"""
+Nightly batch job that precomputes recommendations for every user.
+
+Users are sharded by user-id range across a process pool; each shard is scored
+with the engines' vectorized batch methods and streamed to the output store as
+soon as it finishes. The API serves from that store while it is fresh.
+
+Usage:
+    python batch_recommendations.py --output precomputed --workers 4 --shards 16
+    python batch_recommendations.py --format parquet
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from simple_recommendation_engine import SimpleRecommendationEngine
+from faiss_engine import FAISSContentEngine
+from collab_filter import CollaborativeFilterEngine
+from serialization import dumps, loads
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+OUTPUT_EXTENSIONS = {'jsonl': 'jsonl', 'parquet': 'parquet'}
+JSON_COLUMNS = ('user_skills', 'simple', 'collaborative', 'content')
+
+# Engines built once per worker process by _init_worker
+_worker_engines = {}
+
+
+def _init_worker(users_path: str, swaps_path: str):
+    """Load data and build the engine structures the batch methods need."""
+    logging.getLogger().setLevel(logging.WARNING)
+    users_df = pd.read_csv(users_path)
+    swaps_df = pd.read_csv(swaps_path)
+
+    simple_engine = SimpleRecommendationEngine()
+    simple_engine.load_data(users_df, swaps_df)
+
+    # Similar-skills table isn't used by the batch methods
+    content_engine = FAISSContentEngine(similar_skills_k=0)
+    content_engine.load_data(users_df, swaps_df)
+
+    # Only the user-skill matrix is needed; skip the pairwise similarity dict
+    collab_engine = CollaborativeFilterEngine()
+    collab_engine.users_df = users_df.copy()
+    collab_engine.swaps_df = swaps_df.copy()
+    collab_engine._create_user_skill_matrix()
+
+    _worker_engines.update(simple=simple_engine, content=content_engine, collaborative=collab_engine)
+
+
+def _score_shard(user_ids: List[int], n_recommendations: int) -> List[Dict]:
+    """Compute all recommendation types for one shard of users."""
+    simple_engine = _worker_engines['simple']
+    users_df = simple_engine.users_df
+    shard_users = users_df[users_df['user_id'].isin(user_ids)]
+    user_skills = {uid: skills.tolist() for uid, skills in shard_users.groupby('user_id')['skills']}
+    user_skills = {uid: user_skills.get(uid, []) for uid in user_ids}
+
+    simple = simple_engine.get_batch_recommendations(user_ids, n_recommendations)
+    collaborative = _worker_engines['collaborative'].get_batch_recommendations(user_ids, n_recommendations)
+    content = _worker_engines['content'].get_batch_user_skill_recommendations(user_skills, n_recommendations)
+
+    return [
+        {
+            'user_id': int(uid),
+            'user_skills': user_skills[uid],
+            'simple': simple[uid],
+            'collaborative': collaborative[uid],
+            'content': content[uid]
+        }
+        for uid in user_ids
+    ]
+
+
+class _JsonlWriter:
+    def __init__(self, path: str):
+        self.file = open(path, 'wb')
+
+    def write(self, rows: List[Dict]):
+        for row in rows:
+            self.file.write(dumps(row, newline=True))
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter:
+    """One row per user; recommendation lists are stored as JSON strings."""
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output requires pyarrow. Install it with: pip install pyarrow")
+        self.pa = pa
+        self.schema = pa.schema([('user_id', pa.int64())] + [(name, pa.string()) for name in JSON_COLUMNS])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows: List[Dict]):
+        columns = {'user_id': [row['user_id'] for row in rows]}
+        for name in JSON_COLUMNS:
+            columns[name] = [dumps(row[name]).decode('utf-8') for row in rows]
+        self.writer.write_table(self.pa.table(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def run_batch(users_path: str = 'data/users.csv', swaps_path: str = 'data/swaps.csv',
+              output_dir: str = 'precomputed', output_format: str = 'jsonl', workers: Optional[int] = None,
+              n_shards: Optional[int] = None, n_recommendations: int = 5, data_generation: int = 1) -> Dict:
+    """
+    Precompute recommendations for all users and write them to output_dir.
+
+    data_generation is the service data load the input files correspond to;
+    the default 1 is the CSV load at service startup. The API stops serving
+    the output once its data has moved to another generation.
+
+    Each run writes its own data file and the manifest is swapped in last
+    (atomically), so the API never serves a half-written run and readers of
+    the previous manifest never see the new file under the old index.
+    """
+    if output_format not in OUTPUT_EXTENSIONS:
+        raise ValueError(f"Unknown output format: {output_format}")
+
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    n_shards = n_shards or workers * 4
+
+    user_ids = np.sort(pd.read_csv(users_path, usecols=['user_id'])['user_id'].unique())
+    shards = [shard.tolist() for shard in np.array_split(user_ids, min(n_shards, max(len(user_ids), 1))) if len(shard)]
+
+    os.makedirs(output_dir, exist_ok=True)
+    run_id = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    output_file = f"recommendations-{run_id}.{OUTPUT_EXTENSIONS[output_format]}"
+    temp_path = os.path.join(output_dir, output_file + '.tmp')
+    writer = _JsonlWriter(temp_path) if output_format == 'jsonl' else _ParquetWriter(temp_path)
+
+    logger.info(f"Scoring {len(user_ids)} users in {len(shards)} shards on {workers} workers")
+    written = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(users_path, swaps_path)) as executor:
+            futures = [executor.submit(_score_shard, shard, n_recommendations) for shard in shards]
+            for future in as_completed(futures):
+                rows = future.result()
+                writer.write(rows)
+                written += len(rows)
+    finally:
+        writer.close()
+
+    os.replace(temp_path, os.path.join(output_dir, output_file))
+    manifest = {
+        'generated_at': datetime.now().isoformat(),
+        'format': output_format,
+        'file': output_file,
+        'users': written,
+        'shards': len(shards),
+        'workers': workers,
+        'n_recommendations': n_recommendations,
+        'data_generation': data_generation,
+        'duration_seconds': round(time.perf_counter() - start, 3)
+    }
+    manifest_temp = os.path.join(output_dir, MANIFEST_FILE + '.tmp')
+    with open(manifest_temp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_temp, os.path.join(output_dir, MANIFEST_FILE))
+
+    # Drop data files from previous runs
+    for name in os.listdir(output_dir):
+        if name.startswith('recommendations-') and name != output_file and not name.endswith('.tmp'):
+            os.remove(os.path.join(output_dir, name))
+
+    logger.info(f"Wrote recommendations for {written} users in {manifest['duration_seconds']}s")
+    return manifest
+
+
+class PrecomputedRun:
+    """One loaded batch run; replaced as a whole when a new manifest appears."""
+
+    def __init__(self, manifest: Dict, path: str, offsets: Dict[int, int], rows: Dict[int, Dict], mtime: float):
+        self.manifest = manifest
+        self.path = path
+        self.offsets = offsets
+        self.rows = rows
+        self.mtime = mtime
+        self.generated_at = datetime.fromisoformat(manifest['generated_at'])
+        # Users whose rows no longer match the service's data
+        self.invalidated_users = set()
+
+
+class PrecomputedStore:
+    """
+    Read side of the batch output used by the API.
+
+    JSONL output is indexed by byte offset so only the requested line is read;
+    parquet output is loaded into memory. The store looks for a new manifest at
+    most every check_interval_seconds and swaps the new run in as one object,
+    so a reader always seeks within the file its offsets came from. Entries
+    are reported as unavailable once they are older than max_age_seconds, once
+    the service's data_generation differs from the one the run was built for,
+    or for users invalidated since the run was loaded.
+    """
+
+    def __init__(self, directory: str = 'precomputed', max_age_seconds: float = 86400,
+                 check_interval_seconds: float = 5.0):
+        self.directory = directory
+        self.max_age_seconds = max_age_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self.run = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.data_generation = 1
+
+    @property
+    def manifest(self) -> Optional[Dict]:
+        run = self.run
+        return run.manifest if run is not None else None
+
+    def _current_run(self) -> Optional[PrecomputedRun]:
+        """The loaded run, after checking for a new manifest if the check interval has passed."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return self.run
+
+        with self._lock:
+            if now < self._next_check:
+                return self.run
+            self._next_check = now + self.check_interval_seconds
+            manifest_path = os.path.join(self.directory, MANIFEST_FILE)
+            try:
+                mtime = os.stat(manifest_path).st_mtime
+            except OSError:
+                self.run = None
+                return None
+            if self.run is not None and mtime == self.run.mtime:
+                return self.run
+
+            with open(manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            data_path = os.path.join(self.directory, manifest['file'])
+
+            offsets, rows = {}, {}
+            if manifest['format'] == 'jsonl':
+                with open(data_path, 'rb') as f:
+                    offset = 0
+                    for line in f:
+                        # user_id is the first key of every row
+                        user_id = int(line[len(b'{"user_id":'):line.index(b',')])
+                        offsets[user_id] = offset
+                        offset += len(line)
+            else:
+                table = pd.read_parquet(data_path)
+                for row in table.itertuples(index=False):
+                    rows[int(row.user_id)] = {
+                        'user_id': int(row.user_id),
+                        **{name: loads(getattr(row, name)) for name in JSON_COLUMNS}
+                    }
+
+            self.run = PrecomputedRun(manifest, data_path, offsets, rows, mtime)
+            logger.info(f"Loaded precomputed recommendations for {manifest['users']} users "
+                        f"generated at {manifest['generated_at']}")
+            return self.run
+
+    def _is_fresh(self, run: Optional[PrecomputedRun]) -> bool:
+        return (run is not None
+                and (datetime.now() - run.generated_at).total_seconds() <= self.max_age_seconds
+                and run.manifest.get('data_generation', 1) == self.data_generation)
+
+    def age_seconds(self) -> Optional[float]:
+        """Seconds since the current batch run was generated, or None if there is none."""
+        run = self._current_run()
+        if run is None:
+            return None
+        return (datetime.now() - run.generated_at).total_seconds()
+
+    def is_fresh(self) -> bool:
+        return self._is_fresh(self._current_run())
+
+    def invalidate(self, user_ids: Iterable[int]):
+        """Stop serving the current run's rows for these users."""
+        run = self.run
+        if run is not None:
+            run.invalidated_users.update(int(user_id) for user_id in user_ids)
+
+    def get(self, user_id: int, n_recommendations: Optional[int] = None) -> Optional[Dict]:
+        """
+        Return the user's precomputed row ('simple', 'collaborative', 'content', ...) if fresh,
+        and if the run holds at least n_recommendations per list.
+        """
+        run = self._current_run()
+        if not self._is_fresh(run) or user_id in run.invalidated_users:
+            return None
+        if n_recommendations is not None and n_recommendations > run.manifest['n_recommendations']:
+            return None
+
+        try:
+            if run.manifest['format'] == 'jsonl':
+                offset = run.offsets.get(user_id)
+                if offset is None:
+                    return None
+                with open(run.path, 'rb') as f:
+                    f.seek(offset)
+                    return loads(f.readline())
+
+            return run.rows.get(user_id)
+        except Exception as e:
+            logger.error(f"Error reading precomputed recommendations for user {user_id}: {e}")
+            return None
+
+    def get_stats(self) -> Dict:
+        run = self._current_run()
+        age = (datetime.now() - run.generated_at).total_seconds() if run is not None else None
+        return {
+            'available': run is not None,
+            'fresh': self._is_fresh(run),
+            'data_generation': self.data_generation,
+            'invalidated_users': len(run.invalidated_users) if run is not None else 0,
+            'age_seconds': round(age, 1) if age is not None else None,
+            'max_age_seconds': self.max_age_seconds,
+            'check_interval_seconds': self.check_interval_seconds,
+            'manifest': run.manifest if run is not None else None
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute recommendations for all users")
+    parser.add_argument('--users', default='data/users.csv', help="Path to users.csv")
+    parser.add_argument('--swaps', default='data/swaps.csv', help="Path to swaps.csv")
+    parser.add_argument('--output', default='precomputed', help="Output directory")
+    parser.add_argument('--format', choices=sorted(OUTPUT_EXTENSIONS), default='jsonl')
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--shards', type=int, default=None, help="User-id range shards (default: 4 per worker)")
+    parser.add_argument('--n-recommendations', type=int, default=5)
+    parser.add_argument('--data-generation', type=int, default=1,
+                        help="Service data load the input matches (default: the CSV load at startup)")
+    args = parser.parse_args()
+
+    manifest = run_batch(args.users, args.swaps, args.output, args.format, args.workers,
+                         args.shards, args.n_recommendations, args.data_generation)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+"""
+Benchmarks for the Skill Swap recommendation engines.
+
+Run from the repository root, e.g.:
+    python benchmarks.py collaborative --users 1000 --skills 200
+    python benchmarks.py cache-hit
+    python benchmarks.py sharded --users 50000 --shards 1 2 4 8
+    python benchmarks.py precision --users 5000 --skills 1000
+    python benchmarks.py autocomplete --users 20000 --skills 5000
+    python benchmarks.py matching --users 100000 --skills 2000
+    python benchmarks.py cycles --users 40000 --skills 5000
+"""
+
+import argparse
+import logging
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from collab_filter import CollaborativeFilterEngine
+from faiss_engine import FAISSContentEngine
+from sharded_collab import ShardedCollaborativeEngine
+from seeking_index import SeekingIndex
+from skill_autocomplete import SkillAutocompleteIndex
+from swap_cycles import SwapCycleEngine
+from swap_matching import SwapMatchingEngine
+from vector_precision import PRECISION_MODES, stored_nbytes
+
+logger = logging.getLogger(__name__)
+
+
+def make_synthetic_data(n_users: int = 1000, n_skills: int = 100, skills_per_user: int = 3,
+                        swaps_per_user: float = 1.0, seed: int = 42,
+                        popularity_exponent: float = 1.0) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Generate users/swaps DataFrames in the users.csv/swaps.csv shape."""
+    rng = np.random.default_rng(seed)
+    skill_names = np.array([f"Skill {i}" for i in range(n_skills)])
+
+    # Zipf-like skill popularity so a few skills are very common (exponent 0 is uniform)
+    popularity = 1.0 / np.arange(1, n_skills + 1) ** popularity_exponent
+    popularity /= popularity.sum()
+
+    rows = []
+    for user_id in range(1, n_users + 1):
+        skills = rng.choice(n_skills, size=min(skills_per_user, n_skills), replace=False, p=popularity)
+        seeking = skill_names[rng.choice(n_skills, p=popularity)]
+        description = f"User {user_id} works with " + ", ".join(skill_names[skills])
+        for skill in skills:
+            rows.append({
+                'user_id': user_id,
+                'skills': skill_names[skill],
+                'skill_level': int(rng.integers(1, 6)),
+                'description': description,
+                'rating': round(float(rng.uniform(3.0, 5.0)), 1),
+                'feedback': f"Feedback on {skill_names[skill]}",
+                'status': 'available',
+                'skill_user_is_seeking_for': seeking
+            })
+    users_df = pd.DataFrame(rows)
+
+    n_swaps = int(n_users * swaps_per_user)
+    learners = rng.integers(1, n_users + 1, size=n_swaps)
+    teachers = rng.integers(1, n_users + 1, size=n_swaps)
+    starts = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, size=n_swaps), unit='D')
+    ends = starts + pd.to_timedelta(rng.integers(14, 120, size=n_swaps), unit='D')
+    swaps_df = pd.DataFrame({
+        'user_id_of_learner': learners,
+        'user_id_of_teacher': teachers,
+        'starting_date_of_learning_or_teaching': starts.strftime('%Y-%m-%d'),
+        'ending_date_of_learning_or_teaching': ends.strftime('%Y-%m-%d')
+    })
+    swaps_df = swaps_df[swaps_df['user_id_of_learner'] != swaps_df['user_id_of_teacher']].reset_index(drop=True)
+
+    return users_df, swaps_df
+
+
+def _measure_build(build: Callable[[], None]) -> Tuple[float, int]:
+    """Return (seconds, peak traced bytes) for a build step."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def _measure_latency(query: Callable[[int], object], user_ids: List[int]) -> Dict:
+    """Return latency percentiles in milliseconds for a per-user query."""
+    timings = []
+    for user_id in user_ids:
+        start = time.perf_counter()
+        query(user_id)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings = np.array(timings)
+    return {
+        'p50_ms': round(float(np.percentile(timings, 50)), 3),
+        'p95_ms': round(float(np.percentile(timings, 95)), 3),
+        'p99_ms': round(float(np.percentile(timings, 99)), 3)
+    }
+
+
+def bench_collaborative_modes(n_users: int = 1000, n_skills: int = 200, n_queries: int = 200,
+                              seed: int = 42) -> Dict:
+    """Compare build time, memory and query latency of user-user vs item-item mode."""
+    users_df, swaps_df = make_synthetic_data(n_users, n_skills, seed=seed)
+    engine = CollaborativeFilterEngine()
+    engine.users_df = users_df.copy()
+    engine.swaps_df = swaps_df.copy()
+    engine._create_user_skill_matrix()
+
+    user_seconds, user_bytes = _measure_build(engine._calculate_user_similarities)
+    item_seconds, item_bytes = _measure_build(engine._calculate_skill_neighbors)
+
+    rng = np.random.default_rng(seed)
+    user_ids = rng.choice(engine.user_skill_matrix.index.values, size=n_queries).tolist()
+
+    return {
+        'n_users': n_users,
+        'n_skills': n_skills,
+        'user': {
+            'build_seconds': round(user_seconds, 3),
+            'build_peak_mb': round(user_bytes / 1e6, 2),
+            **_measure_latency(lambda uid: engine.get_recommendations(uid, 5, mode='user'), user_ids)
+        },
+        'item': {
+            'build_seconds': round(item_seconds, 3),
+            'build_peak_mb': round(item_bytes / 1e6, 2),
+            'stored_mb': round((engine.skill_neighbors.nbytes + engine.skill_neighbor_scores.nbytes) / 1e6, 3),
+            **_measure_latency(lambda uid: engine.get_recommendations(uid, 5, mode='item'), user_ids)
+        }
+    }
+
+
+def bench_sharded_collaborative(n_users: int = 20000, n_skills: int = 500, shard_counts: Tuple[int, ...] = (1, 2, 4),
+                                n_queries: int = 200, seed: int = 42) -> Dict:
+    """Build time and query throughput of the sharded collaborative engine per shard count."""
+    users_df, swaps_df = make_synthetic_data(n_users, n_skills, seed=seed)
+    rng = np.random.default_rng(seed)
+    user_ids = rng.choice(users_df['user_id'].unique(), size=n_queries).tolist()
+
+    results = {'n_users': n_users, 'n_skills': n_skills}
+    for n_shards in shard_counts:
+        engine = ShardedCollaborativeEngine(n_shards)
+        try:
+            engine.load_data(users_df, swaps_df)
+            start = time.perf_counter()
+            latency = _measure_latency(lambda uid: engine.get_recommendations(uid, 5), user_ids)
+            elapsed = time.perf_counter() - start
+            stats = engine.get_stats()
+            results[f'{n_shards}_shards'] = {
+                'worker_start_seconds': stats['worker_start_seconds'],
+                'build_seconds': stats['build_seconds'],
+                'max_shard_build_seconds': max(shard['build_seconds'] for shard in stats['shards']),
+                'max_shard_mb': round(max(shard['memory_bytes'] for shard in stats['shards']) / 1e6, 2),
+                'queries_per_second': round(n_queries / elapsed, 1),
+                **latency
+            }
+        finally:
+            engine.shutdown()
+
+    return results
+
+
+def _ranking_agreement(reference: Dict[int, List[str]], candidate: Dict[int, List[str]]) -> Dict:
+    """Mean top-k overlap and share of identical rankings against the reference lists."""
+    overlaps, identical = [], []
+    for key, expected in reference.items():
+        actual = candidate.get(key, [])
+        if expected:
+            overlaps.append(len(set(expected) & set(actual)) / len(expected))
+        identical.append(expected == actual)
+    return {
+        'topk_overlap': round(float(np.mean(overlaps)), 4) if overlaps else 1.0,
+        'identical_rankings': round(float(np.mean(identical)), 4) if identical else 1.0
+    }
+
+
+def bench_precision(n_users: int = 2000, n_skills: int = 500, n_queries: int = 200, k: int = 10,
+                    seed: int = 42) -> Dict:
+    """
+    Memory, latency and ranking agreement vs float64 of each storage precision.
+
+    Covers content-engine TF-IDF vectors (user-skill recommendations) and the
+    collaborative engine's item-mode neighbor scores.
+    """
+    users_df, swaps_df = make_synthetic_data(n_users, n_skills, seed=seed)
+    rng = np.random.default_rng(seed)
+    user_ids = rng.choice(users_df['user_id'].unique(), size=n_queries, replace=False).tolist()
+    user_skills = users_df.groupby('user_id')['skills'].apply(list).to_dict()
+
+    results = {'n_users': n_users, 'n_skills': n_skills, 'k': k}
+    reference = {}
+    for precision in PRECISION_MODES:
+        content = FAISSContentEngine(precision=precision)
+        content.load_data(users_df, swaps_df)
+        collab = CollaborativeFilterEngine(precision=precision)
+        collab.users_df = users_df.copy()
+        collab.swaps_df = swaps_df.copy()
+        collab._create_user_skill_matrix()
+        collab._calculate_skill_neighbors()
+
+        content_rankings = {
+            uid: [r['skill'] for r in content.get_user_skill_recommendations(user_skills[uid], k)] for uid in user_ids
+        }
+        item_rankings = {uid: [r['skill'] for r in collab.get_recommendations(uid, k, mode='item')] for uid in user_ids}
+        if precision == 'float64':
+            reference = {'content': content_rankings, 'item': item_rankings}
+
+        results[precision] = {
+            'content_vectors_kb': round(stored_nbytes(content.skill_vectors, content.skill_vector_scales) / 1e3, 1),
+            'content_agreement': _ranking_agreement(reference['content'], content_rankings),
+            'content_latency': _measure_latency(
+                lambda uid: content.get_user_skill_recommendations(user_skills[uid], k), user_ids),
+            'neighbor_scores_kb': round(
+                stored_nbytes(collab.skill_neighbor_scores, collab.skill_neighbor_score_scales) / 1e3, 1),
+            'item_agreement': _ranking_agreement(reference['item'], item_rankings),
+            'item_latency': _measure_latency(lambda uid: collab.get_recommendations(uid, k, mode='item'), user_ids)
+        }
+
+    return results
+
+
+def bench_autocomplete(n_users: int = 20000, n_skills: int = 5000, n_queries: int = 500,
+                       seed: int = 42) -> Dict:
+    """
+    Per-keystroke latency of the autocomplete index vs a keyword search.
+
+    Queries are every prefix of randomly chosen skill names, as typed. The
+    synthetic names all start with "Skill ", the worst case for wide ranges.
+    """
+    users_df, swaps_df = make_synthetic_data(n_users, n_skills, seed=seed)
+    content = FAISSContentEngine(similar_skills_k=0)
+    content.load_data(users_df, swaps_df)
+    collab = CollaborativeFilterEngine()
+    collab.users_df = users_df
+    collab._calculate_skill_popularity()
+
+    index = SkillAutocompleteIndex()
+    build_seconds, build_peak = _measure_build(
+        lambda: index.build(content.skill_names, collab.skill_popularity_scores))
+
+    rng = np.random.default_rng(seed)
+    names = rng.choice(content.skill_names, size=n_queries)
+    prefixes = [name[:length] for name in names for length in range(1, len(name) + 1)]
+    searched = prefixes[:n_queries]
+
+    def keyword_search(i: int):
+        # Uncached, as for a prefix not typed before
+        content.result_cache.clear()
+        content.query_vector_cache.clear()
+        return content.find_skills_by_keywords([searched[i]], 10)
+
+    return {
+        'n_skills': len(content.skill_names),
+        'build_seconds': round(build_seconds, 4),
+        'build_peak_mb': round(build_peak / 1e6, 2),
+        'index': index.get_stats(),
+        'keystrokes': len(prefixes),
+        'autocomplete_latency': _measure_latency(lambda i: index.complete(prefixes[i]), range(len(prefixes))),
+        'keyword_search_latency': _measure_latency(keyword_search, range(len(searched)))
+    }
+
+
+def bench_matching(n_users: int = 100000, n_skills: int = 2000, n_new: int = 1000, capacity: int = 3,
+                   as_of: str = '2024-06-30', seed: int = 42) -> Dict:
+    """
+    Global capacity-constrained swap matching vs suggesting each learner the best teacher.
+
+    as_of falls inside the synthetic swaps' year so some teachers are busy.
+    The last n_new users arrive after the build and are matched incrementally.
+    """
+    users_df, swaps_df = make_synthetic_data(n_users, n_skills, seed=seed)
+    base_users = users_df[users_df['user_id'] <= n_users - n_new]
+    new_users = users_df[users_df['user_id'] > n_users - n_new]
+
+    matcher = SwapMatchingEngine(teacher_capacity=capacity, as_of=pd.Timestamp(as_of).date())
+    build_seconds, build_peak = _measure_build(lambda: matcher.load_data(base_users, swaps_df))
+    start = time.perf_counter()
+    matcher.add_users(new_users)
+    incremental_seconds = time.perf_counter() - start
+
+    # Naive: every learner gets the top (level, rating) teacher of the skill they seek
+    teachers = users_df[users_df['skill_level'] >= matcher.min_teacher_level]
+    best = teachers.sort_values(['skill_level', 'rating', 'user_id'], ascending=[False, False, True])
+    best = best.drop_duplicates('skills').set_index('skills')['user_id']
+    demands = users_df[['user_id', 'skill_user_is_seeking_for']].drop_duplicates()
+    naive_load = demands['skill_user_is_seeking_for'].map(best).dropna().value_counts()
+
+    stats = matcher.get_stats()
+    return {
+        'n_users': n_users,
+        'n_new_users': n_new,
+        'build_seconds': round(build_seconds, 3),
+        'build_peak_mb': round(build_peak / 1e6, 2),
+        'incremental_seconds': round(incremental_seconds, 4),
+        'coverage': stats['coverage'],
+        'teachers_used': stats['teachers_used'],
+        'max_teacher_load': stats['max_teacher_load'],
+        'naive_teachers_used': len(naive_load),
+        'naive_max_teacher_load': int(naive_load.max()),
+        'naive_over_capacity_share': round(float(naive_load[naive_load > capacity].sum() / naive_load.sum()), 4)
+    }
+
+
+def bench_cycles(n_users: int = 40000, n_skills: int = 5000, n_queries: int = 500, time_budget: float = 0.05,
+                 popularity_exponent: float = 0.3, seed: int = 42) -> Dict:
+    """
+    Per-request cycle search latency on a large teach-to graph.
+
+    A flatter skill popularity than the default keeps the graph around a
+    million edges instead of being dominated by a few hot skills.
+    """
+    users_df, _ = make_synthetic_data(n_users, n_skills, seed=seed, popularity_exponent=popularity_exponent)
+    engine = SwapCycleEngine(time_budget=time_budget)
+    build_seconds, build_peak = _measure_build(lambda: engine.build(SeekingIndex.from_users(users_df)))
+
+    rng = np.random.default_rng(seed)
+    results = {}
+    latency = _measure_latency(lambda user_id: results.__setitem__(user_id, engine.find_cycles(user_id)),
+                               rng.choice(engine.index.user_ids, size=n_queries, replace=False).tolist())
+    elapsed = np.array([result['elapsed_ms'] for result in results.values()])
+    return {
+        'n_users': n_users,
+        'graph': engine.get_stats(),
+        'build_seconds': round(build_seconds, 3),
+        'build_peak_mb': round(build_peak / 1e6, 2),
+        'latency': latency,
+        'deadline_ms': time_budget * 1000,
+        'within_deadline_share': round(float((elapsed <= time_budget * 1000).mean()), 4),
+        'with_cycles_share': round(float(np.mean([bool(r['cycles']) for r in results.values()])), 4),
+        'mean_cycles': round(float(np.mean([len(r['cycles']) for r in results.values()])), 2),
+        'truncated_share': round(float(np.mean([r['truncated'] for r in results.values()])), 4)
+    }
+
+
+def bench_cache_hit(n_requests: int = 2000, user_id: int = 1) -> Dict:
+    """
+    Cache-hit cost of /recommend/{user_id} before and after pre-serialization.
+
+    Before: validate the cached dict through RecommendationResponse, then let
+    FastAPI jsonable_encode and stdlib-json it. After: return the stored bytes.
+    Both are measured in-process through the ASGI app as well.
+    """
+    import asyncio
+    import json
+
+    import httpx
+    from fastapi.encoders import jsonable_encoder
+
+    import main
+
+    main.load_sample_data()
+    main.compute_recommendations(user_id)
+    cache_key = main.get_cache_key(user_id)
+
+    def before():
+        cached = dict(main.cache[cache_key], cache_hit=True)
+        response = main.RecommendationResponse(**cached)
+        return json.dumps(jsonable_encoder(response)).encode('utf-8')
+
+    def after():
+        return main.cache_payloads[cache_key]
+
+    def per_call_us(fn) -> float:
+        start = time.perf_counter()
+        for _ in range(n_requests):
+            fn()
+        return (time.perf_counter() - start) / n_requests * 1e6
+
+    async def http_latency() -> Dict:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            timings = []
+            for _ in range(n_requests):
+                start = time.perf_counter()
+                await client.get(f'/recommend/{user_id}')
+                timings.append((time.perf_counter() - start) * 1000)
+        timings = np.array(timings)
+        return {
+            'p50_ms': round(float(np.percentile(timings, 50)), 3),
+            'p99_ms': round(float(np.percentile(timings, 99)), 3)
+        }
+
+    return {
+        'payload_bytes': len(after()),
+        'serialize_before_us': round(per_call_us(before), 2),
+        'serialize_after_us': round(per_call_us(after), 2),
+        'http_cache_hit': asyncio.run(http_latency())
+    }
+
+
+def _print_report(title: str, result: Dict):
+    print(f"== {title} ==")
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Skill Swap recommendation engine benchmarks")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    collaborative = subparsers.add_parser('collaborative', help="user-user vs item-item collaborative filtering")
+    collaborative.add_argument('--users', type=int, default=1000)
+    collaborative.add_argument('--skills', type=int, default=200)
+    collaborative.add_argument('--queries', type=int, default=200)
+
+    sharded = subparsers.add_parser('sharded', help="sharded collaborative engine scaling by shard count")
+    sharded.add_argument('--users', type=int, default=20000)
+    sharded.add_argument('--skills', type=int, default=500)
+    sharded.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4])
+    sharded.add_argument('--queries', type=int, default=200)
+
+    precision = subparsers.add_parser('precision', help="float64 vs float32 vs int8 vector storage")
+    precision.add_argument('--users', type=int, default=2000)
+    precision.add_argument('--skills', type=int, default=500)
+    precision.add_argument('--queries', type=int, default=200)
+    precision.add_argument('--k', type=int, default=10)
+
+    autocomplete = subparsers.add_parser('autocomplete', help="skill autocomplete vs keyword search per keystroke")
+    autocomplete.add_argument('--users', type=int, default=20000)
+    autocomplete.add_argument('--skills', type=int, default=5000)
+    autocomplete.add_argument('--queries', type=int, default=500)
+
+    matching = subparsers.add_parser('matching', help="global swap matching vs independent best teacher")
+    matching.add_argument('--users', type=int, default=100000)
+    matching.add_argument('--skills', type=int, default=2000)
+    matching.add_argument('--new-users', type=int, default=1000)
+    matching.add_argument('--capacity', type=int, default=3)
+
+    cycles = subparsers.add_parser('cycles', help="swap cycle search latency on a ~1M edge graph")
+    cycles.add_argument('--users', type=int, default=40000)
+    cycles.add_argument('--skills', type=int, default=5000)
+    cycles.add_argument('--queries', type=int, default=500)
+    cycles.add_argument('--budget-ms', type=float, default=50.0)
+
+    cache_hit = subparsers.add_parser('cache-hit', help="/recommend cache-hit serialization cost")
+    cache_hit.add_argument('--requests', type=int, default=2000)
+
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.benchmark == 'collaborative':
+        _print_report("Collaborative filtering: user vs item mode",
+                      bench_collaborative_modes(args.users, args.skills, args.queries))
+    elif args.benchmark == 'sharded':
+        _print_report("Sharded collaborative engine scaling",
+                      bench_sharded_collaborative(args.users, args.skills, tuple(args.shards), args.queries))
+    elif args.benchmark == 'precision':
+        _print_report("Vector storage precision",
+                      bench_precision(args.users, args.skills, args.queries, args.k))
+    elif args.benchmark == 'autocomplete':
+        _print_report("Skill autocomplete", bench_autocomplete(args.users, args.skills, args.queries))
+    elif args.benchmark == 'matching':
+        _print_report("Global swap matching",
+                      bench_matching(args.users, args.skills, args.new_users, args.capacity))
+    elif args.benchmark == 'cycles':
+        _print_report("Swap cycle search",
+                      bench_cycles(args.users, args.skills, args.queries, args.budget_ms / 1000))
+    elif args.benchmark == 'cache-hit':
+        _print_report("/recommend cache hit", bench_cache_hit(args.requests))
+
+
+if __name__ == "__main__":
+    main()
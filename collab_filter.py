@@ -2,9 +2,13 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional
 import logging
-from sklearn.metrics.pairwise import cosine_similarity
+import time
+from scipy import sparse
 from datetime import datetime
 
+from data_aggregates import DataAggregates, memory_footprint
+from vector_precision import compute_dtype, dequantize_rows, quantize_dense, validate_precision
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -14,15 +18,40 @@ class CollaborativeFilterEngine:
     Uses user-skill interactions and ratings for recommendations.
     """
     
-    def __init__(self):
+    RECOMMENDATION_MODES = ('user', 'item')
+    
+    def __init__(self, item_neighbors_k: int = 20, swap_weight: float = 0.5, precision: str = 'float64'):
         self.users_df = None
         self.swaps_df = None
         self.user_skill_matrix = None
         self.user_similarities = None
         
+        # Item-item (skill-skill) model
+        self.item_neighbors_k = item_neighbors_k
+        self.swap_weight = swap_weight
+        self.skill_names = None
+        self.skill_avg_levels = None
+        self.skill_avg_ratings = None
+        self.skill_neighbors = None
+        self.skill_neighbor_scores = None
+        
+        # Storage precision of neighbor scores ('float64', 'float32' or 'int8' with per-row scales)
+        self.precision = validate_precision(precision)
+        self.skill_neighbor_score_scales = None
+        
+        # popularity_score of get_skill_popularity for every skill, computed once per load
+        self.skill_popularity_scores = {}
+        
+        # Kept in step with the data so get_stats is an O(1) read
+        self.aggregates = DataAggregates()
+        self.matrix_nonzero = 0
+        self.build_seconds = None
+        self.memory_bytes = {}
+        
     def load_data(self, users_df: pd.DataFrame, swaps_df: pd.DataFrame):
         """Load and prepare data for collaborative filtering."""
         logger.info("Loading data for collaborative filtering engine...")
+        start = time.perf_counter()
         
         self.users_df = users_df.copy()
         self.swaps_df = swaps_df.copy()
@@ -33,6 +62,20 @@ class CollaborativeFilterEngine:
         # Calculate user similarities
         self._calculate_user_similarities()
         
+        # Precompute skill-skill neighbors for item-based mode
+        self._calculate_skill_neighbors()
+        
+        self._calculate_skill_popularity()
+        
+        self.aggregates = DataAggregates.from_frames(self.users_df, self.swaps_df)
+        self.build_seconds = time.perf_counter() - start
+        self.memory_bytes = memory_footprint(
+            users_df=self.users_df, swaps_df=self.swaps_df, user_skill_matrix=self.user_skill_matrix,
+            user_similarities=self.user_similarities, skill_neighbors=self.skill_neighbors,
+            skill_neighbor_scores=self.skill_neighbor_scores,
+            skill_neighbor_score_scales=self.skill_neighbor_score_scales
+        )
+        
         logger.info("Collaborative filtering engine loaded successfully")
     
     def _create_user_skill_matrix(self):
@@ -50,9 +93,19 @@ class CollaborativeFilterEngine:
             values='interaction_strength', 
             fill_value=0
         )
+        self.matrix_nonzero = int(np.count_nonzero(self.user_skill_matrix.values))
         
         logger.info("User-skill matrix created")
     
+    def _calculate_skill_popularity(self):
+        """Users holding each skill times its mean rating, as get_skill_popularity reports it."""
+        if self.users_df.empty:
+            self.skill_popularity_scores = {}
+            return
+        
+        grouped = self.users_df.groupby('skills')['rating'].agg(['count', 'mean'])
+        self.skill_popularity_scores = dict(zip(grouped.index, (grouped['count'] * grouped['mean']).tolist()))
+    
     def _calculate_user_similarities(self):
         """Calculate pairwise user similarities using cosine similarity."""
         if self.user_skill_matrix is None or self.user_skill_matrix.empty:
@@ -60,9 +113,10 @@ class CollaborativeFilterEngine:
         
         try:
             # Convert to numpy array for faster computation
-            user_vectors = self.user_skill_matrix.values
+            user_vectors = self.user_skill_matrix.values.astype(compute_dtype(self.precision))
             
-            # Calculate cosine similarities
+            # Calculate cosine similarities (sklearn is imported on first load, not at startup)
+            from sklearn.metrics.pairwise import cosine_similarity
             similarities = cosine_similarity(user_vectors)
             
             # Store similarities with user IDs
@@ -81,8 +135,85 @@ class CollaborativeFilterEngine:
             logger.error(f"Error calculating user similarities: {e}")
             self.user_similarities = {}
     
-    def get_recommendations(self, user_id: int, n_recommendations: int = 5) -> List[Dict]:
-        """Get collaborative filtering recommendations for a user."""
+    def _calculate_skill_neighbors(self):
+        """
+        Precompute the top-K cosine neighbors of every skill.
+        
+        Co-occurrence comes from users holding both skills (weighted by
+        interaction strength) plus swaps, where every skill of the learner
+        co-occurs with every skill of the teacher.
+        """
+        if self.user_skill_matrix is None or self.user_skill_matrix.empty:
+            return
+        
+        try:
+            interactions = sparse.csr_matrix(self.user_skill_matrix.values, dtype=np.float64)
+            co_occurrence = (interactions.T @ interactions).tocsr()
+            
+            # Add learner/teacher skill co-occurrence from swaps
+            if self.swaps_df is not None and not self.swaps_df.empty and self.swap_weight > 0:
+                row_of_user = {uid: i for i, uid in enumerate(self.user_skill_matrix.index.values)}
+                pairs = [
+                    (row_of_user[learner], row_of_user[teacher])
+                    for learner, teacher in zip(self.swaps_df['user_id_of_learner'],
+                                                self.swaps_df['user_id_of_teacher'])
+                    if learner in row_of_user and teacher in row_of_user
+                ]
+                if pairs:
+                    learner_rows, teacher_rows = map(list, zip(*pairs))
+                    has_skill = (interactions != 0).astype(np.float64)
+                    swap_counts = has_skill[learner_rows].T @ has_skill[teacher_rows]
+                    swap_counts = swap_counts + swap_counts.T
+                    # Scale swap counts to the magnitude of the interaction strengths
+                    scale = interactions.data.mean() ** 2 if interactions.nnz else 1.0
+                    co_occurrence = co_occurrence + self.swap_weight * scale * swap_counts
+            
+            co_occurrence = co_occurrence.toarray()
+            norms = np.sqrt(np.clip(np.diag(co_occurrence), 0, None))
+            norms[norms == 0] = 1.0
+            similarities = co_occurrence / norms[:, None] / norms[None, :]
+            np.fill_diagonal(similarities, 0.0)
+            
+            # Keep only the top-K neighbors of each skill
+            k = min(self.item_neighbors_k, similarities.shape[1] - 1)
+            if k <= 0:
+                return
+            neighbors = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+            scores = np.take_along_axis(similarities, neighbors, axis=1)
+            order = np.argsort(-scores, axis=1)
+            
+            self.skill_names = np.asarray(self.user_skill_matrix.columns)
+            skill_means = self.users_df.groupby('skills')[['skill_level', 'rating']].mean().reindex(self.skill_names)
+            self.skill_avg_levels = skill_means['skill_level'].to_numpy()
+            self.skill_avg_ratings = skill_means['rating'].to_numpy()
+            self.skill_neighbors = np.take_along_axis(neighbors, order, axis=1).astype(np.int32)
+            self.skill_neighbor_scores, self.skill_neighbor_score_scales = quantize_dense(
+                np.take_along_axis(scores, order, axis=1), self.precision
+            )
+            
+            logger.info(f"Skill neighbors calculated (k={k})")
+            
+        except Exception as e:
+            logger.error(f"Error calculating skill neighbors: {e}")
+            self.skill_neighbors = None
+            self.skill_neighbor_scores = None
+            self.skill_neighbor_score_scales = None
+    
+    def get_recommendations(self, user_id: int, n_recommendations: int = 5, mode: str = 'user') -> List[Dict]:
+        """
+        Get collaborative filtering recommendations for a user.
+        
+        Args:
+            user_id: The user ID to get recommendations for
+            n_recommendations: Number of skills to return
+            mode: 'user' for user-user neighbors, 'item' for skill-skill neighbors
+        """
+        if mode not in self.RECOMMENDATION_MODES:
+            raise ValueError(f"Unknown recommendation mode: {mode}")
+        
+        if mode == 'item':
+            return self._get_item_based_recommendations(user_id, n_recommendations)
+        
         if self.user_similarities is None or user_id not in self.user_similarities:
             return []
         
@@ -91,7 +222,7 @@ class CollaborativeFilterEngine:
             similar_users = self._get_similar_users(user_id, n_similar=10)
             
             # Get skills that similar users have but target user doesn't
-            user_skills = set(self._get_user_skills(user_id))
+            user_skills = set(skill['skill'] for skill in self._get_user_skills(user_id))
             recommendations = []
             
             for similar_user_id, similarity_score in similar_users:
@@ -108,13 +239,13 @@ class CollaborativeFilterEngine:
                         if existing_rec:
                             # Update with higher similarity score
                             if similarity_score > existing_rec['similarity_score']:
-                                existing_rec['similarity_score'] = similarity_score
-                                existing_rec['recommended_by'] = similar_user_id
+                                existing_rec['similarity_score'] = float(similarity_score)
+                                existing_rec['recommended_by'] = int(similar_user_id)
                         else:
                             recommendations.append({
                                 'skill': skill_info['skill'],
-                                'similarity_score': similarity_score,
-                                'recommended_by': similar_user_id,
+                                'similarity_score': float(similarity_score),
+                                'recommended_by': int(similar_user_id),
                                 'skill_level': skill_info['level'],
                                 'skill_rating': skill_info['rating'],
                                 'recommendation_type': 'collaborative'
@@ -128,6 +259,121 @@ class CollaborativeFilterEngine:
             logger.error(f"Error getting collaborative recommendations for user {user_id}: {e}")
             return []
     
+    def get_batch_recommendations(self, user_ids: List[int], n_recommendations: int = 5,
+                                  n_similar: int = 10, min_similarity: float = 0.1) -> Dict[int, List[Dict]]:
+        """
+        User-user recommendations for many users at once.
+        
+        Similarities for the whole batch are one matrix product against the
+        normalized user-skill matrix, so this works without the pairwise
+        user_similarities dict and stays O(batch x users) in memory.
+        """
+        if self.user_skill_matrix is None or self.user_skill_matrix.empty:
+            return {uid: [] for uid in user_ids}
+        
+        all_ids = self.user_skill_matrix.index
+        values = self.user_skill_matrix.values.astype(np.float64)
+        norms = np.linalg.norm(values, axis=1)
+        norms[norms == 0] = 1.0
+        normalized = values / norms[:, None]
+        
+        skill_names = np.asarray(self.user_skill_matrix.columns)
+        levels = self.users_df.pivot_table(index='user_id', columns='skills', values='skill_level',
+                                           aggfunc='first').reindex(index=all_ids, columns=skill_names).to_numpy()
+        ratings = self.users_df.pivot_table(index='user_id', columns='skills', values='rating',
+                                            aggfunc='first').reindex(index=all_ids, columns=skill_names).to_numpy()
+        
+        known = [uid for uid in user_ids if uid in all_ids]
+        results = {uid: [] for uid in user_ids}
+        if not known:
+            return results
+        
+        rows = all_ids.get_indexer(known)
+        similarities = normalized[rows] @ normalized.T
+        similarities[np.arange(len(rows)), rows] = -np.inf
+        
+        # Top neighbors per user, most similar first
+        k = min(n_similar, len(all_ids) - 1)
+        if k <= 0:
+            return results
+        neighbors = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        neighbor_sims = np.take_along_axis(similarities, neighbors, axis=1)
+        order = np.argsort(-neighbor_sims, axis=1, kind='stable')
+        neighbors = np.take_along_axis(neighbors, order, axis=1)
+        neighbor_sims = np.take_along_axis(neighbor_sims, order, axis=1)
+        neighbor_sims[neighbor_sims < min_similarity] = 0.0
+        
+        # Score each skill by its most similar neighbor holding it
+        holds = values[neighbors] != 0
+        candidate_scores = np.where(holds, neighbor_sims[:, :, None], 0.0)
+        best_neighbor = candidate_scores.argmax(axis=1)
+        scores = candidate_scores.max(axis=1)
+        scores[values[rows] != 0] = 0.0
+        
+        for i, user_id in enumerate(known):
+            candidates = np.flatnonzero(scores[i] > 0)
+            top = candidates[np.argsort(-scores[i][candidates], kind='stable')][:n_recommendations]
+            recommendations = []
+            for skill_idx in top:
+                teacher_row = neighbors[i, best_neighbor[i, skill_idx]]
+                recommendations.append({
+                    'skill': skill_names[skill_idx],
+                    'similarity_score': float(scores[i, skill_idx]),
+                    'recommended_by': int(all_ids[teacher_row]),
+                    'skill_level': int(levels[teacher_row, skill_idx]),
+                    'skill_rating': float(ratings[teacher_row, skill_idx]),
+                    'recommendation_type': 'collaborative'
+                })
+            results[user_id] = recommendations
+        
+        return results
+    
+    def _get_item_based_recommendations(self, user_id: int, n_recommendations: int = 5) -> List[Dict]:
+        """Score skills by summing the precomputed neighbor rows of the user's skills."""
+        if self.skill_neighbors is None or user_id not in self.user_skill_matrix.index:
+            return []
+        
+        try:
+            user_row = self.user_skill_matrix.loc[user_id].values
+            owned = np.flatnonzero(user_row)
+            if owned.size == 0:
+                return []
+            
+            weights = user_row[owned] / user_row[owned].sum()
+            neighbor_scores = dequantize_rows(self.skill_neighbor_scores, self.skill_neighbor_score_scales, owned)
+            contributions = neighbor_scores * weights[:, None]
+            
+            scores = np.zeros(len(self.skill_names))
+            np.add.at(scores, self.skill_neighbors[owned].ravel(), contributions.ravel())
+            scores[owned] = 0.0
+            
+            # Remember which owned skill contributed the most to each candidate
+            best_source = {}
+            for source, neighbors, contribution in zip(owned, self.skill_neighbors[owned], contributions):
+                for neighbor, value in zip(neighbors, contribution):
+                    if value > best_source.get(neighbor, (None, 0.0))[1]:
+                        best_source[neighbor] = (source, value)
+            
+            candidates = np.flatnonzero(scores > 0)
+            top = candidates[np.argsort(-scores[candidates])][:n_recommendations]
+            
+            recommendations = []
+            for idx in top:
+                recommendations.append({
+                    'skill': self.skill_names[idx],
+                    'similarity_score': float(scores[idx]),
+                    'similar_to': self.skill_names[best_source[idx][0]],
+                    'skill_level': round(float(self.skill_avg_levels[idx]), 1),
+                    'skill_rating': round(float(self.skill_avg_ratings[idx]), 2),
+                    'recommendation_type': 'collaborative_item'
+                })
+            
+            return recommendations
+            
+        except Exception as e:
+            logger.error(f"Error getting item-based recommendations for user {user_id}: {e}")
+            return []
+    
     def _get_similar_users(self, user_id: int, n_similar: int = 10) -> List[Tuple[int, float]]:
         """Get users similar to the target user."""
         if self.user_similarities is None or user_id not in self.user_similarities:
@@ -140,7 +386,7 @@ class CollaborativeFilterEngine:
             # Sort by similarity score
             similar_users = sorted(user_similarities.items(), key=lambda x: x[1], reverse=True)
             
-            return similar_users[:n_similar]
+            return [(int(uid), float(sim)) for uid, sim in similar_users[:n_similar]]
             
         except Exception as e:
             logger.error(f"Error getting similar users for user {user_id}: {e}")
@@ -264,7 +510,7 @@ class CollaborativeFilterEngine:
         try:
             # Find similar users who have this skill
             similar_users = self._get_similar_users(user_id, n_similar=5)
-            user_skills = set(self._get_user_skills(user_id))
+            user_skills = set(skill['skill'] for skill in self._get_user_skills(user_id))
             
             explanations = []
             for similar_user_id, similarity_score in similar_users:
@@ -293,27 +539,17 @@ class CollaborativeFilterEngine:
         if self.users_df is None or self.swaps_df is None:
             return {}
         
-        total_users = self.users_df['user_id'].nunique()
-        total_skills = self.users_df['skills'].nunique()
-        total_swaps = len(self.swaps_df)
-        
-        avg_skill_level = self.users_df['skill_level'].mean()
-        avg_rating = self.users_df['rating'].mean()
-        
-        # Calculate sparsity of user-skill matrix
-        if self.user_skill_matrix is not None:
-            total_possible_interactions = self.user_skill_matrix.shape[0] * self.user_skill_matrix.shape[1]
-            actual_interactions = (self.user_skill_matrix != 0).sum().sum()
-            sparsity = 1 - (actual_interactions / total_possible_interactions)
+        # Sparsity of user-skill matrix from the nonzero count kept at build time
+        if self.user_skill_matrix is not None and self.user_skill_matrix.size:
+            sparsity = 1 - (self.matrix_nonzero / self.user_skill_matrix.size)
         else:
             sparsity = 0
         
         return {
-            'total_users': total_users,
-            'total_skills': total_skills,
-            'total_swaps': total_swaps,
-            'avg_skill_level': round(avg_skill_level, 2),
-            'avg_rating': round(avg_rating, 2),
+            **self.aggregates.summary(),
             'matrix_sparsity': round(sparsity, 3),
+            'build_seconds': round(self.build_seconds, 4) if self.build_seconds is not None else None,
+            'precision': self.precision,
+            'memory_bytes': self.memory_bytes,
             'engine_type': 'collaborative'
         } 
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""
+Running aggregates over the loaded data, so engine statistics are O(1) reads.
+
+Engines update these as rows are loaded or added instead of recomputing
+nunique/means over their DataFrames on every /stats call.
+"""
+
+from collections import Counter
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+class DataAggregates:
+    """Counts and sums over users.csv rows and swaps."""
+
+    def __init__(self):
+        self.user_rows = Counter()
+        self.skill_rows = Counter()
+        self.rows = 0
+        self.skill_level_sum = 0.0
+        self.rating_sum = 0.0
+        self.swaps = 0
+
+    @classmethod
+    def from_frames(cls, users_df: pd.DataFrame, swaps_df: pd.DataFrame) -> 'DataAggregates':
+        aggregates = cls()
+        if users_df is not None and not users_df.empty:
+            aggregates.user_rows.update(users_df['user_id'].value_counts().to_dict())
+            aggregates.skill_rows.update(users_df['skills'].value_counts().to_dict())
+            aggregates.rows = len(users_df)
+            aggregates.skill_level_sum = float(users_df['skill_level'].sum())
+            aggregates.rating_sum = float(users_df['rating'].sum())
+        aggregates.add_swaps(0 if swaps_df is None else len(swaps_df))
+        return aggregates
+
+    def add_swaps(self, count: int):
+        self.swaps += int(count)
+
+    def summary(self) -> Dict:
+        return {
+            'total_users': len(self.user_rows),
+            'total_skills': len(self.skill_rows),
+            'total_swaps': self.swaps,
+            'avg_skill_level': round(self.skill_level_sum / self.rows, 2) if self.rows else 0.0,
+            'avg_rating': round(self.rating_sum / self.rows, 2) if self.rows else 0.0
+        }
+
+
+def structure_nbytes(structure) -> int:
+    """Approximate memory held by a DataFrame, array, sparse matrix or dict of those (ints are already sizes)."""
+    if structure is None:
+        return 0
+    if isinstance(structure, (int, np.integer)):
+        return int(structure)
+    if isinstance(structure, pd.DataFrame):
+        return int(structure.memory_usage(index=True, deep=True).sum())
+    if isinstance(structure, pd.Series):
+        return int(structure.memory_usage(index=True, deep=True))
+    if isinstance(structure, np.ndarray):
+        return int(structure.nbytes)
+    if sparse.issparse(structure):
+        if not hasattr(structure, 'indptr'):
+            structure = structure.tocsr()
+        return int(structure.data.nbytes + structure.indices.nbytes + structure.indptr.nbytes)
+    if isinstance(structure, dict):
+        # Dict overhead plus a rough 100 bytes per entry for small keys/values
+        return 100 * len(structure) + sum(structure_nbytes(value) for value in structure.values())
+    return 0
+
+
+def memory_footprint(**structures) -> Dict[str, int]:
+    """Bytes per named structure, plus the total."""
+    footprint = {name: structure_nbytes(structure) for name, structure in structures.items()}
+    footprint['total'] = sum(footprint.values())
+    return footprint
@@ -0,0 +1,339 @@
+"""
+Streaming ingest of users/swaps rows from the Node backend.
+
+Accepts the /api/recommendations/data payload ({"data": {"users": [...],
+"swaps": [...]}, ...}) or NDJSON with one row per line (rows with
+user_id_of_learner are swaps, all others users). Input is fed in chunks and
+rows are decoded one at a time as soon as they are complete, then gathered
+into DataFrame batches in the users.csv/swaps.csv shape, so memory holds one
+chunk, one partial row and the frames being built, never the whole body.
+
+Usage (streams a file or stdin to a running service):
+    python data_ingest.py payload.json --url http://localhost:8000
+    python data_ingest.py changes.ndjson --format ndjson --since 2024-05-01T00:00:00Z
+    python data_ingest.py payload.json --dry-run
+"""
+
+import argparse
+import codecs
+import http.client
+import json
+import logging
+import sys
+import time
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+USER_COLUMNS = ['user_id', 'skills', 'skill_level', 'description', 'rating', 'feedback', 'status',
+                'skill_user_is_seeking_for']
+SWAP_COLUMNS = ['user_id_of_learner', 'user_id_of_teacher', 'starting_date_of_learning_or_teaching',
+                'ending_date_of_learning_or_teaching']
+TABLES = {'users': USER_COLUMNS, 'swaps': SWAP_COLUMNS}
+
+INGEST_FORMATS = ('json', 'ndjson')
+
+# The Node route sends skill levels as names when it has no number
+SKILL_LEVEL_NAMES = {'beginner': 1, 'intermediate': 3, 'advanced': 5, 'expert': 5}
+
+
+class StreamingRecordParser:
+    """
+    Push parser yielding ('users' | 'swaps', row) pairs from a JSON or NDJSON body.
+
+    For JSON, objects are descended to find the "users" and "swaps" arrays at
+    any depth; their elements are decoded one by one, other values are
+    decoded and dropped.
+    """
+
+    def __init__(self, format: str = 'json'):
+        if format not in INGEST_FORMATS:
+            raise ValueError(f"Unknown ingest format: {format}. Use one of: {', '.join(INGEST_FORMATS)}")
+        self.format = format
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        # JSON containers being parsed: ['object', last key, expecting] or ['array', table]
+        self._stack = []
+        self._done = False
+        self.line_number = 0
+
+    def feed(self, data: bytes) -> List[Tuple[str, Dict]]:
+        """Consume a chunk and return the rows it completed."""
+        self._buffer += self._text.decode(data)
+        return self._parse(final=False)
+
+    def close(self) -> List[Tuple[str, Dict]]:
+        """Finish the body; raises ValueError if it ended mid-value."""
+        self._buffer += self._text.decode(b'', final=True)
+        records = self._parse(final=True)
+        if self.format == 'json' and (self._stack or not self._done):
+            raise ValueError("Unexpected end of JSON body")
+        return records
+
+    def _parse(self, final: bool) -> List[Tuple[str, Dict]]:
+        if self.format == 'ndjson':
+            return self._parse_lines(final)
+        return self._parse_json(final)
+
+    def _parse_lines(self, final: bool) -> List[Tuple[str, Dict]]:
+        lines = self._buffer.split('\n')
+        self._buffer = '' if final else lines.pop()
+        records = []
+        for line in lines:
+            self.line_number += 1
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid NDJSON on line {self.line_number}: {e}")
+            if not isinstance(row, dict):
+                raise ValueError(f"NDJSON line {self.line_number} is not an object")
+            records.append(('swaps' if 'user_id_of_learner' in row else 'users', row))
+        return records
+
+    def _decode_value(self, pos: int, final: bool) -> Optional[Tuple[object, int]]:
+        """(value, end) of the JSON value at pos, or None if it may continue in the next chunk."""
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, pos)
+        except json.JSONDecodeError as e:
+            if final:
+                raise ValueError(f"Invalid JSON: {e}")
+            return None
+        # A number at the end of the buffer may have more digits to come
+        if end == len(self._buffer) and not final and not isinstance(value, (dict, list, str)):
+            return None
+        return value, end
+
+    def _parse_json(self, final: bool) -> List[Tuple[str, Dict]]:
+        buffer, stack, records = self._buffer, self._stack, []
+        pos, length = 0, len(self._buffer)
+
+        while True:
+            while pos < length and buffer[pos] in ' \t\r\n':
+                pos += 1
+            if pos == length:
+                break
+            char = buffer[pos]
+
+            if not stack:
+                if self._done or char != '{':
+                    raise ValueError(f"Expected a JSON object body, found {char!r}")
+                stack.append(['object', None, 'key'])
+                pos += 1
+                continue
+
+            frame = stack[-1]
+            if frame[0] == 'array':
+                if char == ']':
+                    stack.pop()
+                    pos += 1
+                elif char == ',':
+                    pos += 1
+                else:
+                    decoded = self._decode_value(pos, final)
+                    if decoded is None:
+                        break
+                    row, pos = decoded
+                    if not isinstance(row, dict):
+                        raise ValueError(f"Expected {frame[1]} rows to be objects")
+                    records.append((frame[1], row))
+                continue
+
+            # Inside an object
+            if char == '}':
+                stack.pop()
+                self._done = not stack
+                pos += 1
+            elif char == ',':
+                frame[2] = 'key'
+                pos += 1
+            elif char == ':':
+                frame[2] = 'value'
+                pos += 1
+            elif frame[2] == 'key':
+                decoded = self._decode_value(pos, final)
+                if decoded is None:
+                    break
+                frame[1], pos = decoded
+                if not isinstance(frame[1], str):
+                    raise ValueError("Expected a string key in JSON object")
+            elif char == '{':
+                frame[2] = 'done'
+                stack.append(['object', None, 'key'])
+                pos += 1
+            elif char == '[' and frame[1] in TABLES:
+                frame[2] = 'done'
+                stack.append(['array', frame[1]])
+                pos += 1
+            else:
+                decoded = self._decode_value(pos, final)
+                if decoded is None:
+                    break
+                frame[2] = 'done'
+                _, pos = decoded
+
+        self._buffer = buffer[pos:]
+        return records
+
+
+class RowCollector:
+    """Gathers parsed rows into users.csv/swaps.csv shaped DataFrames, batch_size rows at a time."""
+
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+        self._pending = {table: [] for table in TABLES}
+        self._batches = {table: [] for table in TABLES}
+        self.counts = {table: 0 for table in TABLES}
+
+    def add(self, table: str, row: Dict):
+        pending = self._pending[table]
+        pending.append(row)
+        self.counts[table] += 1
+        if len(pending) >= self.batch_size:
+            self._flush(table)
+
+    def extend(self, records: List[Tuple[str, Dict]]):
+        for table, row in records:
+            self.add(table, row)
+
+    def _flush(self, table: str):
+        pending = self._pending[table]
+        if pending:
+            self._batches[table].append(pd.DataFrame.from_records(pending, columns=TABLES[table]))
+            self._pending[table] = []
+
+    def frames(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """(users_df, swaps_df) with the CSV column types."""
+        for table in TABLES:
+            self._flush(table)
+        users_df = _concat(self._batches['users'], USER_COLUMNS)
+        swaps_df = _concat(self._batches['swaps'], SWAP_COLUMNS)
+        return normalize_users(users_df), normalize_swaps(swaps_df)
+
+
+def _concat(batches: List[pd.DataFrame], columns: List[str]) -> pd.DataFrame:
+    return pd.concat(batches, ignore_index=True) if batches else pd.DataFrame(columns=columns)
+
+
+def normalize_users(users_df: pd.DataFrame) -> pd.DataFrame:
+    """Coerce Node rows to the users.csv types; users without an offered skill are dropped."""
+    users_df = users_df.dropna(subset=['user_id', 'skills'])
+    users_df = users_df[users_df['skills'].astype(str).str.strip() != '']
+
+    levels = users_df['skill_level']
+    named = levels.astype(str).str.strip().str.lower().map(SKILL_LEVEL_NAMES)
+    levels = pd.to_numeric(levels, errors='coerce').fillna(named).fillna(1)
+
+    return users_df.assign(
+        user_id=users_df['user_id'].astype('int64'),
+        skill_level=levels.round().astype('int64'),
+        rating=pd.to_numeric(users_df['rating'], errors='coerce').fillna(0.0),
+        description=users_df['description'].fillna(''),
+        feedback=users_df['feedback'].fillna(''),
+        status=users_df['status'].fillna('available'),
+        skill_user_is_seeking_for=users_df['skill_user_is_seeking_for'].fillna('')
+    ).reset_index(drop=True)
+
+
+def normalize_swaps(swaps_df: pd.DataFrame) -> pd.DataFrame:
+    """Coerce Node rows to the swaps.csv types (dates as YYYY-MM-DD)."""
+    swaps_df = swaps_df.dropna(subset=['user_id_of_learner', 'user_id_of_teacher'])
+    # ISO timestamps (as JSON-serialized JS Dates are) keep just their date part
+    dates = {
+        column: swaps_df[column].map(lambda value: value.strip()[:10] if isinstance(value, str) else value)
+        for column in ('starting_date_of_learning_or_teaching', 'ending_date_of_learning_or_teaching')
+    }
+    return swaps_df.assign(
+        user_id_of_learner=swaps_df['user_id_of_learner'].astype('int64'),
+        user_id_of_teacher=swaps_df['user_id_of_teacher'].astype('int64'),
+        **dates
+    ).reset_index(drop=True)
+
+
+def merge_delta(users_df: pd.DataFrame, swaps_df: pd.DataFrame, users_delta: pd.DataFrame,
+                swaps_delta: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Apply rows changed since a marker to the current data.
+
+    Every user in the delta is sent with all their rows, which replace the
+    ones held now; swaps are appended, skipping ones already present.
+    """
+    changed = users_delta['user_id'].unique()
+    users = pd.concat([users_df[~users_df['user_id'].isin(changed)], users_delta], ignore_index=True)
+    swaps = pd.concat([swaps_df, swaps_delta], ignore_index=True).drop_duplicates(ignore_index=True)
+    return users, swaps
+
+
+def parse_stream(chunks: Iterator[bytes], format: str = 'json',
+                 batch_size: int = 5000) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Parse an iterable of byte chunks into (users_df, swaps_df)."""
+    parser = StreamingRecordParser(format)
+    collector = RowCollector(batch_size)
+    for chunk in chunks:
+        collector.extend(parser.feed(chunk))
+    collector.extend(parser.close())
+    return collector.frames()
+
+
+def read_chunks(stream: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def post_stream(stream: BinaryIO, url: str, format: str, since: Optional[str] = None,
+                api_key: Optional[str] = None) -> Dict:
+    """Stream a body to the service's /data/ingest with chunked transfer encoding."""
+    parts = urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    connection = connection_class(parts.netloc)
+    query = urlencode({key: value for key, value in (('format', format), ('since', since)) if value})
+    headers = {'Content-Type': 'application/x-ndjson' if format == 'ndjson' else 'application/json'}
+    if api_key:
+        headers['Authorization'] = f'Bearer {api_key}'
+
+    connection.request('POST', f"{parts.path.rstrip('/')}/data/ingest?{query}", body=read_chunks(stream),
+                       headers=headers, encode_chunked=True)
+    response = connection.getresponse()
+    body = json.loads(response.read() or b'{}')
+    if response.status >= 400:
+        raise RuntimeError(f"Ingest failed with HTTP {response.status}: {body.get('detail', body)}")
+    return body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream Node backend users/swaps data into the recommendation service")
+    parser.add_argument('path', help="payload file, or - for stdin")
+    parser.add_argument('--format', choices=INGEST_FORMATS, default=None,
+                        help="defaults to ndjson for .ndjson/.jsonl files, json otherwise")
+    parser.add_argument('--since', default=None, help="apply as changes since this marker instead of a full load")
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--api-key', default=None)
+    parser.add_argument('--dry-run', action='store_true', help="parse locally and report row counts")
+    args = parser.parse_args()
+
+    format = args.format or ('ndjson' if args.path.endswith(('.ndjson', '.jsonl')) else 'json')
+    stream = sys.stdin.buffer if args.path == '-' else open(args.path, 'rb')
+    try:
+        start = time.perf_counter()
+        if args.dry_run:
+            users_df, swaps_df = parse_stream(read_chunks(stream), format)
+            result = {'users_rows': len(users_df), 'swaps_rows': len(swaps_df),
+                      'parse_seconds': round(time.perf_counter() - start, 3)}
+        else:
+            result = post_stream(stream, args.url, format, args.since, args.api_key)
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,18 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional
+import bisect
 import logging
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import threading
+import time
 import json
 
+from data_aggregates import memory_footprint
+from memo_cache import LRUCache
+from skill_autocomplete import normalize_skill_name
+from vector_precision import (compute_dtype, dequantize_rows, quantize_dense, quantize_sparse, sparse_rows,
+                              sparse_similarities, stored_nbytes, validate_precision)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -15,41 +22,242 @@ class FAISSContentEngine:
     Works with the simplified data structure (users.csv and swaps.csv).
     """
     
-    def __init__(self):
+    def __init__(self, precision: str = 'float64', query_cache_size: int = 1024, similar_skills_k: int = 50,
+                 similarity_block_size: int = 256, background_similarity_build: bool = False):
         self.users_df = None
         self.swaps_df = None
         self.tfidf_vectorizer = None
         self.skill_vectors = None
         self.skill_descriptions = None
         
+        # Storage precision of skill_vectors ('float64', 'float32' or 'int8' with per-row scales)
+        self.precision = validate_precision(precision)
+        self.skill_vector_scales = None
+        
+        # Keyword query vectors and final top-K lists; cleared on every load
+        self.query_vector_cache = LRUCache(query_cache_size)
+        self.result_cache = LRUCache(query_cache_size)
+        
+        # Top-K similar skills of every skill (0 disables), built in row blocks after each load,
+        # optionally in a background thread; find_similar_skills computes rows itself until it is ready
+        self.similar_skills_k = similar_skills_k
+        self.similarity_block_size = similarity_block_size
+        self.background_similarity_build = background_similarity_build
+        self.similar_skills = None
+        self.similar_skills_build_seconds = None
+        self._similar_skills_generation = 0
+        self._similar_skills_thread = None
+        
+        # Computed once per load so get_stats is an O(1) read
+        self.skill_summary = {}
+        self.skill_difficulties = np.empty(0, dtype=object)
+        
+        # Plain per-skill columns and name lookups, so building results never touches pandas
+        self.skill_names = ()
+        self.skill_levels = ()
+        self.skill_ratings = ()
+        self.skill_texts = ()
+        self.skill_categories = np.empty(0, dtype=object)
+        self.skill_rows = {}
+        self.normalized_skill_rows = {}
+        self._sorted_skill_keys = []
+        self._sorted_skill_rows = []
+        self.build_seconds = None
+        self.memory_bytes = {}
+        
     def load_data(self, users_df: pd.DataFrame, swaps_df: pd.DataFrame):
         """Load and prepare data for content-based filtering."""
         logger.info("Loading data for FAISS content engine...")
+        start = time.perf_counter()
         
         self.users_df = users_df.copy()
         self.swaps_df = swaps_df.copy()
+        self.query_vector_cache.clear()
+        self.result_cache.clear()
+        self.similar_skills = None
+        self._similar_skills_generation += 1
         
         # Create enhanced text representations for skills
         self._create_skill_descriptions()
         
-        # Initialize TF-IDF vectorizer
+        # Initialize TF-IDF vectorizer (sklearn is imported on first load, not at startup)
+        from sklearn.feature_extraction.text import TfidfVectorizer
         self.tfidf_vectorizer = TfidfVectorizer(
             max_features=2000,
             stop_words='english',
             ngram_range=(1, 3),
             min_df=1,
             max_df=0.95,
-            strip_accents='unicode'
+            strip_accents='unicode',
+            dtype=compute_dtype(self.precision)
         )
         
         # Create TF-IDF vectors for skills
         if not self.skill_descriptions.empty:
-            self.skill_vectors = self.tfidf_vectorizer.fit_transform(
-                self.skill_descriptions['text_for_vectorization']
+            self.skill_vectors, self.skill_vector_scales = quantize_sparse(
+                self.tfidf_vectorizer.fit_transform(self.skill_descriptions['text_for_vectorization']),
+                self.precision
             )
             logger.info("FAISS content engine loaded successfully")
         else:
             logger.warning("No skill descriptions available for content engine")
+        
+        self._index_skills()
+        self._summarize_skills()
+        self.build_seconds = time.perf_counter() - start
+        self.memory_bytes = memory_footprint(users_df=self.users_df, swaps_df=self.swaps_df,
+                                             skill_descriptions=self.skill_descriptions,
+                                             skill_vectors=self.skill_vectors,
+                                             skill_vector_scales=self.skill_vector_scales)
+        
+        if self.skill_vectors is not None and self.similar_skills_k > 0:
+            generation = self._similar_skills_generation
+            if self.background_similarity_build:
+                self._similar_skills_thread = threading.Thread(
+                    target=self._build_similar_skills, args=(generation,), daemon=True, name='similar-skills-build'
+                )
+                self._similar_skills_thread.start()
+            else:
+                self._build_similar_skills(generation)
+    
+    def _build_similar_skills(self, generation: int):
+        """
+        Compute the top-K most similar skills of every skill, one block of rows at a time.
+        
+        Each block is a sparse (block x skills) product against the stored vectors,
+        so peak memory is block_size x n_skills rather than n_skills squared.
+        The table is only published if no newer load started in the meantime.
+        """
+        start = time.perf_counter()
+        try:
+            skill_vectors, scales = self.skill_vectors, self.skill_vector_scales
+            n_skills = skill_vectors.shape[0]
+            k = min(self.similar_skills_k, n_skills - 1)
+            if k <= 0:
+                return
+            
+            indices = np.empty((n_skills, k), dtype=np.int32)
+            scores = np.empty((n_skills, k), dtype=compute_dtype(self.precision))
+            for block_start in range(0, n_skills, self.similarity_block_size):
+                block_stop = min(block_start + self.similarity_block_size, n_skills)
+                similarities = sparse_similarities(sparse_rows(skill_vectors, scales, block_start, block_stop),
+                                                   skill_vectors, scales, self.precision)
+                rows = np.arange(block_stop - block_start)
+                similarities[rows, rows + block_start] = -np.inf
+                
+                top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+                top_scores = np.take_along_axis(similarities, top, axis=1)
+                # Highest score first, ties by skill order (as the full-row scan does)
+                order = np.lexsort((top, -top_scores), axis=1)
+                indices[block_start:block_stop] = np.take_along_axis(top, order, axis=1)
+                scores[block_start:block_stop] = np.take_along_axis(top_scores, order, axis=1)
+            
+            stored_scores, score_scales = quantize_dense(scores, self.precision)
+            if generation != self._similar_skills_generation:
+                return
+            self.similar_skills = {'indices': indices, 'scores': stored_scores, 'scales': score_scales, 'k': k}
+            self.similar_skills_build_seconds = time.perf_counter() - start
+            
+            table_bytes = stored_nbytes(indices) + stored_nbytes(stored_scores, score_scales)
+            self.memory_bytes = {**self.memory_bytes, 'similar_skills': table_bytes,
+                                 'total': self.memory_bytes.get('total', 0) + table_bytes}
+            logger.info(f"Similar-skills table built for {n_skills} skills "
+                        f"(k={k}) in {self.similar_skills_build_seconds:.3f}s")
+            
+        except Exception as e:
+            logger.error(f"Error building similar-skills table: {e}")
+    
+    def wait_for_similar_skills(self, timeout: Optional[float] = None) -> bool:
+        """Block until a background similar-skills build finishes; True if the table is ready."""
+        thread = self._similar_skills_thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.similar_skills is not None
+    
+    @staticmethod
+    def _normalize_keywords(keywords: List[str]) -> Tuple[str, ...]:
+        """Lowercased, whitespace-collapsed keywords; order is kept since it changes the n-grams."""
+        return tuple(' '.join(keyword.lower().split()) for keyword in keywords if keyword and keyword.strip())
+    
+    def _keyword_vector(self, keywords: Tuple[str, ...]):
+        """TF-IDF vector of a normalized keyword tuple, memoized."""
+        vector = self.query_vector_cache.get(keywords)
+        if vector is None:
+            vector = self.tfidf_vectorizer.transform([' '.join(keywords)])
+            self.query_vector_cache.put(keywords, vector)
+        return vector
+    
+    def _similarities(self, vectors) -> np.ndarray:
+        """Cosine similarity of L2-normalized query vectors with every skill, at the stored precision."""
+        return sparse_similarities(vectors, self.skill_vectors, self.skill_vector_scales, self.precision)
+    
+    def _index_skills(self):
+        """Column tuples of the display fields plus exact, normalized and prefix name lookups."""
+        if self.skill_descriptions is None or self.skill_descriptions.empty:
+            self.skill_names = self.skill_levels = self.skill_ratings = self.skill_texts = ()
+            self.skill_difficulties = np.empty(0, dtype=object)
+            self.skill_categories = np.empty(0, dtype=object)
+            self.skill_rows, self.normalized_skill_rows = {}, {}
+            self._sorted_skill_keys, self._sorted_skill_rows = [], []
+            return
+        
+        self.skill_names = tuple(self.skill_descriptions['skills'].tolist())
+        # numpy rounding, as round() on the column's float64 values gave before
+        self.skill_levels = tuple(np.round(self.skill_descriptions['skill_level'].to_numpy(dtype=float), 1).tolist())
+        self.skill_ratings = tuple(np.round(self.skill_descriptions['rating'].to_numpy(dtype=float), 2).tolist())
+        self.skill_texts = tuple(self.skill_descriptions['description'].tolist())
+        self.skill_difficulties = np.asarray([self._get_skill_difficulty(skill) for skill in self.skill_names],
+                                             dtype=object)
+        self.skill_categories = np.asarray([self._get_skill_category(skill) for skill in self.skill_names],
+                                           dtype=object)
+        
+        self.skill_rows = {skill: row for row, skill in enumerate(self.skill_names)}
+        self.normalized_skill_rows = {}
+        for row, skill in enumerate(self.skill_names):
+            # The first skill in sorted order wins when two names normalize alike
+            self.normalized_skill_rows.setdefault(normalize_skill_name(skill), row)
+        
+        ordered = sorted(self.normalized_skill_rows.items())
+        self._sorted_skill_keys = [key for key, _ in ordered]
+        self._sorted_skill_rows = [row for _, row in ordered]
+    
+    def find_skill_row(self, skill_name: str) -> Optional[int]:
+        """Row of a skill by exact name, falling back to case/whitespace-insensitive matching."""
+        row = self.skill_rows.get(skill_name)
+        if row is None:
+            row = self.normalized_skill_rows.get(normalize_skill_name(skill_name))
+        return row
+    
+    def find_skill_rows_by_prefix(self, prefix: str, limit: Optional[int] = None) -> List[int]:
+        """Rows of the skills whose normalized name starts with the normalized prefix, in name order."""
+        prefix = normalize_skill_name(prefix)
+        if not prefix:
+            return []
+        
+        rows = []
+        start = bisect.bisect_left(self._sorted_skill_keys, prefix)
+        for key, row in zip(self._sorted_skill_keys[start:], self._sorted_skill_rows[start:]):
+            if not key.startswith(prefix) or (limit is not None and len(rows) >= limit):
+                break
+            rows.append(row)
+        return rows
+    
+    def _summarize_skills(self):
+        """Skill count, means and difficulty distribution reported by get_stats."""
+        if self.skill_descriptions is None or self.skill_descriptions.empty:
+            self.skill_summary = {}
+            return
+        
+        difficulty_counts = {}
+        for difficulty in self.skill_difficulties:
+            difficulty_counts[difficulty] = difficulty_counts.get(difficulty, 0) + 1
+        
+        self.skill_summary = {
+            'total_skills': len(self.skill_descriptions),
+            'avg_rating': round(float(self.skill_descriptions['rating'].mean()), 2),
+            'avg_level': round(float(self.skill_descriptions['skill_level'].mean()), 2),
+            'difficulty_distribution': difficulty_counts
+        }
     
     def _create_skill_descriptions(self):
         """Create enhanced skill descriptions for vectorization."""
@@ -88,7 +296,7 @@ class FAISSContentEngine:
             user_vector = self.tfidf_vectorizer.transform([user_skill_text])
             
             # Calculate similarities with all skills
-            similarities = cosine_similarity(user_vector, self.skill_vectors).flatten()
+            similarities = self._similarities(user_vector).flatten()
             
             # Get top similar skills
             top_indices = np.argsort(similarities)[::-1][:n_recommendations]
@@ -96,13 +304,12 @@ class FAISSContentEngine:
             recommendations = []
             for idx in top_indices:
                 if similarities[idx] > 0:  # Only include skills with some similarity
-                    skill_info = self.skill_descriptions.iloc[idx]
                     recommendations.append({
-                        'skill': skill_info['skills'],
+                        'skill': self.skill_names[idx],
                         'similarity_score': float(similarities[idx]),
-                        'avg_level': round(skill_info['skill_level'], 1),
-                        'avg_rating': round(skill_info['rating'], 2),
-                        'description': skill_info['description'],
+                        'avg_level': self.skill_levels[idx],
+                        'avg_rating': self.skill_ratings[idx],
+                        'description': self.skill_texts[idx],
                         'recommendation_type': 'content_based'
                     })
             
@@ -112,58 +319,118 @@ class FAISSContentEngine:
             logger.error(f"Error getting content-based recommendations: {e}")
             return []
     
+    def get_batch_user_skill_recommendations(self, user_skills: Dict[int, List[str]],
+                                             n_recommendations: int = 5) -> Dict[int, List[Dict]]:
+        """Content-based recommendations for many users with one transform and one similarity product."""
+        if self.skill_vectors is None or self.skill_descriptions.empty or not user_skills:
+            return {uid: [] for uid in user_skills}
+        
+        user_ids = list(user_skills)
+        user_vectors = self.tfidf_vectorizer.transform([' '.join(user_skills[uid]) for uid in user_ids])
+        similarities = self._similarities(user_vectors)
+        
+        n = min(n_recommendations, similarities.shape[1])
+        top = np.argpartition(-similarities, n - 1, axis=1)[:, :n]
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        
+        results = {}
+        for i, user_id in enumerate(user_ids):
+            results[user_id] = [
+                {
+                    'skill': self.skill_names[idx],
+                    'similarity_score': float(similarities[i, idx]),
+                    'avg_level': self.skill_levels[idx],
+                    'avg_rating': self.skill_ratings[idx],
+                    'description': self.skill_texts[idx],
+                    'recommendation_type': 'content_based'
+                }
+                for idx in top[i] if similarities[i, idx] > 0
+            ]
+        
+        return results
+    
     def find_similar_skills(self, skill_name: str, n_recommendations: int = 5, 
                            difficulty_filter: Optional[str] = None) -> List[Dict]:
         """Find skills similar to a given skill using content-based filtering."""
         if self.skill_vectors is None or self.skill_descriptions.empty:
             return []
         
+        # Find the skill in our descriptions
+        skill_idx = self.find_skill_row(skill_name)
+        if skill_idx is None:
+            return []
+        
+        cache_key = ('similar_skills', skill_idx, difficulty_filter, n_recommendations)
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            return [dict(rec) for rec in cached]
+        
         try:
-            # Find the skill in our descriptions
-            skill_mask = self.skill_descriptions['skills'] == skill_name
-            if not skill_mask.any():
-                return []
-            
-            skill_idx = skill_mask.idxmax()
-            skill_vector = self.skill_vectors[skill_idx:skill_idx+1]
+            similar_scores = self._lookup_similar_skills(skill_idx, n_recommendations, difficulty_filter)
             
-            # Calculate similarities with all other skills
-            similarities = cosine_similarity(skill_vector, self.skill_vectors).flatten()
-            
-            # Filter by difficulty if specified
-            if difficulty_filter:
-                difficulty_levels = self._get_difficulty_levels()
-                filtered_indices = [
-                    i for i in range(len(self.skill_descriptions))
-                    if self._get_skill_difficulty(self.skill_descriptions.iloc[i]['skills']) == difficulty_filter
-                ]
-            else:
-                filtered_indices = list(range(len(self.skill_descriptions)))
-            
-            # Get top similar skills (excluding the skill itself)
-            similar_scores = [(i, similarities[i]) for i in filtered_indices if i != skill_idx]
-            similar_scores.sort(key=lambda x: x[1], reverse=True)
+            if similar_scores is None:
+                skill_vector = sparse_rows(self.skill_vectors, self.skill_vector_scales, skill_idx)
+                
+                # Calculate similarities with all other skills
+                similarities = self._similarities(skill_vector).flatten()
+                
+                # Filter by difficulty if specified
+                if difficulty_filter:
+                    filtered_indices = np.flatnonzero(self.skill_difficulties == difficulty_filter)
+                else:
+                    filtered_indices = range(len(self.skill_names))
+                
+                # Get top similar skills (excluding the skill itself)
+                similar_scores = [(i, similarities[i]) for i in filtered_indices if i != skill_idx]
+                similar_scores.sort(key=lambda x: x[1], reverse=True)
             
             recommendations = []
             for idx, score in similar_scores[:n_recommendations]:
                 if score > 0:  # Only include skills with some similarity
-                    skill_info = self.skill_descriptions.iloc[idx]
                     recommendations.append({
-                        'skill': skill_info['skills'],
+                        'skill': self.skill_names[idx],
                         'similarity_score': float(score),
-                        'avg_level': round(skill_info['skill_level'], 1),
-                        'avg_rating': round(skill_info['rating'], 2),
-                        'description': skill_info['description'],
-                        'difficulty': self._get_skill_difficulty(skill_info['skills']),
+                        'avg_level': self.skill_levels[idx],
+                        'avg_rating': self.skill_ratings[idx],
+                        'description': self.skill_texts[idx],
+                        'difficulty': self.skill_difficulties[idx],
                         'recommendation_type': 'similar_skills'
                     })
             
-            return recommendations
+            self.result_cache.put(cache_key, recommendations)
+            return [dict(rec) for rec in recommendations]
             
         except Exception as e:
             logger.error(f"Error finding similar skills: {e}")
             return []
     
+    def _lookup_similar_skills(self, skill_idx: int, n_recommendations: int,
+                               difficulty_filter: Optional[str]) -> Optional[List[Tuple[int, float]]]:
+        """
+        (index, score) pairs from the precomputed table, with the difficulty filter applied.
+        
+        Returns None when the table is not built yet, or when the filter leaves
+        fewer than n entries and the stored list may have cut off further
+        positive-similarity skills.
+        """
+        table = self.similar_skills
+        if table is None:
+            return None
+        
+        neighbors = table['indices'][skill_idx]
+        scores = dequantize_rows(table['scores'], table['scales'], skill_idx)
+        keep = scores > 0
+        if difficulty_filter:
+            keep &= self.skill_difficulties[neighbors] == difficulty_filter
+        
+        candidates = list(zip(neighbors[keep].tolist(), scores[keep].tolist()))
+        complete = table['k'] == len(self.skill_descriptions) - 1 or scores[-1] <= 0
+        if len(candidates) < n_recommendations and not complete:
+            return None
+        return candidates
+    
     def get_skills_by_difficulty(self, difficulty_level: str, category: Optional[str] = None,
                                 n_recommendations: int = 10) -> List[Dict]:
         """Get skills filtered by difficulty level and optionally by category."""
@@ -172,26 +439,23 @@ class FAISSContentEngine:
         
         try:
             # Filter skills by difficulty
-            difficulty_levels = self._get_difficulty_levels()
-            filtered_skills = []
+            matches = self.skill_difficulties == difficulty_level
+            # Additional category filter if specified
+            if category:
+                matches &= self.skill_categories == category
             
-            for _, skill_info in self.skill_descriptions.iterrows():
-                skill_difficulty = self._get_skill_difficulty(skill_info['skills'])
-                
-                if skill_difficulty == difficulty_level:
-                    # Additional category filter if specified
-                    if category and not self._skill_matches_category(skill_info['skills'], category):
-                        continue
-                    
-                    filtered_skills.append({
-                        'skill': skill_info['skills'],
-                        'avg_level': round(skill_info['skill_level'], 1),
-                        'avg_rating': round(skill_info['rating'], 2),
-                        'description': skill_info['description'],
-                        'difficulty': skill_difficulty,
-                        'category': self._get_skill_category(skill_info['skills']),
-                        'recommendation_type': 'difficulty_based'
-                    })
+            filtered_skills = [
+                {
+                    'skill': self.skill_names[idx],
+                    'avg_level': self.skill_levels[idx],
+                    'avg_rating': self.skill_ratings[idx],
+                    'description': self.skill_texts[idx],
+                    'difficulty': difficulty_level,
+                    'category': self.skill_categories[idx],
+                    'recommendation_type': 'difficulty_based'
+                }
+                for idx in np.flatnonzero(matches)
+            ]
             
             # Sort by rating and return top n
             filtered_skills.sort(key=lambda x: x['avg_rating'], reverse=True)
@@ -208,27 +472,23 @@ class FAISSContentEngine:
             return []
         
         try:
-            filtered_skills = []
+            matches = self.skill_categories == category
+            # Additional difficulty filter if specified
+            if difficulty_level:
+                matches &= self.skill_difficulties == difficulty_level
             
-            for _, skill_info in self.skill_descriptions.iterrows():
-                skill_category = self._get_skill_category(skill_info['skills'])
-                
-                if skill_category == category:
-                    # Additional difficulty filter if specified
-                    if difficulty_level:
-                        skill_difficulty = self._get_skill_difficulty(skill_info['skills'])
-                        if skill_difficulty != difficulty_level:
-                            continue
-                    
-                    filtered_skills.append({
-                        'skill': skill_info['skills'],
-                        'avg_level': round(skill_info['skill_level'], 1),
-                        'avg_rating': round(skill_info['rating'], 2),
-                        'description': skill_info['description'],
-                        'difficulty': self._get_skill_difficulty(skill_info['skills']),
-                        'category': skill_category,
-                        'recommendation_type': 'category_based'
-                    })
+            filtered_skills = [
+                {
+                    'skill': self.skill_names[idx],
+                    'avg_level': self.skill_levels[idx],
+                    'avg_rating': self.skill_ratings[idx],
+                    'description': self.skill_texts[idx],
+                    'difficulty': self.skill_difficulties[idx],
+                    'category': category,
+                    'recommendation_type': 'category_based'
+                }
+                for idx in np.flatnonzero(matches)
+            ]
             
             # Sort by rating and return top n
             filtered_skills.sort(key=lambda x: x['avg_rating'], reverse=True)
@@ -244,23 +504,24 @@ class FAISSContentEngine:
         if self.skill_vectors is None or self.skill_descriptions.empty:
             return []
         
+        normalized = self._normalize_keywords(keywords)
+        cache_key = ('keywords', normalized, difficulty_level, n_recommendations)
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            return [dict(rec) for rec in cached]
+        
         try:
             # Create keyword vector
-            keyword_text = ' '.join(keywords)
-            keyword_vector = self.tfidf_vectorizer.transform([keyword_text])
+            keyword_vector = self._keyword_vector(normalized)
             
             # Calculate similarities with all skills
-            similarities = cosine_similarity(keyword_vector, self.skill_vectors).flatten()
+            similarities = self._similarities(keyword_vector).flatten()
             
             # Filter by difficulty if specified
             if difficulty_level:
-                difficulty_levels = self._get_difficulty_levels()
-                filtered_indices = [
-                    i for i in range(len(self.skill_descriptions))
-                    if self._get_skill_difficulty(self.skill_descriptions.iloc[i]['skills']) == difficulty_level
-                ]
+                filtered_indices = np.flatnonzero(self.skill_difficulties == difficulty_level)
             else:
-                filtered_indices = list(range(len(self.skill_descriptions)))
+                filtered_indices = range(len(self.skill_names))
             
             # Get top matching skills
             keyword_scores = [(i, similarities[i]) for i in filtered_indices]
@@ -269,19 +530,19 @@ class FAISSContentEngine:
             recommendations = []
             for idx, score in keyword_scores[:n_recommendations]:
                 if score > 0:  # Only include skills with some similarity
-                    skill_info = self.skill_descriptions.iloc[idx]
                     recommendations.append({
-                        'skill': skill_info['skills'],
+                        'skill': self.skill_names[idx],
                         'keyword_match_score': float(score),
-                        'avg_level': round(skill_info['skill_level'], 1),
-                        'avg_rating': round(skill_info['rating'], 2),
-                        'description': skill_info['description'],
-                        'difficulty': self._get_skill_difficulty(skill_info['skills']),
-                        'category': self._get_skill_category(skill_info['skills']),
+                        'avg_level': self.skill_levels[idx],
+                        'avg_rating': self.skill_ratings[idx],
+                        'description': self.skill_texts[idx],
+                        'difficulty': self.skill_difficulties[idx],
+                        'category': self.skill_categories[idx],
                         'recommendation_type': 'keyword_search'
                     })
             
-            return recommendations
+            self.result_cache.put(cache_key, recommendations)
+            return [dict(rec) for rec in recommendations]
             
         except Exception as e:
             logger.error(f"Error searching skills by keywords: {e}")
@@ -345,20 +606,19 @@ class FAISSContentEngine:
         if self.skill_descriptions is None or self.skill_descriptions.empty:
             return {}
         
-        total_skills = len(self.skill_descriptions)
-        avg_rating = self.skill_descriptions['rating'].mean()
-        avg_level = self.skill_descriptions['skill_level'].mean()
-        
-        # Count skills by difficulty
-        difficulty_counts = {}
-        for _, skill_info in self.skill_descriptions.iterrows():
-            difficulty = self._get_skill_difficulty(skill_info['skills'])
-            difficulty_counts[difficulty] = difficulty_counts.get(difficulty, 0) + 1
-        
         return {
-            'total_skills': total_skills,
-            'avg_rating': round(avg_rating, 2),
-            'avg_level': round(avg_level, 2),
-            'difficulty_distribution': difficulty_counts,
+            **self.skill_summary,
+            'build_seconds': round(self.build_seconds, 4) if self.build_seconds is not None else None,
+            'precision': self.precision,
+            'memory_bytes': self.memory_bytes,
+            'similar_skills_table': {
+                'status': ('disabled' if self.similar_skills_k <= 0 else
+                           'ready' if self.similar_skills is not None else 'building'),
+                'k': self.similar_skills['k'] if self.similar_skills is not None else self.similar_skills_k,
+                'build_seconds': (round(self.similar_skills_build_seconds, 4)
+                                  if self.similar_skills_build_seconds is not None else None)
+            },
+            'query_vector_cache': self.query_vector_cache.get_stats(),
+            'result_cache': self.result_cache.get_stats(),
             'engine_type': 'content_based'
-        } 
\ No newline at end of file
+        }
@@ -0,0 +1,121 @@
+"""
+Conditional GET and response compression helpers.
+
+Endpoints that already hold an encoded body (e.g. a cached recommendation)
+use these to answer If-None-Match / If-Modified-Since with 304 before touching
+the body, and to compress large bodies once per encoding. Brotli is used when
+the optional `brotli` package is installed; gzip is always available.
+"""
+
+import gzip
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def build_etag(*parts) -> str:
+    """Strong ETag from the parts that identify a representation."""
+    return '"' + '-'.join(str(part) for part in parts) + '"'
+
+
+def content_etag(body: bytes) -> str:
+    """Strong ETag from a hash of the body, for payloads without a natural version."""
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def http_date(moment: datetime) -> str:
+    """Format a naive local or aware datetime as an HTTP date."""
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Evaluate If-None-Match (preferred) or If-Modified-Since against the current representation."""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        # Weak comparison, as RFC 9110 requires for If-None-Match
+        candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return '*' in candidates or etag.removeprefix('W/') in candidates
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+            return last_modified.astimezone().replace(microsecond=0) <= since
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+def choose_encoding(request: Request) -> Optional[str]:
+    """Pick the best supported encoding the client accepts."""
+    accepted = {}
+    for item in request.headers.get('accept-encoding', '').split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+
+    for encoding in SUPPORTED_ENCODINGS:
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    return Response(status_code=304, headers=headers)
+
+
+def conditional_response(request: Request, body: bytes, etag: str, last_modified: Optional[datetime] = None,
+                         min_compress_size: int = 1024, encoded_bodies: Optional[Dict[str, bytes]] = None,
+                         media_type: str = 'application/json') -> Response:
+    """
+    Build a 200 (possibly compressed) or 304 response for an already-encoded body.
+
+    encoded_bodies, when given, memoizes compressed variants so a cached body is
+    compressed at most once per encoding.
+    """
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache', 'Vary': 'Accept-Encoding'}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+
+    encoding = choose_encoding(request) if len(body) >= min_compress_size else None
+    if encoding is not None:
+        if encoded_bodies is not None and encoding in encoded_bodies:
+            body = encoded_bodies[encoding]
+        else:
+            compressed = compress(body, encoding)
+            if encoded_bodies is not None:
+                encoded_bodies[encoding] = compressed
+            body = compressed
+        headers['Content-Encoding'] = encoding
+
+    return Response(content=body, media_type=media_type, headers=headers)
@@ -0,0 +1,179 @@
+import pandas as pd
+import numpy as np
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from simple_recommendation_engine import RECOMMENDATION_WEIGHTS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class HybridRanker:
+    """
+    Hybrid ranker that fans out to the simple, content and collaborative engines
+    concurrently and blends their normalized scores into a single ranking.
+    Engines that miss their deadline are left out instead of failing the request.
+    """
+
+    def __init__(self, simple_engine, content_engine, collab_engine, max_workers: int = 6,
+                 timeouts: Optional[Dict[str, float]] = None, weights: Optional[Dict[str, float]] = None,
+                 recency_half_life_days: float = 180.0, executor: Optional[ThreadPoolExecutor] = None):
+        self.simple_engine = simple_engine
+        self.content_engine = content_engine
+        self.collab_engine = collab_engine
+        # A ranker rebuilt over new engines can keep the previous ranker's pool
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hybrid')
+        self.timeouts = {'simple': 0.5, 'content': 0.5, 'collaborative': 0.5}
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.weights = dict(weights or RECOMMENDATION_WEIGHTS)
+        self.recency_half_life_days = recency_half_life_days
+        self.skill_features = {}
+
+    def refresh(self, users_df: pd.DataFrame, swaps_df: pd.DataFrame):
+        """Precompute per-skill blend features (level, rating, popularity, recency) in [0, 1]."""
+        if users_df is None or users_df.empty:
+            self.skill_features = {}
+            return
+
+        skills = users_df.groupby('skills').agg(
+            skill_level=('skill_level', 'mean'),
+            rating=('rating', 'mean'),
+            popularity=('user_id', 'nunique')
+        )
+
+        # Recency: most recent swap taught by someone offering the skill, decayed
+        # relative to the newest swap in the data
+        recency = pd.Series(0.0, index=skills.index)
+        if swaps_df is not None and not swaps_df.empty:
+            starts = pd.to_datetime(swaps_df['starting_date_of_learning_or_teaching'], errors='coerce')
+            last_taught = (
+                pd.DataFrame({'user_id': swaps_df['user_id_of_teacher'], 'start': starts})
+                .merge(users_df[['user_id', 'skills']], on='user_id')
+                .groupby('skills')['start'].max()
+            )
+            if not last_taught.empty and pd.notna(last_taught.max()):
+                age_days = (last_taught.max() - last_taught).dt.days
+                decayed = np.power(0.5, age_days / self.recency_half_life_days)
+                recency = decayed.reindex(skills.index).fillna(0.0)
+
+        features = pd.DataFrame({
+            'skill_level': skills['skill_level'] / 5.0,
+            'rating': skills['rating'] / 5.0,
+            'popularity': skills['popularity'] / skills['popularity'].max(),
+            'recency': recency
+        }).clip(0.0, 1.0)
+
+        self.skill_features = features.to_dict('index')
+        logger.info(f"Hybrid ranker features computed for {len(self.skill_features)} skills")
+
+    def _engine_tasks(self, user_id: int, n_candidates: int) -> Tuple[Dict[str, Callable[[], List[Dict]]], Set[str]]:
+        """
+        Candidate generators per engine, each returning [{'skill', 'score', ...}],
+        plus the user's own skills, looked up once and shared by all engines.
+        """
+        simple = self.simple_engine
+        users_df = simple.users_df
+        # The user's rows from the seeking index: this runs on the event loop
+        user_skills = (users_df['skills'].to_numpy()[simple.seeking_index.offered_rows(user_id)].tolist()
+                       if users_df is not None else [])
+
+        def run_simple():
+            seeking = simple._get_seeking_skills(user_id)
+            return [
+                {'skill': rec['skill'], 'score': rec['confidence'], 'recommended_by': rec.get('recommended_by')}
+                for rec in simple._get_skills_to_learn(user_id, seeking, n_candidates)
+            ]
+
+        def run_content():
+            return [
+                {'skill': rec['skill'], 'score': rec['similarity_score']}
+                for rec in self.content_engine.get_user_skill_recommendations(user_skills, n_candidates)
+            ]
+
+        def run_collaborative():
+            return [
+                {'skill': rec['skill'], 'score': rec['similarity_score']}
+                for rec in self.collab_engine.get_recommendations(user_id, n_candidates)
+            ]
+
+        return {'simple': run_simple, 'content': run_content, 'collaborative': run_collaborative}, set(user_skills)
+
+    async def rank(self, user_id: int, n_recommendations: int = 5,
+                   timeouts: Optional[Dict[str, float]] = None) -> Dict:
+        """Run all engines concurrently and blend whatever finishes before its deadline."""
+        deadlines = dict(self.timeouts)
+        if timeouts:
+            deadlines.update(timeouts)
+
+        tasks, owned_skills = self._engine_tasks(user_id, n_recommendations * 3)
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+
+        async def run(name: str, task: Callable[[], List[Dict]]):
+            try:
+                result = await asyncio.wait_for(loop.run_in_executor(self.executor, task), deadlines[name])
+                return name, 'ok', result
+            except asyncio.TimeoutError:
+                logger.warning(f"Hybrid ranker: {name} engine missed its {deadlines[name]}s deadline for user {user_id}")
+                return name, 'timeout', []
+            except Exception as e:
+                logger.error(f"Hybrid ranker: {name} engine failed for user {user_id}: {e}")
+                return name, 'error', []
+
+        results = await asyncio.gather(*(run(name, task) for name, task in tasks.items()))
+
+        engines = {}
+        candidates = {}
+        for name, status, result in results:
+            engines[name] = {
+                'status': status,
+                'candidates': len(result),
+                'timeout_seconds': deadlines[name]
+            }
+            top_score = max((rec['score'] for rec in result), default=0.0)
+            for rec in result:
+                if rec['skill'] in owned_skills or top_score <= 0:
+                    continue
+                entry = candidates.setdefault(rec['skill'], {'sources': {}, 'recommended_by': None})
+                entry['sources'][name] = round(float(rec['score']) / top_score, 4)
+                if rec.get('recommended_by') is not None:
+                    entry['recommended_by'] = int(rec['recommended_by'])
+
+        responded = [name for name, info in engines.items() if info['status'] == 'ok']
+        recommendations = []
+        for skill, entry in candidates.items():
+            relevance = sum(entry['sources'].values()) / max(len(responded), 1)
+            features = self.skill_features.get(skill, {})
+            quality = sum(weight * features.get(feature, 0.0) for feature, weight in self.weights.items())
+            recommendations.append({
+                'skill': skill,
+                'score': round(relevance * quality, 4),
+                'relevance': round(relevance, 4),
+                'features': {feature: round(float(value), 4) for feature, value in features.items()},
+                'sources': entry['sources'],
+                'recommended_by': entry['recommended_by'],
+                'recommendation_type': 'hybrid'
+            })
+
+        recommendations.sort(key=lambda x: x['score'], reverse=True)
+
+        return {
+            'user_id': user_id,
+            'recommendation_type': 'hybrid',
+            'recommendations': recommendations[:n_recommendations],
+            'weights': self.weights,
+            'engines': engines,
+            'partial': len(responded) < len(engines),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def shutdown(self):
+        """Stop the worker pool."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
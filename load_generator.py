@@ -0,0 +1,344 @@
+"""
+Load generator for the recommendation service.
+
+Concurrent clients send a weighted mix of /recommend*, /similar-skills,
+/skills/search and /stats requests for the given duration. User ids (and
+skill names) are drawn from a Zipf distribution, so a few users are hot and
+the cache is exercised the way real traffic would. Synthetic data of the
+requested size replaces the service's data through /data/ingest first. The
+report has, per endpoint, throughput, p50/p95/p99 latency and error rate.
+
+Run from the repository root, e.g.:
+    python load_generator.py --users 5000 --skills 500 --duration 20 --concurrency 32
+    python load_generator.py --mode uvicorn --users 20000 --duration 30
+    python load_generator.py --url http://localhost:8000 --ingest-synthetic --mix recommend=5,star=1,stats=1
+
+In asgi mode (the default) requests go to main.app in-process through
+httpx's ASGI transport. There is no network, but the clients share the event
+loop with the app, so throughput is a lower bound. uvicorn mode starts a
+local server in a subprocess. --url targets a server that is already
+running; as the synthetic ingest replaces that server's data and flushes its
+cache, it has to be confirmed with --ingest-synthetic. The app writes files relative to its working directory (e.g.
+recommendation/ from /recommend and /recommend/tfidf), so in both local
+modes it runs in a temporary directory that is removed afterwards.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from benchmarks import make_synthetic_data
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+# Read by the app relative to its working directory
+APP_DIRECTORIES = ('static', 'templates', 'data')
+
+# Path templates; {user_id}, {skill} and {keyword} are filled in per request
+ENDPOINTS = {
+    'recommend': '/recommend/{user_id}',
+    'content': '/recommend/content/{user_id}',
+    'collaborative': '/recommend/collaborative/{user_id}',
+    'hybrid': '/recommend/hybrid/{user_id}',
+    'mf': '/recommend/mf/{user_id}',
+    'suggested_teacher': '/recommend/suggested-teacher/{user_id}',
+    'star': '/recommend/star/{user_id}',
+    'cycles': '/recommend/cycles/{user_id}',
+    'tfidf': '/recommend/tfidf/{user_id}',
+    'similar_skills': '/similar-skills/{skill}',
+    'skills_search': '/skills/search?keywords={keyword}',
+    'stats': '/stats'
+}
+
+# Relative weights; tfidf refits a vectorizer (and writes a file under recommendation/) per call, so it is kept rare
+DEFAULT_MIX = {
+    'recommend': 30, 'content': 10, 'collaborative': 10, 'hybrid': 5, 'mf': 5, 'suggested_teacher': 5,
+    'star': 10, 'cycles': 5, 'tfidf': 1, 'similar_skills': 10, 'skills_search': 5, 'stats': 4
+}
+
+
+def parse_mix(spec: Optional[str]) -> Dict[str, float]:
+    """Weights from 'name=weight,...'; names are ENDPOINTS keys. Empty means DEFAULT_MIX."""
+    if not spec:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in spec.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}'. Use any of: {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight) if weight else 1.0
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("The traffic mix needs at least one positive weight")
+    return mix
+
+
+class ZipfSampler:
+    """Draws values with probability proportional to 1 / rank ** exponent, ranks shuffled over the values."""
+
+    def __init__(self, values: Sequence, exponent: float = 1.0, rng: Optional[np.random.Generator] = None):
+        self.rng = rng or np.random.default_rng()
+        self.values = np.asarray(values)[self.rng.permutation(len(values))]
+        weights = 1.0 / np.arange(1, len(values) + 1) ** exponent
+        self.cumulative = np.cumsum(weights / weights.sum())
+
+    def sample(self, size: int) -> np.ndarray:
+        ranks = np.searchsorted(self.cumulative, self.rng.random(size), side='right')
+        return self.values[np.minimum(ranks, len(self.values) - 1)]
+
+
+class TrafficGenerator:
+    """Endless (endpoint, path) pairs following the mix, drawn in batches."""
+
+    def __init__(self, user_ids: Sequence[int], skill_names: Sequence[str], mix: Dict[str, float],
+                 exponent: float = 1.0, seed: int = 42, batch_size: int = 4096):
+        self.rng = np.random.default_rng(seed)
+        self.users = ZipfSampler(user_ids, exponent, self.rng)
+        self.skills = ZipfSampler(skill_names, exponent, self.rng)
+        self.endpoints = [name for name, weight in mix.items() if weight > 0]
+        weights = np.array([mix[name] for name in self.endpoints], dtype=float)
+        self.probabilities = weights / weights.sum()
+        self.batch_size = batch_size
+        self._batch = iter(())
+
+    def _refill(self):
+        endpoints = self.rng.choice(len(self.endpoints), size=self.batch_size, p=self.probabilities)
+        users = self.users.sample(self.batch_size).tolist()
+        skills = self.skills.sample(self.batch_size).tolist()
+        self._batch = iter(zip(endpoints.tolist(), users, skills))
+
+    def next_request(self) -> Tuple[str, str]:
+        item = next(self._batch, None)
+        if item is None:
+            self._refill()
+            item = next(self._batch)
+        endpoint, user_id, skill = item
+        name = self.endpoints[endpoint]
+        path = ENDPOINTS[name].format(user_id=user_id, skill=quote(skill), keyword=quote(skill.split()[0]))
+        return name, path
+
+
+class LoadRecorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def record(self, endpoint: str, status, latency_ms: float):
+        self.latencies[endpoint].append(latency_ms)
+        self.statuses[endpoint][status] += 1
+
+    def summary(self, elapsed: float) -> Dict:
+        """Per endpoint and overall: requests, throughput, latency percentiles, error rate and status counts."""
+        def describe(latencies: List[float], statuses: Counter) -> Dict:
+            timings = np.array(latencies)
+            requests = int(sum(statuses.values()))
+            errors = sum(count for status, count in statuses.items() if not (isinstance(status, int) and status < 400))
+            return {
+                'requests': requests,
+                'rps': round(requests / elapsed, 2) if elapsed else 0.0,
+                'p50_ms': round(float(np.percentile(timings, 50)), 3),
+                'p95_ms': round(float(np.percentile(timings, 95)), 3),
+                'p99_ms': round(float(np.percentile(timings, 99)), 3),
+                'error_rate': round(errors / requests, 4) if requests else 0.0,
+                'statuses': {str(status): count for status, count in sorted(statuses.items(), key=lambda item: str(item[0]))}
+            }
+
+        endpoints = {name: describe(self.latencies[name], self.statuses[name]) for name in sorted(self.latencies)}
+        overall = Counter()
+        for statuses in self.statuses.values():
+            overall.update(statuses)
+        all_latencies = [latency for latencies in self.latencies.values() for latency in latencies]
+        return {
+            'elapsed_seconds': round(elapsed, 3),
+            'overall': describe(all_latencies, overall) if all_latencies else {},
+            'endpoints': endpoints
+        }
+
+
+async def run_load(client: httpx.AsyncClient, traffic: TrafficGenerator, duration: float,
+                   concurrency: int, warmup: float = 0.0) -> Dict:
+    """Closed-loop clients for warmup + duration seconds; only the last duration seconds are recorded."""
+    recorder = LoadRecorder()
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    async def client_loop():
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                return
+            endpoint, path = traffic.next_request()
+            try:
+                status = (await client.get(path)).status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            if now >= measure_from:
+                recorder.record(endpoint, status, (time.perf_counter() - now) * 1000)
+
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return recorder.summary(time.perf_counter() - measure_from)
+
+
+async def ingest_synthetic(client: httpx.AsyncClient, users_df: pd.DataFrame, swaps_df: pd.DataFrame) -> Dict:
+    """Replace the service's data with the synthetic frames."""
+    body = dumps({'users': users_df.to_dict('records'), 'swaps': swaps_df.to_dict('records')})
+    response = await client.post('/data/ingest', content=body, headers={'Content-Type': 'application/json'})
+    if response.status_code >= 400:
+        raise RuntimeError(f"Ingest failed with HTTP {response.status_code}: {response.text}")
+    return response.json()
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 120.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get('/ready')).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"Service not ready after {timeout:.0f}s")
+
+
+async def load_test(client: httpx.AsyncClient, users_df: pd.DataFrame, swaps_df: pd.DataFrame,
+                    mix: Dict[str, float], duration: float, concurrency: int, warmup: float,
+                    exponent: float, seed: int) -> Dict:
+    ingested = await ingest_synthetic(client, users_df, swaps_df)
+    logger.info(f"Ingested {ingested['users_rows']} user rows and {ingested['swaps_rows']} swaps "
+                f"in {ingested['load_seconds']}s")
+    traffic = TrafficGenerator(users_df['user_id'].unique().tolist(), users_df['skills'].unique().tolist(),
+                               mix, exponent, seed)
+    return await run_load(client, traffic, duration, concurrency, warmup)
+
+
+def make_scratch_dir() -> str:
+    """A temporary working directory for the app, linking the directories it reads."""
+    directory = tempfile.mkdtemp(prefix='skill-swap-loadtest-')
+    for name in APP_DIRECTORIES:
+        os.symlink(os.path.join(REPO_DIR, name), os.path.join(directory, name))
+    return directory
+
+
+def run_in_process(args, users_df, swaps_df, mix: Dict[str, float]) -> Dict:
+    scratch_dir, previous_dir = make_scratch_dir(), os.getcwd()
+    os.chdir(scratch_dir)
+    try:
+        import main
+        return _run_asgi(main.app, args, users_df, swaps_df, mix)
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def _run_asgi(app, args, users_df, swaps_df, mix: Dict[str, float]) -> Dict:
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://loadtest', headers=args.headers,
+                                     timeout=args.timeout) as client:
+            return await load_test(client, users_df, swaps_df, mix, args.duration, args.concurrency,
+                                   args.warmup, args.zipf_exponent, args.seed)
+
+    return asyncio.run(run())
+
+
+def run_against_server(args, url: str, users_df, swaps_df, mix: Dict[str, float]) -> Dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async def run():
+        async with httpx.AsyncClient(base_url=url, headers=args.headers, timeout=args.timeout, limits=limits) as client:
+            await wait_until_ready(client)
+            return await load_test(client, users_df, swaps_df, mix, args.duration, args.concurrency,
+                                   args.warmup, args.zipf_exponent, args.seed)
+
+    return asyncio.run(run())
+
+
+def run_uvicorn(args, users_df, swaps_df, mix: Dict[str, float]) -> Dict:
+    """Start a local uvicorn on args.port, run the load against it, then stop it."""
+    scratch_dir = make_scratch_dir()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--app-dir', REPO_DIR, '--host', '127.0.0.1',
+         '--port', str(args.port), '--log-level', 'warning'],
+        cwd=scratch_dir
+    )
+    try:
+        return run_against_server(args, f'http://127.0.0.1:{args.port}', users_df, swaps_df, mix)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def _print_table(result: Dict):
+    print(f"== Load test: {result['elapsed_seconds']}s measured ==")
+    print(f"{'endpoint':<20}{'requests':>10}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}  statuses")
+    rows = list(result['endpoints'].items())
+    if result['overall']:
+        rows.append(('overall', result['overall']))
+    for name, row in rows:
+        print(f"{name:<20}{row['requests']:>10}{row['rps']:>10.1f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+              f"{row['p99_ms']:>10.2f}{row['error_rate']:>9.2%}  {row['statuses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Skill Swap recommendation service")
+    parser.add_argument('--mode', choices=('asgi', 'uvicorn'), default='asgi')
+    parser.add_argument('--url', default=None, help="target an already running server instead")
+    parser.add_argument('--ingest-synthetic', action='store_true',
+                        help="with --url, allow replacing the server's data with the synthetic set")
+    parser.add_argument('--port', type=int, default=8100, help="port of the uvicorn started in uvicorn mode")
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--skills', type=int, default=300)
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--warmup', type=float, default=2.0)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--mix', default=None, help="endpoint weights, e.g. recommend=30,star=10,stats=1")
+    parser.add_argument('--zipf-exponent', type=float, default=1.0)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--api-key', default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', default=None, help="also write the report to this file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger().setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    if args.url and not args.ingest_synthetic:
+        parser.error("--url replaces the server's data with synthetic rows and flushes its cache; "
+                     "pass --ingest-synthetic to confirm")
+    mix = parse_mix(args.mix)
+    args.headers = {'Authorization': f'Bearer {args.api_key}'} if args.api_key else {}
+    users_df, swaps_df = make_synthetic_data(args.users, args.skills, seed=args.seed)
+
+    if args.url:
+        result = run_against_server(args, args.url, users_df, swaps_df, mix)
+    elif args.mode == 'uvicorn':
+        result = run_uvicorn(args, users_df, swaps_df, mix)
+    else:
+        result = run_in_process(args, users_df, swaps_df, mix)
+
+    _print_table(result)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,42 @@
+import time
+IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, List, Optional
-import pandas as pd
+from fastapi.concurrency import run_in_threadpool
+IMPORT_CHECKPOINTS = {"fastapi": time.perf_counter()}
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
 import logging
 import json
 import os
+import asyncio
+import math
+import threading
+import bisect
+import itertools
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta
+IMPORT_CHECKPOINTS["numpy"] = time.perf_counter()
+
+from admission import AdmissionController, AdmissionRejected, TokenBucketLimiter
+from serialization import dumps
+from profiling import PSTATS_SORT_KEYS, ProfilingMiddleware, RequestProfiler, StackSampler
+from pagination import (DEFAULT_PAGE_SIZE, NDJSON_MEDIA_TYPE, decode_cursor, encode_cursor, ndjson_lines,
+                        take_page, validate_page_request, wants_ndjson)
+from http_cache import build_etag, conditional_response, is_not_modified, not_modified_response
+IMPORT_CHECKPOINTS["service_modules"] = time.perf_counter()
 
-from simple_recommendation_engine import SimpleRecommendationEngine
-from faiss_engine import FAISSContentEngine
-from collab_filter import CollaborativeFilterEngine
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+# The engine modules (and pandas, scipy and sklearn with them) are imported by
+# create_engines once the port is open, so they are not part of import time
+if TYPE_CHECKING:
+    import pandas as pd
+    from hybrid_ranker import HybridRanker
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -26,11 +46,70 @@ logger = logging.getLogger(__name__)
 API_KEY_ENABLED = os.getenv('API_KEY_ENABLED', 'false').lower() == 'true'
 API_KEY = os.getenv('API_KEY', 'your-secret-api-key-here')
 
+# Per-engine deadline for the hybrid ranker
+HYBRID_ENGINE_TIMEOUT = float(os.getenv('HYBRID_ENGINE_TIMEOUT', '0.5'))
+
+# Output of the nightly batch job (batch_recommendations.py), served while fresh
+PRECOMPUTED_DIR = os.getenv('PRECOMPUTED_DIR', 'precomputed')
+PRECOMPUTED_MAX_AGE_SECONDS = float(os.getenv('PRECOMPUTED_MAX_AGE_SECONDS', '86400'))
+PRECOMPUTED_CHECK_INTERVAL_SECONDS = float(os.getenv('PRECOMPUTED_CHECK_INTERVAL_SECONDS', '5'))
+
+# Storage precision of similarity vectors and neighbor scores: float64, float32 or int8
+VECTOR_PRECISION = os.getenv('VECTOR_PRECISION', 'float64')
+
+# Serve user-user collaborative recommendations from this many shard worker processes (0 disables)
+COLLAB_SHARDS = int(os.getenv('COLLAB_SHARDS', '0'))
+
+# Learners one teacher can be suggested to at once (minus sessions they are teaching), and the lowest teaching level
+MATCHING_TEACHER_CAPACITY = int(os.getenv('MATCHING_TEACHER_CAPACITY', '3'))
+MATCHING_MIN_TEACHER_LEVEL = int(os.getenv('MATCHING_MIN_TEACHER_LEVEL', '4'))
+
+# Longest swap cycle (in users) searched for, and the per-request search deadline
+CYCLE_MAX_LENGTH = int(os.getenv('CYCLE_MAX_LENGTH', '4'))
+CYCLE_TIME_BUDGET_MS = float(os.getenv('CYCLE_TIME_BUDGET_MS', '50'))
+
+# "background" opens the port first and loads data behind /ready; "eager" loads before serving
+STARTUP_MODE = os.getenv('STARTUP_MODE', 'background')
+
+# Concurrent requests allowed per expensive endpoint (name:limit, 0 turns it off), how many more may
+# wait for a slot and for how long, before they are shed with 503 and Retry-After
+ADMISSION_LIMITS = {
+    name.strip(): int(limit)
+    for name, limit in (item.split(':') for item in
+                        os.getenv('ADMISSION_LIMITS', 'tfidf:2,star:4,cycles:4,active_sessions:2').split(',') if item)
+}
+ADMISSION_QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', '8'))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '2.0'))
+
+# Requests per second (and burst) per API key, enforced with verify_api_key; 0 disables rate limiting
+RATE_LIMIT_PER_SECOND = float(os.getenv('RATE_LIMIT_PER_SECOND', '0'))
+RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', '20'))
+
+# Engines built on their first request instead of at every data load (any of: mf, matching, cycles)
+LAZY_ENGINES = {name.strip() for name in os.getenv('LAZY_ENGINES', '').split(',') if name.strip()}
+
+# Longest on-demand profiling session (stack sampling or waiting for profiled requests)
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '60'))
+
+# How long a /stats ETag stays valid within one data generation, bounding how stale the
+# live counters (cache, admission) can be for clients that revalidate
+STATS_ETAG_WINDOW_SECONDS = float(os.getenv('STATS_ETAG_WINDOW_SECONDS', '5'))
+
+# Bodies at least this large are gzip/brotli compressed when the client accepts it
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv('RESPONSE_COMPRESSION_MIN_BYTES', '1024'))
+
+class FastJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also encodes numpy values."""
+    
+    def render(self, content) -> bytes:
+        return dumps(content)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Skill Swap Recommendation Engine (Simple)",
     description="Simplified real-time skill recommendation engine for Skill Swap platform",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # Add CORS middleware
@@ -42,20 +121,182 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# cProfile for the next requests to a route, armed through /admin/profile/requests
+request_profiler = RequestProfiler()
+app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+stack_sampler_lock = asyncio.Lock()
+
+# Served without the engines, so they answer while create_engines is still importing them
+ENGINE_FREE_PATHS = {"/", "/health", "/ready"}
+
+class EngineGateMiddleware:
+    """ASGI middleware holding requests that need the engines until create_engines has run."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and recommendation_engine is None and scope['path'] not in ENGINE_FREE_PATHS \
+                and not scope['path'].startswith('/static/'):
+            await run_in_threadpool(create_engines)
+        await self.app(scope, receive, send)
+
+app.add_middleware(EngineGateMiddleware)
+
+# Cache entry lifetime, and how long an expired entry may still be served while it is refreshed
+CACHE_TTL_SECONDS = int(os.getenv('CACHE_TTL_SECONDS', '3600'))
+CACHE_STALE_SECONDS = int(os.getenv('CACHE_STALE_SECONDS', '300'))
+
+# Number of most-requested users to precompute on startup (0 disables warm-up)
+CACHE_WARMUP_TOP_N = int(os.getenv('CACHE_WARMUP_TOP_N', '0'))
+ACCESS_COUNTS_FILE = os.getenv('ACCESS_COUNTS_FILE', 'cache_access_counts.json')
+
 # In-memory cache only - no Redis
 cache = {}
+cache_expiry = {}
+
+# Pre-serialized /recommend/{user_id} response bodies (cache_hit=true), so a hit
+# skips Pydantic validation and JSON encoding entirely
+cache_payloads = {}
+
+# Conditional GET validators (ETag, Last-Modified) and compressed variants per cached body
+cache_validators = {}
+cache_encoded_bodies = {}
+
+# Bumped on every data load; part of every ETag so a reload never revalidates old bodies
+data_state = {"generation": 0, "loaded_at": None, "load_seconds": None, "source": None, "since": None}
+
+# Frames the engines were last built from (sample CSVs or /data/ingest)
+loaded_frames = {"users": None, "swaps": None}
+ingest_lock = asyncio.Lock()
+
+# Reverse dependency index: ('user', id) / ('skill', name) -> cache keys built from it
+cache_dependencies = {}
+dependency_index = defaultdict(set)
+# Held while cache entries and the dependency index change, as cache_recommendations runs in the threadpool
+cache_index_lock = threading.RLock()
 logger.info("Using in-memory cache only - no Redis required")
 
-# Initialize recommendation engines
-recommendation_engine = SimpleRecommendationEngine()
-content_engine = FAISSContentEngine()
-collab_engine = CollaborativeFilterEngine()
+# Single-flight: one in-progress computation per cache key that concurrent misses wait on
+inflight_computations = {}
+background_refreshes = set()
+access_counts = Counter()
+cache_counters = Counter()
+warmup_state = {"status": "disabled" if CACHE_WARMUP_TOP_N <= 0 else "pending", "warmed_users": 0}
+
+# Where cold-start time goes: import groups, per-engine build time, and time until /ready
+startup_state = {
+    "mode": STARTUP_MODE,
+    "import_seconds": {},
+    "engine_build_seconds": {},
+    "ready_seconds": None
+}
+previous_checkpoint = IMPORT_STARTED
+for group, checkpoint in IMPORT_CHECKPOINTS.items():
+    startup_state["import_seconds"][group] = round(checkpoint - previous_checkpoint, 4)
+    previous_checkpoint = checkpoint
+
+# Deferred engine builds (LAZY_ENGINES) waiting for their first request
+pending_builds: Dict[str, Callable[[], None]] = {}
+engine_build_lock = threading.RLock()
+
+# Recommendation engines, created empty by create_engines and replaced on every data load
+recommendation_engine = None
+content_engine = None
+collab_engine = None
+mf_engine = None
+hybrid_ranker = None
+
+# Workers are only started when data is loaded
+sharded_collab_engine = None
+
+skill_autocomplete = None
+swap_matcher = None
+swap_cycles = None
+
+# Module globals each build step publishes its engine under
+ENGINE_GLOBALS = {
+    "simple": "recommendation_engine",
+    "cycles": "swap_cycles",
+    "content": "content_engine",
+    "collaborative": "collab_engine",
+    "mf": "mf_engine",
+    "hybrid": "hybrid_ranker",
+    "autocomplete": "skill_autocomplete",
+    "matching": "swap_matcher",
+    "sharded": "sharded_collab_engine"
+}
+
+precomputed_store = None
+
+def new_hybrid_ranker(simple_engine, content_engine, collab_engine, executor=None) -> "HybridRanker":
+    from hybrid_ranker import HybridRanker
+    return HybridRanker(
+        simple_engine, content_engine, collab_engine, executor=executor,
+        timeouts={'simple': HYBRID_ENGINE_TIMEOUT, 'content': HYBRID_ENGINE_TIMEOUT, 'collaborative': HYBRID_ENGINE_TIMEOUT}
+    )
+
+def create_engines():
+    """
+    Import the engine modules and create the empty engines and the precomputed store, once.
+    
+    Run by the startup task after the port is open (or by the first request
+    that needs them, see EngineGateMiddleware); the import time is reported as
+    the engine_modules group of the startup breakdown.
+    """
+    with engine_build_lock:
+        if recommendation_engine is not None:
+            return
+        step_start = time.perf_counter()
+        from simple_recommendation_engine import SimpleRecommendationEngine
+        from faiss_engine import FAISSContentEngine
+        from collab_filter import CollaborativeFilterEngine
+        from mf_engine import MatrixFactorizationEngine
+        from sharded_collab import ShardedCollaborativeEngine
+        from skill_autocomplete import SkillAutocompleteIndex
+        from swap_matching import SwapMatchingEngine
+        from swap_cycles import SwapCycleEngine
+        from batch_recommendations import PrecomputedStore
+        startup_state["import_seconds"]["engine_modules"] = round(time.perf_counter() - step_start, 4)
+        
+        simple = SimpleRecommendationEngine()
+        content = FAISSContentEngine(precision=VECTOR_PRECISION, background_similarity_build=True)
+        collaborative = CollaborativeFilterEngine(precision=VECTOR_PRECISION)
+        # recommendation_engine goes last: once it is set the engines exist
+        globals().update(
+            precomputed_store=PrecomputedStore(PRECOMPUTED_DIR, PRECOMPUTED_MAX_AGE_SECONDS,
+                                               PRECOMPUTED_CHECK_INTERVAL_SECONDS),
+            content_engine=content,
+            collab_engine=collaborative,
+            mf_engine=MatrixFactorizationEngine(),
+            hybrid_ranker=new_hybrid_ranker(simple, content, collaborative),
+            sharded_collab_engine=ShardedCollaborativeEngine(COLLAB_SHARDS) if COLLAB_SHARDS > 0 else None,
+            skill_autocomplete=SkillAutocompleteIndex(),
+            swap_matcher=SwapMatchingEngine(MATCHING_TEACHER_CAPACITY, MATCHING_MIN_TEACHER_LEVEL),
+            swap_cycles=SwapCycleEngine(CYCLE_MAX_LENGTH, CYCLE_TIME_BUDGET_MS / 1000)
+        )
+        globals()["recommendation_engine"] = simple
+
+admission_controller = AdmissionController(ADMISSION_LIMITS, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT)
+rate_limiter = TokenBucketLimiter(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST) if RATE_LIMIT_PER_SECOND > 0 else None
 
 # Optional API Key Authentication
 security = HTTPBearer(auto_error=False)
 
-async def verify_api_key(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)):
-    """Verify API key if enabled."""
+async def verify_api_key(request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)):
+    """Verify API key if enabled, and apply the per-key rate limit if one is set."""
+    if rate_limiter is not None:
+        # Only a valid API key gets its own bucket; any other caller is limited
+        # per client address, whatever Bearer token it sends
+        if API_KEY_ENABLED and credentials and credentials.credentials == API_KEY:
+            key = credentials.credentials
+        else:
+            key = request.client.host if request.client else "anonymous"
+        wait = rate_limiter.take(key)
+        if wait > 0:
+            raise HTTPException(status_code=429, detail="Rate limit exceeded",
+                                headers={"Retry-After": str(max(1, math.ceil(wait)))})
+    
     if not API_KEY_ENABLED:
         return True  # No authentication required
     
@@ -73,6 +314,48 @@ async def verify_api_key(credentials: Optional[HTTPAuthorizationCredentials] = D
     
     return True
 
+async def verify_admin(auth: bool = Depends(verify_api_key)):
+    """Admin endpoints need a valid API key, so they are refused while API key auth is off."""
+    if not API_KEY_ENABLED:
+        raise HTTPException(status_code=403, detail="Admin endpoints require API key authentication (API_KEY_ENABLED=true)")
+    return True
+
+def admission(endpoint: str):
+    """
+    Dependency that holds one of the endpoint's admission slots for the request.
+    
+    Requests beyond the concurrency limit wait in a bounded queue; a full
+    queue or a timed-out wait is answered at once with 503 and Retry-After.
+    """
+    async def admit():
+        limiter = admission_controller.limiter(endpoint)
+        if limiter is None:
+            yield
+            return
+        try:
+            admitted_at = await limiter.acquire()
+        except AdmissionRejected as e:
+            raise HTTPException(status_code=e.status_code, detail=f"Server busy: {e.reason}",
+                                headers={"Retry-After": str(e.retry_after)})
+        try:
+            yield
+        finally:
+            limiter.release(admitted_at)
+    return admit
+
+def list_request(request: Request, cursor: Optional[str], limit: int, format: Optional[str]) -> Tuple[Dict, bool]:
+    """Decoded cursor state (empty on the first page) and whether to stream NDJSON; 400 for bad paging parameters."""
+    try:
+        validate_page_request(limit, format)
+        state = decode_cursor(cursor) or {}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return state, wants_ndjson(format, request.headers.get("accept", ""))
+
+def ndjson_response(rows: Iterator[Dict]) -> StreamingResponse:
+    """Stream rows as they are generated; Starlette iterates the generator in the threadpool."""
+    return StreamingResponse(ndjson_lines(rows), media_type=NDJSON_MEDIA_TYPE)
+
 # Pydantic models
 class UserProfile(BaseModel):
     user_id: int
@@ -83,6 +366,10 @@ class RecommendationRequest(BaseModel):
     user_id: int
     force_refresh: Optional[bool] = False
 
+class CacheInvalidationRequest(BaseModel):
+    user_ids: Optional[List[int]] = []
+    skills: Optional[List[str]] = []
+
 class RecommendationResponse(BaseModel):
     user_id: int
     user_swap_count: int
@@ -94,45 +381,461 @@ class RecommendationResponse(BaseModel):
     cache_hit: bool
 
 # Data loading functions
+def run_engine_build(name: str, build: Callable[[], Any]) -> Any:
+    step_start = time.perf_counter()
+    result = build()
+    startup_state["engine_build_seconds"][name] = round(time.perf_counter() - step_start, 4)
+    return result
+
+def build_pending_engine(name: str):
+    """Build an engine deferred by LAZY_ENGINES, if it has not been built since the last load."""
+    with engine_build_lock:
+        build = pending_builds.pop(name, None)
+        if build is not None:
+            logger.info(f"Building lazy engine '{name}' on first use")
+            run_engine_build(name, build)
+
+async def ensure_engine(name: str):
+    """Make sure a lazily built engine is ready before serving from it."""
+    if name in pending_builds:
+        await run_in_threadpool(build_pending_engine, name)
+
+def load_engines(users_df: "pd.DataFrame", swaps_df: "pd.DataFrame", source: str = "csv",
+                 since: Optional[str] = None, changed_user_ids: Optional[List[int]] = None,
+                 added_swaps: Optional["pd.DataFrame"] = None):
+    """
+    Build every engine from users.csv/swaps.csv shaped frames.
+    
+    Engines are built as new instances while requests keep being served from
+    the current ones, then published together, before the data generation
+    moves on. With since (an incremental ingest) matrix factorization is
+    warm-started from the previous factors instead of trained from scratch,
+    and the swap matching only places the changed users when they are all
+    new and no earlier update of it is still deferred. When the change is
+    only added_swaps, appended to the previous swaps, the simple engine is
+    extended with them instead of rebuilt. Engines named in LAZY_ENGINES are only built on their first request.
+    """
+    from simple_recommendation_engine import SimpleRecommendationEngine
+    from faiss_engine import FAISSContentEngine
+    from collab_filter import CollaborativeFilterEngine
+    from mf_engine import MatrixFactorizationEngine
+    from skill_autocomplete import SkillAutocompleteIndex
+    from swap_matching import SwapMatchingEngine
+    from swap_cycles import SwapCycleEngine
+    
+    create_engines()
+    start = time.perf_counter()
+    built = {}
+    published = set()
+    # Deferred builds of an earlier load that never ran: their changes were
+    # never applied, so these engines cannot be updated incrementally
+    superseded = set()
+    
+    def require(name: str):
+        """The engine built for this load, building it now if it was deferred."""
+        if name not in built:
+            built[name] = run_engine_build(name, builders[name])
+        return built[name]
+    
+    def publish():
+        """Swap the engines built for this load into the module globals in one step."""
+        names = [name for name in built if name not in published]
+        globals().update({ENGINE_GLOBALS[name]: built[name] for name in names})
+        published.update(names)
+        for name in names:
+            pending_builds.pop(name, None)
+    
+    def build_lazy(name: str):
+        require(name)
+        publish()
+    
+    def build_simple():
+        if added_swaps is not None and "simple" not in superseded and recommendation_engine.swaps_df is not None:
+            engine = recommendation_engine.clone()
+            engine.add_swaps(added_swaps)
+            return engine
+        engine = SimpleRecommendationEngine()
+        engine.load_data(users_df, swaps_df)
+        return engine
+    
+    def build_cycles():
+        engine = SwapCycleEngine(CYCLE_MAX_LENGTH, CYCLE_TIME_BUDGET_MS / 1000)
+        engine.build(require("simple").seeking_index)
+        return engine
+    
+    def build_content():
+        engine = FAISSContentEngine(precision=VECTOR_PRECISION, background_similarity_build=True)
+        engine.load_data(users_df, swaps_df)
+        return engine
+    
+    def build_collaborative():
+        engine = CollaborativeFilterEngine(precision=VECTOR_PRECISION)
+        engine.load_data(users_df, swaps_df)
+        return engine
+    
+    def build_mf():
+        engine = MatrixFactorizationEngine()
+        user_skill_matrix = require("collaborative").user_skill_matrix
+        if since is not None and mf_engine.model is not None:
+            engine.model = mf_engine.model
+            engine.retrain(users_df, swaps_df, user_skill_matrix=user_skill_matrix)
+        else:
+            engine.load_data(users_df, swaps_df, user_skill_matrix=user_skill_matrix)
+        return engine
+    
+    def build_hybrid():
+        # Requests still ranking on the current ranker keep using its pool
+        ranker = new_hybrid_ranker(require("simple"), require("content"), require("collaborative"),
+                                   executor=hybrid_ranker.executor)
+        ranker.refresh(users_df, swaps_df)
+        return ranker
+    
+    def build_autocomplete():
+        index = SkillAutocompleteIndex()
+        index.build(require("content").skill_names, require("collaborative").skill_popularity_scores)
+        return index
+    
+    def build_matching():
+        availability = require("simple").availability
+        if since is not None and changed_user_ids is not None and "matching" not in superseded:
+            matcher = swap_matcher.clone()
+            matcher.apply_changes(users_df, swaps_df, changed_user_ids, availability)
+        else:
+            matcher = SwapMatchingEngine(MATCHING_TEACHER_CAPACITY, MATCHING_MIN_TEACHER_LEVEL)
+            matcher.load_data(users_df, swaps_df, availability)
+        return matcher
+    
+    def build_sharded():
+        # Rebuilt in place: its workers are processes, and each shard's pipe lock
+        # keeps queries off that shard while it is rebuilt
+        sharded_collab_engine.load_data(users_df, swaps_df)
+        return sharded_collab_engine
+    
+    # Every engine, in dependency order
+    builders = {
+        "simple": build_simple,
+        "cycles": build_cycles,
+        "content": build_content,
+        "collaborative": build_collaborative,
+        "mf": build_mf,
+        "hybrid": build_hybrid,
+        "autocomplete": build_autocomplete,
+        "matching": build_matching
+    }
+    if sharded_collab_engine is not None:
+        builders["sharded"] = build_sharded
+    
+    with engine_build_lock:
+        superseded.update(pending_builds)
+        for name in builders:
+            if name not in LAZY_ENGINES:
+                require(name)
+        for name in builders:
+            if name in LAZY_ENGINES and name not in built:
+                pending_builds[name] = lambda name=name: build_lazy(name)
+        publish()
+        
+        loaded_frames.update(users=users_df, swaps=swaps_df)
+        # Moved on after the engines are published: a computation that read
+        # the previous generation may have used the previous engines
+        data_state["generation"] += 1
+        # Batch output built for an earlier load no longer matches the engines
+        precomputed_store.data_generation = data_state["generation"]
+    data_state["loaded_at"] = datetime.now()
+    data_state["load_seconds"] = round(time.perf_counter() - start, 4)
+    data_state["source"] = source
+    data_state["since"] = since
+
 def load_sample_data():
     """Load sample data for demonstration."""
     try:
+        import pandas as pd
+        
         # Load sample CSV files
         users_df = pd.read_csv('data/users.csv')
         swaps_df = pd.read_csv('data/swaps.csv')
         
-        # Initialize all recommendation engines
-        recommendation_engine.load_data(users_df, swaps_df)
-        content_engine.load_data(users_df, swaps_df)
-        collab_engine.load_data(users_df, swaps_df)
-        
+        load_engines(users_df, swaps_df)
         logger.info("Sample data loaded successfully for all engines")
         return True
     except Exception as e:
         logger.error(f"Failed to load sample data: {e}")
         return False
 
+def current_users_frame() -> "pd.DataFrame":
+    """A copy of the users the engines were last built from, or the sample CSV if none are loaded."""
+    if loaded_frames["users"] is None:
+        import pandas as pd
+        return pd.read_csv('data/users.csv')
+    return loaded_frames["users"].copy()
+
 def get_cache_key(user_id: int) -> str:
     """Generate cache key for user recommendations."""
     return f"recommendations:{user_id}"
 
-def get_cached_recommendations(user_id: int) -> Optional[Dict]:
-    """Get cached recommendations for a user from in-memory cache."""
+def get_cached_recommendations(user_id: int, allow_stale: bool = False) -> Optional[Dict]:
+    """
+    Get cached recommendations for a user from in-memory cache.
+    
+    Expired entries are only returned with allow_stale, and only within the
+    stale window; past that they are evicted.
+    """
     cache_key = get_cache_key(user_id)
     cached_data = cache.get(cache_key)
-    if cached_data:
-        logger.debug(f"In-memory cache hit for user {user_id}")
+    if not cached_data:
+        return None
+    
+    expired_for = time.time() - cache_expiry.get(cache_key, float('inf'))
+    if expired_for > CACHE_STALE_SECONDS:
+        evict_cache_key(cache_key)
+        return None
+    if expired_for > 0 and not allow_stale:
+        return None
+    
+    logger.debug(f"In-memory cache hit for user {user_id}")
     return cached_data
 
-def cache_recommendations(user_id: int, recommendations: Dict, ttl_seconds: int = 3600):
-    """Cache recommendations in memory with TTL."""
+def is_cache_entry_stale(user_id: int) -> bool:
+    """Whether the cached entry for a user is past its TTL."""
+    return time.time() > cache_expiry.get(get_cache_key(user_id), float('inf'))
+
+def get_recommendation_dependencies(recommendations: Dict) -> set:
+    """
+    Users and skills a recommendation result was built from.
+    
+    Covers the user themself, recommended teachers, teachers from the learning
+    history, and every skill the user seeks or was recommended, since a change
+    to any other holder of those skills can change the best teacher.
+    """
+    dependencies = {('user', int(recommendations['user_id']))}
+    for rec in recommendations.get('skills_to_learn', []):
+        dependencies.add(('skill', rec['skill']))
+        if rec.get('recommended_by') is not None:
+            dependencies.add(('user', int(rec['recommended_by'])))
+    for skill in recommendations.get('seeking_skills', []):
+        dependencies.add(('skill', skill))
+    for session in recommendations.get('learning_history', []):
+        dependencies.add(('user', int(session['teacher_id'])))
+    return dependencies
+
+def unindex_cache_key(cache_key: str):
+    """Remove a cache entry's dependencies from the dependency index."""
+    for dependency in cache_dependencies.pop(cache_key, ()):
+        keys = dependency_index.get(dependency)
+        if keys is not None:
+            keys.discard(cache_key)
+            if not keys:
+                del dependency_index[dependency]
+
+def evict_cache_key(cache_key: str):
+    """Remove a cache entry together with its dependency index entries."""
+    with cache_index_lock:
+        cache.pop(cache_key, None)
+        cache_expiry.pop(cache_key, None)
+        cache_payloads.pop(cache_key, None)
+        cache_validators.pop(cache_key, None)
+        cache_encoded_bodies.pop(cache_key, None)
+        unindex_cache_key(cache_key)
+
+def invalidate_dependents(user_ids: List[int] = (), skills: List[str] = ()) -> List[str]:
+    """Evict every cache entry that depended on any of the given users or skills."""
+    dependencies = [('user', int(uid)) for uid in user_ids] + [('skill', skill) for skill in skills]
+    affected = set()
+    with cache_index_lock:
+        for dependency in dependencies:
+            affected.update(dependency_index.get(dependency, ()))
+    for cache_key in affected:
+        evict_cache_key(cache_key)
+    # The nightly rows of these users are as outdated as their cache entries
+    precomputed_store.invalidate([*user_ids, *(int(key.rsplit(':', 1)[1]) for key in affected)])
+    return sorted(affected)
+
+def clear_cache_entries() -> int:
+    """Drop every cached entry and its dependency index; returns how many there were."""
+    with cache_index_lock:
+        cache_size = len(cache)
+        cache.clear()
+        cache_expiry.clear()
+        cache_payloads.clear()
+        cache_validators.clear()
+        cache_encoded_bodies.clear()
+        cache_dependencies.clear()
+        dependency_index.clear()
+    return cache_size
+
+def cache_recommendations(user_id: int, recommendations: Dict, ttl_seconds: int = CACHE_TTL_SECONDS,
+                          generation: Optional[int] = None) -> Optional[Tuple[str, datetime]]:
+    """
+    Cache recommendations in memory with TTL; returns the (etag, cached_at) stored, or None.
+    
+    generation is the data generation read before computing them: if the data
+    was reloaded since, they came from the previous engines and are not cached.
+    """
+    if generation is not None and generation != data_state["generation"]:
+        logger.debug(f"Not caching recommendations for user {user_id} computed before a reload")
+        return None
     cache_key = get_cache_key(user_id)
-    recommendations['timestamp'] = datetime.now().isoformat()
-    recommendations['cached_at'] = datetime.now().isoformat()
+    cached_at = datetime.now()
+    recommendations['timestamp'] = cached_at.isoformat()
+    recommendations['cached_at'] = cached_at.isoformat()
+    
+    # Everything a hit needs is built first: this runs in the threadpool while the
+    # event loop keeps serving hits for the key, so the old entry stays whole until
+    # it is replaced, and cache[cache_key] is written last
+    payload = serialize_recommendation_response(recommendations, cache_hit=True)
+    # Weak: the cache-hit and fresh bodies differ only in the cache_hit flag
+    etag = 'W/' + build_etag(f"g{data_state['generation']}", user_id, int(cached_at.timestamp() * 1000000))
+    dependencies = get_recommendation_dependencies(recommendations)
     
-    # Store in in-memory cache
-    cache[cache_key] = recommendations
+    with cache_index_lock:
+        unindex_cache_key(cache_key)
+        cache_expiry[cache_key] = time.time() + ttl_seconds
+        cache_payloads[cache_key] = payload
+        cache_encoded_bodies[cache_key] = {}
+        cache_validators[cache_key] = (etag, cached_at)
+        cache_dependencies[cache_key] = dependencies
+        for dependency in dependencies:
+            dependency_index[dependency].add(cache_key)
+        cache[cache_key] = recommendations
     logger.debug(f"Cached recommendations for user {user_id} in memory")
+    return etag, cached_at
+
+def recommendation_response(request: Request, user_id: int, body: Optional[bytes] = None,
+                            cached: Optional[Dict] = None,
+                            validators: Optional[Tuple[str, datetime]] = None) -> Response:
+    """
+    Respond with a user's recommendations, honouring conditional GET.
+    
+    With body (a freshly computed response), validators are the ones
+    cache_recommendations returned for it; without them no ETag is sent.
+    Without body, cached is the entry the caller read: its cache_hit=true
+    payload, compressed variants and validators are served if it is still
+    the cached entry, and it is encoded without validators otherwise.
+    """
+    cache_key = get_cache_key(user_id)
+    encoded_bodies = None
+    if body is None:
+        with cache_index_lock:
+            if cache.get(cache_key) is cached:
+                body = cache_payloads.get(cache_key)
+                encoded_bodies = cache_encoded_bodies.get(cache_key)
+                validators = cache_validators.get(cache_key)
+        if body is None:
+            # Replaced or evicted since the caller read the entry
+            body = serialize_recommendation_response(cached, cache_hit=True)
+    if validators is None:
+        return Response(content=body, media_type="application/json")
+    
+    etag, last_modified = validators
+    return conditional_response(request, body, etag, last_modified, RESPONSE_COMPRESSION_MIN_BYTES, encoded_bodies)
+
+def serialize_recommendation_response(recommendations: Dict, cache_hit: bool) -> bytes:
+    """Validate against RecommendationResponse once and encode the response body."""
+    response = RecommendationResponse(**{**recommendations, 'cache_hit': cache_hit})
+    return dumps(response.model_dump())
+
+def compute_recommendations(user_id: int) -> Tuple[Dict, Optional[Tuple[str, datetime]]]:
+    """Generate, cache and save recommendations for a user (blocking); returns them with their cache validators."""
+    generation = data_state["generation"]
+    recommendations = recommendation_engine.get_recommendations(user_id)
+    validators = cache_recommendations(user_id, recommendations, generation=generation)
+    
+    # Save recommendations as JSON file in 'recommendation' folder
+    os.makedirs("recommendation", exist_ok=True)
+    file_path = os.path.join("recommendation", f"user_{user_id}_recommendation.json")
+    with open(file_path, "wb") as f:
+        f.write(dumps(recommendations, indent=True))
+    
+    return recommendations, validators
+
+async def get_or_compute_recommendations(user_id: int) -> Tuple[Dict, Optional[Tuple[str, datetime]]]:
+    """
+    Compute recommendations for a user, coalescing concurrent calls.
+    
+    The first caller runs the computation in the threadpool; callers arriving
+    while it is in flight wait on the same future instead of recomputing.
+    Returns them with the cache validators stored for them (None if not cached).
+    """
+    cache_key = get_cache_key(user_id)
+    pending = inflight_computations.get(cache_key)
+    if pending is not None:
+        cache_counters['coalesced'] += 1
+        recommendations, validators = await asyncio.shield(pending)
+        return dict(recommendations), validators
+    
+    future = asyncio.get_running_loop().create_future()
+    # Mark the exception as retrieved if nobody else was waiting
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    inflight_computations[cache_key] = future
+    try:
+        cache_counters['computed'] += 1
+        recommendations, validators = await run_in_threadpool(compute_recommendations, user_id)
+        future.set_result((recommendations, validators))
+        return dict(recommendations), validators
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        inflight_computations.pop(cache_key, None)
+
+def schedule_cache_refresh(user_id: int):
+    """Refresh a stale cache entry in the background, unless a refresh is already running."""
+    if get_cache_key(user_id) in inflight_computations:
+        return
+    
+    async def refresh():
+        try:
+            await get_or_compute_recommendations(user_id)
+        except Exception as e:
+            logger.error(f"Background cache refresh failed for user {user_id}: {e}")
+    
+    task = asyncio.create_task(refresh())
+    background_refreshes.add(task)
+    task.add_done_callback(background_refreshes.discard)
+
+def load_access_counts():
+    """Restore per-user request counts saved by the previous process."""
+    try:
+        with open(ACCESS_COUNTS_FILE, encoding="utf-8") as f:
+            access_counts.update({int(user_id): count for user_id, count in json.load(f).items()})
+        logger.info(f"Loaded access counts for {len(access_counts)} users")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Failed to load access counts: {e}")
+
+def save_access_counts():
+    """Persist per-user request counts so the next process can warm the same users."""
+    try:
+        with open(ACCESS_COUNTS_FILE, "w", encoding="utf-8") as f:
+            json.dump(dict(access_counts.most_common(10000)), f)
+    except Exception as e:
+        logger.warning(f"Failed to save access counts: {e}")
+
+async def warm_cache(top_n: int, startup: bool = False):
+    """Precompute recommendations for the top-N most requested users."""
+    user_ids = [user_id for user_id, _ in access_counts.most_common(top_n)]
+    warmup_state.update(status="running", startup=startup, warmed_users=0, target_users=len(user_ids),
+                        started_at=datetime.now().isoformat())
+    logger.info(f"Warming cache for {len(user_ids)} most requested users")
+    
+    for user_id in user_ids:
+        try:
+            await get_or_compute_recommendations(user_id)
+            warmup_state["warmed_users"] += 1
+        except Exception as e:
+            logger.warning(f"Cache warm-up failed for user {user_id}: {e}")
+    
+    warmup_state.update(status="done", finished_at=datetime.now().isoformat())
+    is_ready()
+    logger.info(f"Cache warm-up finished ({warmup_state['warmed_users']} users)")
+
+def start_cache_warmup(top_n: int, startup: bool = False):
+    """Run warm-up in the background; during startup, /ready reports warming until it finishes."""
+    warmup_state.update(status="running", startup=startup)
+    task = asyncio.create_task(warm_cache(top_n, startup))
+    background_refreshes.add(task)
+    task.add_done_callback(background_refreshes.discard)
 
 def update_user_profile_background(user_id: int, bio: str, skills: List[str]):
     """Background task to update user profile and refresh recommendations."""
@@ -140,21 +843,59 @@ def update_user_profile_background(user_id: int, bio: str, skills: List[str]):
         logger.info(f"Updating profile for user {user_id}")
         
         # Force refresh recommendations
+        generation = data_state["generation"]
         recommendations = recommendation_engine.get_recommendations(user_id)
-        cache_recommendations(user_id, recommendations)
+        cache_recommendations(user_id, recommendations, generation=generation)
         
         logger.info(f"Profile updated and recommendations refreshed for user {user_id}")
     except Exception as e:
         logger.error(f"Background update failed for user {user_id}: {e}")
 
+async def load_startup_data():
+    """Create the engines, load the sample data, then warm the cache; /ready turns 200 once all are done."""
+    await run_in_threadpool(create_engines)
+    async with ingest_lock:
+        loaded = await run_in_threadpool(load_sample_data)
+    if not loaded:
+        logger.warning("Failed to load sample data. Some endpoints may not work properly.")
+    
+    if CACHE_WARMUP_TOP_N > 0:
+        start_cache_warmup(CACHE_WARMUP_TOP_N, startup=True)
+    is_ready()
+
+def is_ready() -> bool:
+    """Data is loaded and the startup warm-up is over; records the time to first readiness."""
+    ready = data_state["generation"] > 0 and not (warmup_state["status"] == "running" and warmup_state.get("startup"))
+    if ready and startup_state["ready_seconds"] is None:
+        startup_state["ready_seconds"] = round(time.perf_counter() - IMPORT_STARTED, 4)
+    return ready
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize the application on startup."""
+    """
+    Initialize the application on startup.
+    
+    In background mode the port opens right away and data loads in a task
+    (/ready reports 503 until it is done); in eager mode startup waits for it.
+    """
     logger.info("Starting Simple Skill Swap Recommendation Engine...")
     
-    # Load sample data
-    if not load_sample_data():
-        logger.warning("Failed to load sample data. Some endpoints may not work properly.")
+    load_access_counts()
+    if STARTUP_MODE == "eager":
+        await load_startup_data()
+    else:
+        task = asyncio.create_task(load_startup_data())
+        background_refreshes.add(task)
+        task.add_done_callback(background_refreshes.discard)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release worker pools and persist request counts on shutdown."""
+    if hybrid_ranker is not None:
+        hybrid_ranker.shutdown()
+    if sharded_collab_engine is not None:
+        sharded_collab_engine.shutdown()
+    save_access_counts()
 
 # Serve static files (CSS, JS, images)
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -169,46 +910,73 @@ async def read_root(request: Request):
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """Liveness check: the process is up and serving. Use /ready to know whether data is loaded."""
     return {
         "status": "healthy",
+        "ready": is_ready(),
         "timestamp": datetime.now().isoformat(),
         "cache_type": "in_memory",
-        "cache_size": len(cache)
+        "cache_size": len(cache),
+        "cache_warmup": warmup_state
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check. Returns 503 until data is loaded and the startup cache warm-up has finished."""
+    ready = is_ready()
+    readiness = {
+        "status": "ready" if ready else ("warming" if data_state["generation"] > 0 else "loading"),
+        "data_generation": data_state["generation"],
+        "lazy_engines_pending": sorted(pending_builds),
+        "cache_warmup": warmup_state,
+        "timestamp": datetime.now().isoformat()
+    }
+    if not ready:
+        return JSONResponse(status_code=503, content=readiness)
+    return readiness
+
 @app.get("/recommend/{user_id}", response_model=RecommendationResponse)
-async def get_recommendations(user_id: int, force_refresh: bool = False, auth: bool = Depends(verify_api_key)):
+async def get_recommendations(user_id: int, request: Request, force_refresh: bool = False,
+                              auth: bool = Depends(verify_api_key)):
     """
     Get skill recommendations for a user.
     
+    Responses carry ETag/Last-Modified; a matching If-None-Match on a cached
+    entry returns 304 without touching the body.
+    
     Args:
         user_id: The user ID to get recommendations for
         force_refresh: Force refresh recommendations (bypass cache)
     """
     try:
+        access_counts[user_id] += 1
+        
         # Check cache first (unless force refresh)
         if not force_refresh:
-            cached_recs = get_cached_recommendations(user_id)
+            cached_recs = get_cached_recommendations(user_id, allow_stale=True)
             if cached_recs:
-                cached_recs['cache_hit'] = True
-                return RecommendationResponse(**cached_recs)
+                # Serve expired entries while a background refresh replaces them
+                if is_cache_entry_stale(user_id):
+                    cache_counters['stale_served'] += 1
+                    schedule_cache_refresh(user_id)
+                return recommendation_response(request, user_id, cached=cached_recs)
+            
+            # Serve from the nightly batch output while it is fresh
+            generation = data_state["generation"]
+            precomputed = precomputed_store.get(user_id)
+            if precomputed:
+                recommendations = precomputed['simple']
+                validators = cache_recommendations(user_id, recommendations, generation=generation)
+                return recommendation_response(
+                    request, user_id, serialize_recommendation_response(recommendations, cache_hit=False),
+                    validators=validators)
         
-        # Generate new recommendations
-        recommendations = recommendation_engine.get_recommendations(user_id)
-        recommendations['cache_hit'] = False
+        # Generate new recommendations (concurrent misses share one computation)
+        recommendations, validators = await get_or_compute_recommendations(user_id)
         
-        # Cache the results
-        cache_recommendations(user_id, recommendations)
-        
-        # Save recommendations as JSON file in 'recommendation' folder
-        import os, json
-        os.makedirs("recommendation", exist_ok=True)
-        file_path = os.path.join("recommendation", f"user_{user_id}_recommendation.json")
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(recommendations, f, ensure_ascii=False, indent=2)
-        
-        return RecommendationResponse(**recommendations)
+        return recommendation_response(
+            request, user_id, serialize_recommendation_response(recommendations, cache_hit=False),
+            validators=validators)
         
     except Exception as e:
         logger.error(f"Error getting recommendations for user {user_id}: {e}")
@@ -224,11 +992,12 @@ async def trigger_recommendations(request: RecommendationRequest, background_tas
         user_id = request.user_id
         
         # Force refresh recommendations
+        generation = data_state["generation"]
         recommendations = recommendation_engine.get_recommendations(user_id)
         recommendations['cache_hit'] = False
         
         # Cache the results
-        cache_recommendations(user_id, recommendations)
+        cache_recommendations(user_id, recommendations, generation=generation)
         
         # Add background task to update models if needed
         background_tasks.add_task(update_user_profile_background, user_id, "", [])
@@ -258,6 +1027,9 @@ async def update_user_profile(user_profile: UserProfile, background_tasks: Backg
         # In a real application, this would update the database
         logger.info(f"Updating profile for user {user_id}")
         
+        # Drop cached recommendations of learners who depend on this user
+        invalidated = invalidate_dependents(user_ids=[user_id], skills=user_profile.skills or [])
+        
         # Add background task to refresh recommendations
         background_tasks.add_task(
             update_user_profile_background, 
@@ -269,6 +1041,7 @@ async def update_user_profile(user_profile: UserProfile, background_tasks: Backg
         return {
             "message": "Profile update initiated",
             "user_id": user_id,
+            "invalidated_entries": len(invalidated),
             "timestamp": datetime.now().isoformat()
         }
         
@@ -284,7 +1057,7 @@ async def clear_user_cache(user_id: int, auth: bool = Depends(verify_api_key)):
         
         # Clear in-memory cache
         if cache_key in cache:
-            del cache[cache_key]
+            evict_cache_key(cache_key)
             logger.info(f"Cleared in-memory cache for user {user_id}")
         
         return {
@@ -298,31 +1071,170 @@ async def clear_user_cache(user_id: int, auth: bool = Depends(verify_api_key)):
         logger.error(f"Error clearing cache for user {user_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to clear cache: {str(e)}")
 
+@app.post("/cache/invalidate")
+async def invalidate_cache(request: CacheInvalidationRequest, auth: bool = Depends(verify_api_key)):
+    """
+    Invalidate only the cached recommendations that depended on the given users or skills,
+    e.g. every learner pointed at a teacher whose rating just changed.
+    """
+    try:
+        invalidated = invalidate_dependents(request.user_ids or [], request.skills or [])
+        logger.info(f"Invalidated {len(invalidated)} cache entries for users {request.user_ids} and skills {request.skills}")
+        
+        return {
+            "message": "Dependent cache entries invalidated",
+            "user_ids": request.user_ids,
+            "skills": request.skills,
+            "invalidated_entries": len(invalidated),
+            "invalidated_keys": invalidated,
+            "remaining_entries": len(cache),
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"Error invalidating cache: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to invalidate cache: {str(e)}")
+
+@app.post("/data/ingest")
+async def ingest_data(request: Request, format: Optional[str] = None, since: Optional[str] = None,
+                      auth: bool = Depends(verify_api_key)):
+    """
+    Load users/swaps in the shape of the Node backend's /api/recommendations/data.
+    
+    The body is the JSON payload or NDJSON rows (chosen by format, else by
+    Content-Type) and is parsed as it streams in. Without since it replaces
+    all data and flushes the cache. With since it holds the changes after
+    that marker: changed users' rows are replaced, new swaps appended, matrix
+    factorization is warm-started and only cache entries depending on the
+    changed users and their skills are invalidated.
+    """
+    from data_ingest import INGEST_FORMATS, RowCollector, StreamingRecordParser, merge_delta
+    
+    if format is None:
+        format = 'ndjson' if 'ndjson' in request.headers.get('content-type', '') else 'json'
+    if format not in INGEST_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format '{format}'. Use one of: {', '.join(INGEST_FORMATS)}")
+    
+    start = time.perf_counter()
+    try:
+        parser = StreamingRecordParser(format)
+        collector = RowCollector()
+        async for chunk in request.stream():
+            collector.extend(parser.feed(chunk))
+        collector.extend(parser.close())
+        users_df, swaps_df = collector.frames()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid ingest body: {str(e)}")
+    parse_seconds = time.perf_counter() - start
+    
+    try:
+        async with ingest_lock:
+            if since is None:
+                await run_in_threadpool(load_engines, users_df, swaps_df, "ingest")
+                invalidated = clear_cache_entries()
+            else:
+                previous_users = loaded_frames["users"] if loaded_frames["users"] is not None else users_df.iloc[:0]
+                previous_swaps = loaded_frames["swaps"] if loaded_frames["swaps"] is not None else swaps_df.iloc[:0]
+                changed_users = set(users_df['user_id'].tolist())
+                changed_users.update(swaps_df['user_id_of_learner'].tolist(), swaps_df['user_id_of_teacher'].tolist())
+                changed_skills = set(users_df['skills'])
+                changed_skills.update(previous_users.loc[previous_users['user_id'].isin(changed_users), 'skills'])
+                
+                merged_users, merged_swaps = merge_delta(previous_users, previous_swaps, users_df, swaps_df)
+                added_swaps = None
+                if users_df.empty and not previous_swaps.duplicated().any():
+                    # Only new swaps, which merge_delta appended after the previous ones
+                    added_swaps = merged_swaps.iloc[len(previous_swaps):]
+                await run_in_threadpool(load_engines, merged_users, merged_swaps, "ingest", since,
+                                        sorted(changed_users), added_swaps)
+                invalidated = len(invalidate_dependents(sorted(changed_users), sorted(changed_skills)))
+        
+        logger.info(f"Ingested {len(users_df)} user rows and {len(swaps_df)} swaps "
+                    f"({'since ' + since if since else 'full load'})")
+        return {
+            "message": "Data ingested successfully",
+            "mode": "incremental" if since is not None else "full",
+            "since": since,
+            "users_rows": len(users_df),
+            "swaps_rows": len(swaps_df),
+            "total_users_rows": len(loaded_frames["users"]),
+            "total_swaps_rows": len(loaded_frames["swaps"]),
+            "invalidated_entries": invalidated,
+            "data_generation": data_state["generation"],
+            "parse_seconds": round(parse_seconds, 4),
+            "load_seconds": data_state["load_seconds"],
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"Error ingesting data: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to ingest data: {str(e)}")
+
 @app.get("/stats")
-async def get_stats():
-    """Get system statistics."""
+async def get_stats(request: Request):
+    """
+    Get system statistics.
+    
+    Engine statistics are maintained as data loads, so this is a constant-time
+    read regardless of data size. The weak ETag is the data generation plus a
+    STATS_ETAG_WINDOW_SECONDS time window and is checked before anything is
+    built, so pollers get 304 within a window and the live counters are never
+    staler than one window.
+    """
+    window = int(time.time() // STATS_ETAG_WINDOW_SECONDS) if STATS_ETAG_WINDOW_SECONDS > 0 else time.time_ns()
+    etag = 'W/' + build_etag("stats", f"g{data_state['generation']}", window)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
     try:
         # Get stats from all engines
         simple_stats = recommendation_engine.get_stats()
         content_stats = content_engine.get_stats()
         collab_stats = collab_engine.get_stats()
+        mf_stats = mf_engine.get_stats()
         
         # Get cache stats
         cache_stats = {
             "size": len(cache),
-            "type": "in_memory"
+            "type": "in_memory",
+            "ttl_seconds": CACHE_TTL_SECONDS,
+            "stale_seconds": CACHE_STALE_SECONDS,
+            "inflight": len(inflight_computations),
+            "computed": cache_counters['computed'],
+            "coalesced": cache_counters['coalesced'],
+            "stale_served": cache_counters['stale_served'],
+            "tracked_users": len(access_counts),
+            "dependency_index_size": len(dependency_index),
+            "warmup": warmup_state
         }
         
-        return {
-            "timestamp": datetime.now().isoformat(),
+        stats = {
+            "data_generation": data_state["generation"],
+            "data_loaded_at": data_state["loaded_at"].isoformat() if data_state["loaded_at"] else None,
+            "data_load_seconds": data_state["load_seconds"],
+            "data_source": data_state["source"],
+            "data_since": data_state["since"],
+            "startup": {**startup_state, "ready": is_ready(), "lazy_engines_pending": sorted(pending_builds)},
             "cache_stats": cache_stats,
+            "admission": {
+                "endpoints": admission_controller.get_stats(),
+                "rate_limit": rate_limiter.get_stats() if rate_limiter is not None else None
+            },
+            "precomputed_store": precomputed_store.get_stats(),
+            "skill_autocomplete": skill_autocomplete.get_stats(),
+            "swap_matching": swap_matcher.get_stats(),
+            "swap_cycles": swap_cycles.get_stats(),
             "engines": {
                 "simple_engine": simple_stats,
                 "content_engine": content_stats,
-                "collaborative_engine": collab_stats
+                "collaborative_engine": collab_stats,
+                "matrix_factorization_engine": mf_stats,
+                "sharded_collaborative_engine": sharded_collab_engine.get_stats() if sharded_collab_engine else {}
             }
         }
         
+        body = dumps({"timestamp": datetime.now().isoformat(), **stats})
+        return conditional_response(request, body, etag, None, RESPONSE_COMPRESSION_MIN_BYTES)
+        
     except Exception as e:
         logger.error(f"Error getting stats: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get stats: {str(e)}")
@@ -331,6 +1243,17 @@ async def get_stats():
 async def get_content_recommendations(user_id: int, n_recommendations: int = 5, auth: bool = Depends(verify_api_key)):
     """Get content-based recommendations for a user."""
     try:
+        precomputed = precomputed_store.get(user_id, n_recommendations)
+        if precomputed is not None:
+            return {
+                "user_id": user_id,
+                "recommendation_type": "content_based",
+                "user_skills": precomputed['user_skills'],
+                "recommendations": precomputed['content'][:n_recommendations],
+                "source": "precomputed",
+                "timestamp": datetime.now().isoformat()
+            }
+        
         # Get user's skills from the simple engine
         user_skills = []
         if recommendation_engine.users_df is not None:
@@ -350,13 +1273,48 @@ async def get_content_recommendations(user_id: int, n_recommendations: int = 5,
         raise HTTPException(status_code=500, detail=f"Failed to get content recommendations: {str(e)}")
 
 @app.get("/recommend/collaborative/{user_id}")
-async def get_collaborative_recommendations(user_id: int, n_recommendations: int = 5, auth: bool = Depends(verify_api_key)):
-    """Get collaborative filtering recommendations for a user."""
+async def get_collaborative_recommendations(user_id: int, n_recommendations: int = 5, mode: str = "user",
+                                            auth: bool = Depends(verify_api_key)):
+    """
+    Get collaborative filtering recommendations for a user.
+    
+    Args:
+        user_id: The user ID to get recommendations for
+        n_recommendations: Number of skills to return
+        mode: 'user' for user-user neighbors, 'item' for precomputed skill-skill neighbors
+    """
+    if mode not in collab_engine.RECOMMENDATION_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode '{mode}'. Use one of: {', '.join(collab_engine.RECOMMENDATION_MODES)}")
+    
     try:
-        recommendations = collab_engine.get_recommendations(user_id, n_recommendations)
+        precomputed = precomputed_store.get(user_id, n_recommendations) if mode == 'user' else None
+        if precomputed is not None:
+            return {
+                "user_id": user_id,
+                "recommendation_type": "collaborative",
+                "mode": mode,
+                "recommendations": precomputed['collaborative'][:n_recommendations],
+                "source": "precomputed",
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        if mode == 'user' and sharded_collab_engine is not None:
+            recommendations = await run_in_threadpool(sharded_collab_engine.get_recommendations, user_id,
+                                                      n_recommendations)
+            return {
+                "user_id": user_id,
+                "recommendation_type": "collaborative",
+                "mode": mode,
+                "recommendations": recommendations,
+                "source": "sharded",
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        recommendations = collab_engine.get_recommendations(user_id, n_recommendations, mode=mode)
         return {
             "user_id": user_id,
             "recommendation_type": "collaborative",
+            "mode": mode,
             "recommendations": recommendations,
             "timestamp": datetime.now().isoformat()
         }
@@ -364,6 +1322,81 @@ async def get_collaborative_recommendations(user_id: int, n_recommendations: int
         logger.error(f"Error getting collaborative recommendations for user {user_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get collaborative recommendations: {str(e)}")
 
+@app.get("/recommend/hybrid/{user_id}")
+async def get_hybrid_recommendations(user_id: int, n_recommendations: int = 5, auth: bool = Depends(verify_api_key)):
+    """
+    Get blended recommendations from the simple, content and collaborative engines.
+    
+    The engines run concurrently; any engine that misses its deadline is skipped
+    and the response is flagged as partial instead of failing.
+    """
+    try:
+        return await hybrid_ranker.rank(user_id, n_recommendations)
+    except Exception as e:
+        logger.error(f"Error getting hybrid recommendations for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get hybrid recommendations: {str(e)}")
+
+@app.get("/recommend/mf/{user_id}")
+async def get_mf_recommendations(user_id: int, n_recommendations: int = 5, auth: bool = Depends(verify_api_key)):
+    """Get matrix factorization recommendations for a user."""
+    try:
+        await ensure_engine("mf")
+        recommendations = mf_engine.get_recommendations(user_id, n_recommendations)
+        return {
+            "user_id": user_id,
+            "recommendation_type": "matrix_factorization",
+            "recommendations": recommendations,
+            "model_trained_at": mf_engine.last_trained,
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"Error getting matrix factorization recommendations for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get matrix factorization recommendations: {str(e)}")
+
+@app.get("/recommend/suggested-teacher/{user_id}")
+async def get_suggested_teacher(user_id: int, auth: bool = Depends(verify_api_key)):
+    """
+    Precomputed teacher for each skill the user seeks, from the global swap matching.
+    
+    Teachers are shared out across all learners under a capacity limit, so a
+    popular teacher is not suggested to everyone; skills left without a free
+    teacher are listed as unmatched.
+    """
+    try:
+        await ensure_engine("matching")
+        if user_id not in swap_matcher.known_users:
+            raise HTTPException(status_code=404, detail="User ID not found")
+        return {
+            "user_id": user_id,
+            "recommendation_type": "swap_matching",
+            **swap_matcher.get_suggested_teachers(user_id),
+            "matching_built_at": swap_matcher.last_built,
+            "timestamp": datetime.now().isoformat()
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting suggested teachers for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get suggested teachers: {str(e)}")
+
+@app.post("/mf/retrain")
+async def retrain_mf_model(background_tasks: BackgroundTasks, auth: bool = Depends(verify_api_key)):
+    """
+    Retrain the matrix factorization model in the background.
+    The previous factors keep serving requests and seed the new training run.
+    """
+    try:
+        await ensure_engine("mf")
+        background_tasks.add_task(mf_engine.retrain, user_skill_matrix=collab_engine.user_skill_matrix)
+        return {
+            "message": "Matrix factorization retraining started",
+            "previous_model_trained_at": mf_engine.last_trained,
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"Error starting matrix factorization retraining: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to start retraining: {str(e)}")
+
 @app.get("/similar-skills/{skill_name}")
 async def get_similar_skills(skill_name: str, n_recommendations: int = 5, 
                            difficulty_filter: Optional[str] = None, auth: bool = Depends(verify_api_key)):
@@ -415,6 +1448,19 @@ async def get_skills_by_category(category: str, difficulty_level: Optional[str]
         logger.error(f"Error getting skills by category {category}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get skills by category: {str(e)}")
 
+@app.get("/skills/autocomplete")
+async def autocomplete_skills(prefix: str, limit: int = 10, auth: bool = Depends(verify_api_key)):
+    """Most popular skill names starting with the prefix (case-insensitive), for type-ahead."""
+    try:
+        return {
+            "prefix": prefix,
+            "suggestions": skill_autocomplete.complete(prefix, limit),
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"Error autocompleting skills for prefix {prefix}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to autocomplete skills: {str(e)}")
+
 @app.get("/skills/search")
 async def search_skills_by_keywords(keywords: str, difficulty_level: Optional[str] = None,
                                   n_recommendations: int = 5, auth: bool = Depends(verify_api_key)):
@@ -496,68 +1542,98 @@ async def get_user_status(user_id: int, auth: bool = Depends(verify_api_key)):
         logger.error(f"Error getting user status for user {user_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get user status: {str(e)}")
 
+def active_session_entries() -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Swap row and role of each active user's listing, in listing order.
+    
+    Users are listed once, with their first swap active today in swap order,
+    the learner of a swap before its teacher.
+    """
+    availability = recommendation_engine.availability
+    active = np.flatnonzero(availability.active_swaps())
+    users = np.column_stack([availability.learners[active], availability.teachers[active]]).ravel()
+    _, first = np.unique(users, return_index=True)
+    first.sort()
+    return active[first // 2], first % 2 == 1
+
+def iter_active_sessions(rows: np.ndarray, teaching: np.ndarray) -> Iterator[Dict]:
+    swaps_df = recommendation_engine.swaps_df
+    learners = swaps_df['user_id_of_learner'].to_numpy()
+    teachers = swaps_df['user_id_of_teacher'].to_numpy()
+    starts = swaps_df['starting_date_of_learning_or_teaching'].to_numpy()
+    ends = swaps_df['ending_date_of_learning_or_teaching'].to_numpy()
+    for row, is_teacher in zip(rows.tolist(), teaching.tolist()):
+        user_id, partner_id = (teachers[row], learners[row]) if is_teacher else (learners[row], teachers[row])
+        yield {
+            "user_id": int(user_id),
+            "role": "teacher" if is_teacher else "learner",
+            "partner_id": int(partner_id),
+            "start_date": starts[row],
+            "end_date": ends[row]
+        }
+
 @app.get("/users/active-sessions")
-async def get_active_sessions(auth: bool = Depends(verify_api_key)):
-    """Get all users with active learning sessions."""
+async def get_active_sessions(request: Request, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                              format: Optional[str] = None, auth: bool = Depends(verify_api_key),
+                              admitted: None = Depends(admission("active_sessions"))):
+    """
+    Get users with active learning sessions, a page at a time.
+    
+    Args:
+        cursor: next_cursor of the previous page; pages belong to one data load and day
+        limit: Users per page
+        format: 'ndjson' (or Accept: application/x-ndjson) streams every user from the cursor on, one per line
+    """
+    state, stream = list_request(request, cursor, limit, format)
     try:
         if recommendation_engine.swaps_df is None:
-            return {"active_users": []}
+            return {"active_users": [], "count": 0, "next_cursor": None}
         
-        active_users = []
-        current_date = datetime.now().date()
+        rows, teaching = await run_in_threadpool(active_session_entries)
+        snapshot = {"g": data_state["generation"], "d": recommendation_engine.availability.day}
+        start = state.get("i", 0)
+        if state and (not isinstance(start, int) or start < 0 or
+                      {"g": state.get("g"), "d": state.get("d")} != snapshot):
+            raise HTTPException(status_code=400, detail="Cursor is stale or invalid; start again without a cursor")
         
-        for _, swap in recommendation_engine.swaps_df.iterrows():
-            try:
-                start_date = datetime.strptime(swap['starting_date_of_learning_or_teaching'], '%Y-%m-%d').date()
-                end_date = datetime.strptime(swap['ending_date_of_learning_or_teaching'], '%Y-%m-%d').date()
-                
-                if start_date <= current_date <= end_date:
-                    # Check if user already in list
-                    learner_exists = any(u['user_id'] == swap['user_id_of_learner'] for u in active_users)
-                    teacher_exists = any(u['user_id'] == swap['user_id_of_teacher'] for u in active_users)
-                    
-                    if not learner_exists:
-                        active_users.append({
-                            "user_id": swap['user_id_of_learner'],
-                            "role": "learner",
-                            "partner_id": swap['user_id_of_teacher'],
-                            "start_date": swap['starting_date_of_learning_or_teaching'],
-                            "end_date": swap['ending_date_of_learning_or_teaching']
-                        })
-                    
-                    if not teacher_exists:
-                        active_users.append({
-                            "user_id": swap['user_id_of_teacher'],
-                            "role": "teacher",
-                            "partner_id": swap['user_id_of_learner'],
-                            "start_date": swap['starting_date_of_learning_or_teaching'],
-                            "end_date": swap['ending_date_of_learning_or_teaching']
-                        })
-            except:
-                continue
+        rows, teaching = rows[start:], teaching[start:]
+        if stream:
+            return ndjson_response(iter_active_sessions(rows, teaching))
         
+        active_users, has_more = take_page(iter_active_sessions(rows, teaching), limit)
         return {
             "active_users": active_users,
             "count": len(active_users),
+            "next_cursor": encode_cursor({"i": start + limit, **snapshot}) if has_more else None,
             "timestamp": datetime.now().isoformat()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting active sessions: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get active sessions: {str(e)}")
 
 @app.post("/cache/flush")
-async def flush_cache(auth: bool = Depends(verify_api_key)):
-    """Flush all cached data from memory."""
+async def flush_cache(rewarm_top_n: int = 0, auth: bool = Depends(verify_api_key)):
+    """
+    Flush all cached data from memory.
+    
+    Args:
+        rewarm_top_n: Recompute this many of the most requested users in the background after flushing
+    """
     try:
-        cache_size = len(cache)
-        cache.clear()
+        cache_size = clear_cache_entries()
         
         logger.info(f"Flushed {cache_size} cached items from memory")
         
+        if rewarm_top_n > 0:
+            start_cache_warmup(rewarm_top_n)
+        
         return {
             "message": "Cache flushed successfully",
             "cleared_items": cache_size,
+            "rewarming_users": min(rewarm_top_n, len(access_counts)) if rewarm_top_n > 0 else 0,
             "timestamp": datetime.now().isoformat()
         }
         
@@ -566,14 +1642,33 @@ async def flush_cache(auth: bool = Depends(verify_api_key)):
         raise HTTPException(status_code=500, detail=f"Failed to flush cache: {str(e)}")
 
 @app.get("/cache/keys")
-async def get_cache_keys(auth: bool = Depends(verify_api_key)):
-    """Get list of all cache keys in memory."""
+async def get_cache_keys(request: Request, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                         format: Optional[str] = None, auth: bool = Depends(verify_api_key)):
+    """
+    Get cache keys in memory in sorted order, a page at a time.
+    
+    Args:
+        cursor: next_cursor of the previous page
+        limit: Keys per page
+        format: 'ndjson' (or Accept: application/x-ndjson) streams every key from the cursor on, one per line
+    """
+    state, stream = list_request(request, cursor, limit, format)
+    after = state.get("after")
+    if after is not None and not isinstance(after, str):
+        raise HTTPException(status_code=400, detail="Malformed cursor")
     try:
-        cache_keys = list(cache.keys())
+        # Keys added or evicted while paging are seen or skipped by their place in the order
+        keys = sorted(cache)
+        start = bisect.bisect_right(keys, after) if after is not None else 0
+        if stream:
+            return ndjson_response({"key": key} for key in itertools.islice(keys, start, None))
         
+        cache_keys = keys[start:start + limit]
+        has_more = start + limit < len(keys)
         return {
             "cache_keys": cache_keys,
-            "total_keys": len(cache_keys),
+            "total_keys": len(keys),
+            "next_cursor": encode_cursor({"after": cache_keys[-1]}) if has_more else None,
             "timestamp": datetime.now().isoformat()
         }
         
@@ -581,94 +1676,255 @@ async def get_cache_keys(auth: bool = Depends(verify_api_key)):
         logger.error(f"Error getting cache keys: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get cache keys: {str(e)}")
 
+def compute_tfidf_recommendations(user_id: int, n_recommendations: int) -> Dict:
+    """Body of /recommend/tfidf; it refits per call, so it runs in the threadpool, off the event loop."""
+    # Deferred so sklearn is not imported at startup
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+    from vector_precision import compute_dtype
+    
+    users_df = current_users_frame()
+    users_df['combined_features'] = users_df.apply(lambda row: ' '.join([
+        str(row['skills']),
+        str(row['skill_level']),
+        str(row['description']),
+        str(row['rating']),
+        str(row['feedback']),
+        str(row['status']),
+        str(row['skill_user_is_seeking_for'])
+    ]), axis=1)
+    grouped = users_df.groupby('user_id')['combined_features'].apply(lambda x: ' '.join(x)).reset_index()
+    vectorizer = TfidfVectorizer(dtype=compute_dtype(VECTOR_PRECISION))
+    tfidf_matrix = vectorizer.fit_transform(grouped['combined_features'])
+    if user_id not in grouped['user_id'].values:
+        raise HTTPException(status_code=404, detail="User ID not found")
+    user_idx = grouped[grouped['user_id'] == user_id].index[0]
+    user_vector = tfidf_matrix[user_idx]
+    similarities = cosine_similarity(user_vector, tfidf_matrix).flatten()
+    similar_indices = similarities.argsort()[::-1]
+    recommendations = []
+    for idx in similar_indices:
+        rec_user_id = int(grouped.iloc[idx]['user_id'])
+        if rec_user_id != user_id:
+            recommendations.append({
+                "user_id": rec_user_id,
+                "similarity": float(similarities[idx])
+            })
+        if len(recommendations) >= n_recommendations:
+            break
+    seeking_skills = recommendation_engine.seeking_index.seeking_skills(user_id)
+    result = {
+        "requested_user_id": user_id,
+        "seeking_skills": seeking_skills,
+        "recommended_users": recommendations
+    }
+    # Save to recommendation folder as JSON
+    os.makedirs("recommendation", exist_ok=True)
+    file_path = os.path.join("recommendation", f"user_{user_id}_recommendation.json")
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    return result
+
 @app.get("/recommend/tfidf/{user_id}")
-async def recommend_tfidf(user_id: int, n_recommendations: int = 5):
+async def recommend_tfidf(user_id: int, n_recommendations: int = 5, admitted: None = Depends(admission("tfidf"))):
     """
     Recommend users based on all features using TF-IDF and cosine similarity.
     Also saves the recommendation result as a JSON file in the 'recommendation' folder.
     """
     try:
-        users_df = pd.read_csv("data/users.csv")
-        users_df['combined_features'] = users_df.apply(lambda row: ' '.join([
-            str(row['skills']),
-            str(row['skill_level']),
-            str(row['description']),
-            str(row['rating']),
-            str(row['feedback']),
-            str(row['status']),
-            str(row['skill_user_is_seeking_for'])
-        ]), axis=1)
-        grouped = users_df.groupby('user_id')['combined_features'].apply(lambda x: ' '.join(x)).reset_index()
-        vectorizer = TfidfVectorizer()
-        tfidf_matrix = vectorizer.fit_transform(grouped['combined_features'])
-        if user_id not in grouped['user_id'].values:
-            raise HTTPException(status_code=404, detail="User ID not found")
-        user_idx = grouped[grouped['user_id'] == user_id].index[0]
-        user_vector = tfidf_matrix[user_idx]
-        similarities = cosine_similarity(user_vector, tfidf_matrix).flatten()
-        similar_indices = similarities.argsort()[::-1]
-        recommendations = []
-        for idx in similar_indices:
-            rec_user_id = int(grouped.iloc[idx]['user_id'])
-            if rec_user_id != user_id:
-                recommendations.append({
-                    "user_id": rec_user_id,
-                    "similarity": float(similarities[idx])
-                })
-            if len(recommendations) >= n_recommendations:
-                break
-        seeking_skills = users_df[users_df['user_id'] == user_id]['skill_user_is_seeking_for'].unique().tolist()
-        result = {
-            "requested_user_id": user_id,
-            "seeking_skills": seeking_skills,
-            "recommended_users": recommendations
-        }
-        # Save to recommendation folder as JSON
-        os.makedirs("recommendation", exist_ok=True)
-        file_path = os.path.join("recommendation", f"user_{user_id}_recommendation.json")
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
-        return result
+        return await run_in_threadpool(compute_tfidf_recommendations, user_id, n_recommendations)
     except Exception as e:
         logger.error(f"Error in TF-IDF recommendation for user {user_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get TF-IDF recommendations: {str(e)}")
 
+def iter_star_matches(matches: np.ndarray, available_only: bool, chunk_size: int = 256) -> Iterator[Dict]:
+    """Match rows for ascending user ids; availability is checked a chunk at a time as rows are consumed."""
+    index = recommendation_engine.seeking_index
+    for chunk_start in range(0, len(matches), chunk_size):
+        chunk = matches[chunk_start:chunk_start + chunk_size]
+        if available_only:
+            chunk = chunk[recommendation_engine.availability.available_mask(chunk.tolist())]
+        for other_id in chunk.tolist():
+            yield {
+                "matched_user_id": other_id,
+                "matched_user_skills": index.offered_skills(other_id),
+                "matched_user_seeking": index.seeking_skills(other_id)
+            }
+
 @app.get("/recommend/star/{user_id}")
-async def recommend_star(user_id: int):
+async def recommend_star(user_id: int, request: Request, available_only: bool = False, cursor: Optional[str] = None,
+                         limit: int = DEFAULT_PAGE_SIZE, format: Optional[str] = None,
+                         admitted: None = Depends(admission("star"))):
     """
     Find all users who are a perfect mutual (star) match:
     - The given user has a skill the other is seeking
     - The other user has a skill the given user is seeking
+    With available_only, users busy in a swap today are left out.
+    Matches come in pages by ascending user id; the given user's own skills
+    are returned once at the top. With format=ndjson (or Accept:
+    application/x-ndjson) every match from the cursor on is streamed, one per line.
     """
+    state, stream = list_request(request, cursor, limit, format)
+    after = state.get("after")
+    if after is not None and not isinstance(after, int):
+        raise HTTPException(status_code=400, detail="Malformed cursor")
     try:
-        users_df = pd.read_csv("data/users.csv")
+        index = recommendation_engine.seeking_index
         # Get all skills and seeking skills for the user
-        user_skills = set(users_df[users_df['user_id'] == user_id]['skills'])
-        user_seeking = set(users_df[users_df['user_id'] == user_id]['skill_user_is_seeking_for'])
+        user_skills = index.offered_skills(user_id)
+        user_seeking = index.seeking_skills(user_id)
         if not user_skills or not user_seeking:
-            return {"user_id": user_id, "star_matches": []}
-        star_matches = []
-        # For each other user
-        for other_id in users_df['user_id'].unique():
-            if other_id == user_id:
-                continue
-            other_skills = set(users_df[users_df['user_id'] == other_id]['skills'])
-            other_seeking = set(users_df[users_df['user_id'] == other_id]['skill_user_is_seeking_for'])
-            # Check for mutual match
-            # User has a skill the other is seeking, and vice versa
-            if user_skills & other_seeking and other_skills & user_seeking:
-                star_matches.append({
-                    "matched_user_id": int(other_id),
-                    "user_skills": list(user_skills),
-                    "user_seeking": list(user_seeking),
-                    "matched_user_skills": list(other_skills),
-                    "matched_user_seeking": list(other_seeking)
-                })
-        return {"user_id": user_id, "star_matches": star_matches}
+            matches = np.empty(0, dtype=np.int64)
+        else:
+            # Mutual match: the user has a skill the other is seeking, and vice versa
+            matches = index.mutual_matches(user_id)
+        if after is not None:
+            matches = matches[np.searchsorted(matches, after, side='right'):]
+        
+        if stream:
+            return ndjson_response(iter_star_matches(matches, available_only))
+        
+        star_matches, has_more = take_page(iter_star_matches(matches, available_only), limit)
+        return {
+            "user_id": user_id,
+            "user_skills": user_skills,
+            "user_seeking": user_seeking,
+            "star_matches": star_matches,
+            "next_cursor": encode_cursor({"after": star_matches[-1]["matched_user_id"]}) if has_more else None
+        }
     except Exception as e:
         logger.error(f"Error in star recommender for user {user_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get star recommendations: {str(e)}")
 
+def find_swap_cycles(user_id: int, max_length: Optional[int], n_cycles: int) -> Dict:
+    """Cycle search plus the exchanges along each cycle (blocking)."""
+    engine = swap_cycles
+    result = engine.find_cycles(user_id, max_length, n_cycles)
+    return {
+        "user_id": user_id,
+        "cycles": [
+            {"users": cycle, "length": len(cycle), "exchanges": engine.exchanges(cycle)}
+            for cycle in result["cycles"]
+        ],
+        "truncated": result["truncated"],
+        "search_ms": result["elapsed_ms"]
+    }
+
+@app.get("/recommend/cycles/{user_id}")
+async def recommend_cycles(user_id: int, max_length: Optional[int] = None, n_cycles: int = 10,
+                           auth: bool = Depends(verify_api_key),
+                           admitted: None = Depends(admission("cycles"))):
+    """
+    Find multi-party swap cycles through the user, shortest first:
+    each user in the cycle teaches the next one a skill they are seeking,
+    and the last one teaches the given user. n_cycles is capped at the
+    engine's max_cycles.
+    """
+    try:
+        await ensure_engine("cycles")
+        return await run_in_threadpool(find_swap_cycles, user_id, max_length, n_cycles)
+    except Exception as e:
+        logger.error(f"Error in cycle recommender for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get swap cycles: {str(e)}")
+
+@app.get("/admin/profile/sample")
+async def sample_stacks(seconds: float = 5.0, interval_ms: float = 5.0, top: int = 50, format: str = "json",
+                        auth: bool = Depends(verify_admin)):
+    """
+    Sample the stacks of every thread in this worker for a few seconds.
+    
+    Args:
+        seconds: How long to sample
+        interval_ms: Time between samples; the sampler's own CPU cost is reported as overhead_pct
+        top: Most frequent stacks to return
+        format: 'json' for a summary, 'collapsed' for flamegraph.pl / speedscope input
+    """
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {PROFILE_MAX_SECONDS:g}")
+    if interval_ms < 1:
+        raise HTTPException(status_code=400, detail="interval_ms must be at least 1")
+    if format not in ("json", "collapsed"):
+        raise HTTPException(status_code=400, detail=f"Invalid format '{format}'. Use one of: json, collapsed")
+    if stack_sampler_lock.locked():
+        raise HTTPException(status_code=409, detail="A sampling session is already running")
+    
+    try:
+        async with stack_sampler_lock:
+            sampler = StackSampler(interval_ms / 1000)
+            sampler.start()
+            try:
+                # The event loop keeps serving requests while it is being sampled
+                await asyncio.sleep(seconds)
+            finally:
+                sampler.stop()
+        
+        logger.info(f"Sampled {sampler.samples} stacks over {sampler.duration:.1f}s")
+        if format == "collapsed":
+            return Response(sampler.collapsed(top), media_type="text/plain")
+        return {**sampler.summary(top), "timestamp": datetime.now().isoformat()}
+        
+    except Exception as e:
+        logger.error(f"Error sampling stacks: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to sample stacks: {str(e)}")
+
+@app.get("/admin/profile/requests")
+async def profile_requests(route: str, count: int = 5, timeout: float = 30.0, sort: str = "cumulative",
+                           top: int = 30, format: str = "json", auth: bool = Depends(verify_admin)):
+    """
+    Run cProfile on the next requests to a route and return the combined stats.
+    
+    Waits until count requests whose path is route or below it (e.g.
+    /recommend/star) have completed, or until the timeout, whichever is first.
+    
+    Args:
+        route: Path prefix of the requests to profile
+        count: Requests to profile
+        timeout: Seconds to wait for them
+        sort: pstats order: cumulative, tottime or calls
+        top: Functions to return
+        format: 'json' for the top functions, 'text' for the pstats printout
+    """
+    if not 1 <= count <= 100:
+        raise HTTPException(status_code=400, detail="count must be between 1 and 100")
+    if not 0 < timeout <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"timeout must be between 0 and {PROFILE_MAX_SECONDS:g}")
+    if sort not in PSTATS_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort '{sort}'. Use one of: {', '.join(PSTATS_SORT_KEYS)}")
+    if format not in ("json", "text"):
+        raise HTTPException(status_code=400, detail=f"Invalid format '{format}'. Use one of: json, text")
+    if not route.startswith("/") or route.startswith("/admin/profile"):
+        raise HTTPException(status_code=400, detail="route must be an absolute path outside /admin/profile")
+    
+    try:
+        request_profiler.start(route, count)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    try:
+        timed_out = False
+        try:
+            await asyncio.wait_for(request_profiler.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+        finally:
+            request_profiler.stop()
+        
+        if format == "text":
+            return Response(request_profiler.report(sort, top), media_type="text/plain")
+        return {
+            "route": route,
+            "requested": count,
+            "profiled": request_profiler.profiled,
+            "skipped_concurrent": request_profiler.skipped,
+            "timed_out": timed_out,
+            "functions": request_profiler.functions(sort, top),
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"Error profiling requests to {route}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to profile requests: {str(e)}")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,246 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional
+import logging
+import threading
+import time
+from scipy import sparse
+from datetime import datetime
+
+from collab_filter import CollaborativeFilterEngine
+from data_aggregates import memory_footprint
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class MatrixFactorizationEngine:
+    """
+    Matrix factorization engine trained with alternating least squares.
+    Learns k-dim user and skill embeddings from the collaborative engine's
+    user-skill interaction strengths, so scoring a user is one dot product.
+    """
+
+    def __init__(self, n_factors: int = 16, regularization: float = 0.1, n_iterations: int = 15,
+                 swap_weight: float = 0.5, random_state: int = 42):
+        self.users_df = None
+        self.swaps_df = None
+        self.user_skill_matrix = None
+
+        self.n_factors = n_factors
+        self.regularization = regularization
+        self.n_iterations = n_iterations
+        self.swap_weight = swap_weight
+        self.random_state = random_state
+
+        # Trained model: factors plus the id/skill lookups they line up with.
+        # Replaced as a whole after each training run so readers never see a mix.
+        self.model = None
+
+        self.last_trained = None
+        self.train_seconds = None
+        self.train_rmse = None
+        self.warm_started = False
+        self._train_lock = threading.Lock()
+
+    def load_data(self, users_df: pd.DataFrame, swaps_df: pd.DataFrame,
+                  user_skill_matrix: Optional[pd.DataFrame] = None):
+        """
+        Load data and train the factorization.
+
+        Args:
+            users_df: Users in the users.csv shape
+            swaps_df: Swaps in the swaps.csv shape
+            user_skill_matrix: Interaction matrix already built by a CollaborativeFilterEngine,
+                reused instead of pivoting the data again
+        """
+        logger.info("Loading data for matrix factorization engine...")
+
+        self.users_df = users_df.copy()
+        self.swaps_df = swaps_df.copy()
+
+        if user_skill_matrix is None:
+            collab = CollaborativeFilterEngine()
+            collab.users_df = self.users_df
+            collab._create_user_skill_matrix()
+            user_skill_matrix = collab.user_skill_matrix
+        self.user_skill_matrix = user_skill_matrix
+
+        self.train(warm_start=False)
+
+        logger.info("Matrix factorization engine loaded successfully")
+
+    def train(self, warm_start: bool = True):
+        """
+        Train user and skill factors with ALS.
+
+        New factors are computed off to the side and swapped in at the end, so
+        recommendations keep being served from the previous model while this runs.
+        With warm_start, users and skills seen before start from their previous factors.
+        """
+        if self.user_skill_matrix is None or self.user_skill_matrix.empty:
+            return
+
+        with self._train_lock:
+            start = time.perf_counter()
+
+            ratings = self._build_training_matrix()
+            user_ids = self.user_skill_matrix.index.values
+            skill_names = np.asarray(self.user_skill_matrix.columns)
+            user_factors, skill_factors = self._initial_factors(user_ids, skill_names, warm_start)
+
+            k = self.n_factors
+            penalty = self.regularization * np.eye(k)
+            for _ in range(self.n_iterations):
+                user_factors = np.linalg.solve(skill_factors.T @ skill_factors + penalty,
+                                               (ratings @ skill_factors).T).T
+                skill_factors = np.linalg.solve(user_factors.T @ user_factors + penalty,
+                                                (ratings.T @ user_factors).T).T
+
+            residual = ratings - user_factors @ skill_factors.T
+            skill_means = self.users_df.groupby('skills')[['skill_level', 'rating']].mean().reindex(skill_names)
+
+            # Swap in the new model
+            self.model = {
+                'user_factors': user_factors,
+                'skill_factors': skill_factors,
+                'user_index': {uid: i for i, uid in enumerate(user_ids)},
+                'skill_names': skill_names,
+                'owned_skills': sparse.csr_matrix(self.user_skill_matrix.values != 0),
+                'skill_avg_levels': skill_means['skill_level'].to_numpy(),
+                'skill_avg_ratings': skill_means['rating'].to_numpy()
+            }
+
+            self.warm_started = warm_start
+            self.train_rmse = float(np.sqrt(np.mean(residual ** 2)))
+            self.train_seconds = time.perf_counter() - start
+            self.last_trained = datetime.now().isoformat()
+
+            logger.info(f"Matrix factorization trained in {self.train_seconds:.3f}s "
+                        f"(k={k}, rmse={self.train_rmse:.4f}, warm_start={warm_start})")
+
+    def retrain(self, users_df: Optional[pd.DataFrame] = None, swaps_df: Optional[pd.DataFrame] = None,
+                user_skill_matrix: Optional[pd.DataFrame] = None):
+        """Retrain on new (or current) data, warm-started from the previous factors."""
+        try:
+            if users_df is not None:
+                self.users_df = users_df.copy()
+            if swaps_df is not None:
+                self.swaps_df = swaps_df.copy()
+            if user_skill_matrix is not None:
+                self.user_skill_matrix = user_skill_matrix
+            elif users_df is not None:
+                collab = CollaborativeFilterEngine()
+                collab.users_df = self.users_df
+                collab._create_user_skill_matrix()
+                self.user_skill_matrix = collab.user_skill_matrix
+
+            self.train(warm_start=True)
+        except Exception as e:
+            logger.error(f"Matrix factorization retraining failed: {e}")
+
+    def retrain_async(self, **kwargs) -> threading.Thread:
+        """Retrain in a background thread; the current model is served until it finishes."""
+        thread = threading.Thread(target=self.retrain, kwargs=kwargs, daemon=True)
+        thread.start()
+        return thread
+
+    def _build_training_matrix(self) -> np.ndarray:
+        """Interaction strengths, optionally boosted with the skills of each learner's teachers."""
+        ratings = self.user_skill_matrix.values.astype(np.float64)
+
+        if self.swap_weight > 0 and self.swaps_df is not None and not self.swaps_df.empty:
+            row_of_user = {uid: i for i, uid in enumerate(self.user_skill_matrix.index.values)}
+            pairs = [
+                (row_of_user[learner], row_of_user[teacher])
+                for learner, teacher in zip(self.swaps_df['user_id_of_learner'],
+                                            self.swaps_df['user_id_of_teacher'])
+                if learner in row_of_user and teacher in row_of_user
+            ]
+            if pairs:
+                learners, teachers = map(np.array, zip(*pairs))
+                n_users = ratings.shape[0]
+                swap_edges = sparse.csr_matrix((np.ones(len(pairs)), (learners, teachers)),
+                                               shape=(n_users, n_users))
+                # A learner shows interest in what their teachers offer
+                ratings = ratings + self.swap_weight * (swap_edges @ ratings)
+
+        return ratings
+
+    def _initial_factors(self, user_ids: np.ndarray, skill_names: np.ndarray, warm_start: bool):
+        """Random small factors, reusing previous factors for known users/skills when warm starting."""
+        rng = np.random.default_rng(self.random_state)
+        k = self.n_factors
+        user_factors = rng.normal(scale=0.1, size=(len(user_ids), k))
+        skill_factors = rng.normal(scale=0.1, size=(len(skill_names), k))
+
+        model = self.model
+        if warm_start and model is not None and model['user_factors'].shape[1] == k:
+            for i, uid in enumerate(user_ids):
+                previous = model['user_index'].get(uid)
+                if previous is not None:
+                    user_factors[i] = model['user_factors'][previous]
+
+            previous_skills = {name: i for i, name in enumerate(model['skill_names'])}
+            for i, name in enumerate(skill_names):
+                previous = previous_skills.get(name)
+                if previous is not None:
+                    skill_factors[i] = model['skill_factors'][previous]
+
+        return user_factors, skill_factors
+
+    def get_recommendations(self, user_id: int, n_recommendations: int = 5) -> List[Dict]:
+        """Get skills with the highest predicted interaction the user doesn't have yet."""
+        model = self.model
+        if model is None or user_id not in model['user_index']:
+            return []
+
+        try:
+            row = model['user_index'][user_id]
+            scores = model['skill_factors'] @ model['user_factors'][row]
+
+            owned_skills = model['owned_skills']
+            owned = owned_skills.indices[owned_skills.indptr[row]:owned_skills.indptr[row + 1]]
+            scores[owned] = -np.inf
+
+            n = min(n_recommendations, len(scores) - len(owned))
+            if n <= 0:
+                return []
+            top = np.argpartition(-scores, n - 1)[:n]
+            top = top[np.argsort(-scores[top])]
+
+            recommendations = []
+            for idx in top:
+                recommendations.append({
+                    'skill': model['skill_names'][idx],
+                    'score': float(scores[idx]),
+                    'avg_level': round(float(model['skill_avg_levels'][idx]), 1),
+                    'avg_rating': round(float(model['skill_avg_ratings'][idx]), 2),
+                    'recommendation_type': 'matrix_factorization'
+                })
+
+            return recommendations
+
+        except Exception as e:
+            logger.error(f"Error getting matrix factorization recommendations for user {user_id}: {e}")
+            return []
+
+    def get_stats(self) -> Dict:
+        """Get statistics about the matrix factorization engine."""
+        model = self.model
+        if model is None:
+            return {}
+
+        return {
+            'total_users': len(model['user_index']),
+            'total_skills': len(model['skill_names']),
+            'n_factors': self.n_factors,
+            'train_rmse': round(self.train_rmse, 4),
+            'train_seconds': round(self.train_seconds, 3),
+            'last_trained': self.last_trained,
+            'warm_started': self.warm_started,
+            'retraining': self._train_lock.locked(),
+            'memory_bytes': memory_footprint(user_factors=model['user_factors'],
+                                             skill_factors=model['skill_factors'],
+                                             owned_skills=model['owned_skills']),
+            'engine_type': 'matrix_factorization'
+        }
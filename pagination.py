@@ -0,0 +1,64 @@
+"""
+Cursor pagination and NDJSON streaming for list endpoints.
+
+Cursors are opaque URL-safe tokens wrapping a small JSON state (the last
+key returned, or a position plus the data generation it belongs to).
+Handlers build rows with generators. A page takes limit + 1 rows, where
+the extra row only tells whether there is a next page. A stream encodes
+each row as it is produced, one JSON document per line.
+"""
+
+import base64
+import itertools
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from serialization import dumps
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+LIST_FORMATS = ('json', 'ndjson')
+
+
+def encode_cursor(state: Dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict]:
+    """State of a cursor from encode_cursor; raises ValueError for anything else."""
+    if not cursor:
+        return None
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Malformed cursor")
+    if not isinstance(state, dict):
+        raise ValueError("Malformed cursor")
+    return state
+
+
+def validate_page_request(limit: int, format: Optional[str]):
+    """Raises ValueError for a page size or format the list endpoints do not accept."""
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    if format is not None and format not in LIST_FORMATS:
+        raise ValueError(f"Invalid format '{format}'. Use one of: {', '.join(LIST_FORMATS)}")
+
+
+def wants_ndjson(format: Optional[str], accept: str) -> bool:
+    """An explicit format wins; otherwise NDJSON when the Accept header asks for it."""
+    if format is not None:
+        return format == 'ndjson'
+    return NDJSON_MEDIA_TYPE in accept
+
+
+def take_page(rows: Iterable, limit: int) -> Tuple[List, bool]:
+    """Up to limit rows, and whether more follow."""
+    page = list(itertools.islice(rows, limit + 1))
+    return page[:limit], len(page) > limit
+
+
+def ndjson_lines(rows: Iterable[Dict]) -> Iterator[bytes]:
+    for row in rows:
+        yield dumps(row) + b'\n'
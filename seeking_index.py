@@ -0,0 +1,195 @@
+"""
+Per-user seeking and offered skills as CSR (offsets + skill ids) arrays.
+
+skill_user_is_seeking_for may hold several comma-separated skills (the Node
+exporter sends a STRING_AGG(..., ', ') list). It is split and normalized once
+at load time; lookups then slice integer arrays instead of matching strings.
+Inverse postings (skill -> users seeking / offering it) make mutual matches a
+union and an intersection of a few slices.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_aggregates import memory_footprint
+from skill_autocomplete import normalize_skill_name
+
+EMPTY_IDS = np.empty(0, dtype=np.int32)
+
+
+def split_seeking(value) -> List[str]:
+    """Skill names in a seeking cell, in order; NaN and blanks give none."""
+    if not isinstance(value, str):
+        return []
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+def _group(rows: np.ndarray, values: np.ndarray, n_rows: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    CSR grouping of values by row, first occurrence order, repeats dropped.
+
+    Returns (offsets, values, positions) where positions index the kept
+    entries in the input.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    values = np.asarray(values, dtype=np.int32)
+    positions = np.arange(len(rows))
+    if len(rows):
+        _, first = np.unique(rows * (int(values.max()) + 1) + values, return_index=True)
+        first.sort()
+        order = first[np.argsort(rows[first], kind='stable')]
+        rows, values, positions = rows[order], values[order], positions[order]
+
+    offsets = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=offsets[1:])
+    return offsets, values, positions
+
+
+class SeekingIndex:
+    def __init__(self):
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self.row_of_user = {}
+        self.skill_names = []
+        self.skill_ids = {}
+
+        # user row -> skill ids
+        self.seeking_offsets = np.zeros(1, dtype=np.int64)
+        self.seeking_ids = EMPTY_IDS
+        self.offered_offsets = np.zeros(1, dtype=np.int64)
+        self.offered_ids = EMPTY_IDS
+        # users_df position of each offered entry (its level/rating row)
+        self.offered_positions = np.empty(0, dtype=np.int64)
+
+        # skill id -> user rows
+        self.seekers_offsets = np.zeros(1, dtype=np.int64)
+        self.seekers = np.empty(0, dtype=np.int32)
+        self.holders_offsets = np.zeros(1, dtype=np.int64)
+        self.holders = np.empty(0, dtype=np.int32)
+        self.holder_positions = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_users(cls, users_df: pd.DataFrame) -> 'SeekingIndex':
+        index = cls()
+        if users_df is None or users_df.empty:
+            return index
+
+        index.user_ids = np.unique(users_df['user_id'].to_numpy())
+        index.row_of_user = {int(uid): row for row, uid in enumerate(index.user_ids)}
+        user_rows = np.searchsorted(index.user_ids, users_df['user_id'].to_numpy())
+        n_users = len(index.user_ids)
+
+        # Offered names are registered first, so their spelling is the one reported
+        offered = np.fromiter((index._skill_id(name) for name in users_df['skills']), dtype=np.int32,
+                              count=len(users_df))
+
+        parsed = {}
+        seeking_rows, seeking = [], []
+        for row, value in zip(user_rows, users_df['skill_user_is_seeking_for']):
+            if value not in parsed:
+                parsed[value] = [index._skill_id(name) for name in split_seeking(value)]
+            seeking_rows.extend([row] * len(parsed[value]))
+            seeking.extend(parsed[value])
+
+        index.offered_offsets, index.offered_ids, index.offered_positions = _group(user_rows, offered, n_users)
+        index.seeking_offsets, index.seeking_ids, _ = _group(np.asarray(seeking_rows, dtype=np.int64),
+                                                             np.asarray(seeking, dtype=np.int32), n_users)
+
+        n_skills = len(index.skill_names)
+        index.seekers_offsets, index.seekers, _ = _group(
+            index.seeking_ids, np.repeat(np.arange(n_users), np.diff(index.seeking_offsets)), n_skills)
+        index.holders_offsets, index.holders, kept = _group(
+            index.offered_ids, np.repeat(np.arange(n_users), np.diff(index.offered_offsets)), n_skills)
+        index.holder_positions = index.offered_positions[kept]
+        return index
+
+    def _skill_id(self, name: str) -> int:
+        key = normalize_skill_name(str(name))
+        skill_id = self.skill_ids.get(key)
+        if skill_id is None:
+            skill_id = self.skill_ids[key] = len(self.skill_names)
+            self.skill_names.append(name)
+        return skill_id
+
+    def skill_id(self, name: str) -> Optional[int]:
+        return self.skill_ids.get(normalize_skill_name(name))
+
+    def seeking_skill_ids(self, user_id: int) -> np.ndarray:
+        row = self.row_of_user.get(user_id)
+        if row is None:
+            return EMPTY_IDS
+        return self.seeking_ids[self.seeking_offsets[row]:self.seeking_offsets[row + 1]]
+
+    def offered_skill_ids(self, user_id: int) -> np.ndarray:
+        row = self.row_of_user.get(user_id)
+        if row is None:
+            return EMPTY_IDS
+        return self.offered_ids[self.offered_offsets[row]:self.offered_offsets[row + 1]]
+
+    def offered_rows(self, user_id: int) -> np.ndarray:
+        """users_df positions of the user's own rows."""
+        row = self.row_of_user.get(user_id)
+        if row is None:
+            return np.empty(0, dtype=np.int64)
+        return self.offered_positions[self.offered_offsets[row]:self.offered_offsets[row + 1]]
+
+    def seeking_skills(self, user_id: int) -> List[str]:
+        return [self.skill_names[i] for i in self.seeking_skill_ids(user_id).tolist()]
+
+    def offered_skills(self, user_id: int) -> List[str]:
+        return [self.skill_names[i] for i in self.offered_skill_ids(user_id).tolist()]
+
+    def holder_rows(self, skill_id: Optional[int]) -> np.ndarray:
+        """users_df positions of the rows offering a skill."""
+        if skill_id is None:
+            return np.empty(0, dtype=np.int64)
+        return self.holder_positions[self.holders_offsets[skill_id]:self.holders_offsets[skill_id + 1]]
+
+    def offered_matches(self, user_id: int, skill_ids: np.ndarray) -> np.ndarray:
+        """users_df positions of the user's offered rows whose skill is in skill_ids, in data order."""
+        row = self.row_of_user.get(user_id)
+        if row is None or not len(skill_ids):
+            return np.empty(0, dtype=np.int64)
+        start, end = self.offered_offsets[row], self.offered_offsets[row + 1]
+        return self.offered_positions[start:end][np.isin(self.offered_ids[start:end], skill_ids)]
+
+    def _users_of(self, offsets: np.ndarray, users: np.ndarray, skill_ids: np.ndarray) -> np.ndarray:
+        if not len(skill_ids):
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate([users[offsets[s]:offsets[s + 1]] for s in skill_ids.tolist()]))
+
+    def mutual_matches(self, user_id: int) -> np.ndarray:
+        """Ids of users seeking a skill this user offers and offering a skill this user seeks."""
+        row = self.row_of_user.get(user_id)
+        if row is None:
+            return np.empty(0, dtype=np.int64)
+        want_mine = self._users_of(self.seekers_offsets, self.seekers, self.offered_skill_ids(user_id))
+        have_wanted = self._users_of(self.holders_offsets, self.holders, self.seeking_skill_ids(user_id))
+        matches = np.intersect1d(want_mine, have_wanted, assume_unique=True)
+        return self.user_ids[matches[matches != row]]
+
+    def pairs(self, user_ids: Optional[List[int]] = None, kind: str = 'seeking') -> pd.DataFrame:
+        """(user_id, skill_id) rows of the seeking or offered lists, for vectorized joins."""
+        offsets, ids = ((self.seeking_offsets, self.seeking_ids) if kind == 'seeking'
+                        else (self.offered_offsets, self.offered_ids))
+        owners = np.repeat(self.user_ids, np.diff(offsets))
+        pairs = pd.DataFrame({'user_id': owners, 'skill_id': ids})
+        if user_ids is not None:
+            pairs = pairs[pairs['user_id'].isin(user_ids)]
+        return pairs
+
+    def get_stats(self) -> Dict:
+        return {
+            'users': len(self.user_ids),
+            'skills': len(self.skill_names),
+            'seeking_entries': len(self.seeking_ids),
+            'offered_entries': len(self.offered_ids),
+            'memory_bytes': memory_footprint(
+                seeking_offsets=self.seeking_offsets, seeking_ids=self.seeking_ids,
+                offered_offsets=self.offered_offsets, offered_ids=self.offered_ids,
+                offered_positions=self.offered_positions, seekers_offsets=self.seekers_offsets,
+                seekers=self.seekers, holders_offsets=self.holders_offsets, holders=self.holders,
+                holder_positions=self.holder_positions
+            )['total']
+        }
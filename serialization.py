@@ -0,0 +1,38 @@
+"""
+Fast JSON encoding for API responses and files, built on orjson.
+
+Engine output is plain dicts that may still carry numpy scalars or arrays
+(e.g. values read out of DataFrame rows); orjson encodes those natively with
+OPT_SERIALIZE_NUMPY, and anything else numpy-like falls back to .item()/.tolist().
+"""
+
+from typing import Any
+
+import orjson
+
+DUMPS_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def json_default(value: Any) -> Any:
+    """Fallback for types orjson doesn't encode itself."""
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any, indent: bool = False, newline: bool = False) -> bytes:
+    """Encode content to JSON bytes."""
+    options = DUMPS_OPTIONS
+    if indent:
+        options |= orjson.OPT_INDENT_2
+    if newline:
+        options |= orjson.OPT_APPEND_NEWLINE
+    return orjson.dumps(content, default=json_default, option=options)
+
+
+def loads(data: bytes) -> Any:
+    return orjson.loads(data)
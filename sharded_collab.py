@@ -0,0 +1,362 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+import logging
+import multiprocessing
+import threading
+import time
+from scipy import sparse
+from datetime import datetime
+
+from data_aggregates import memory_footprint
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class CollaborativeShard:
+    """
+    One partition of the users: their L2-normalized skill vectors plus the
+    level/rating of each held skill, enough to answer a neighbor query alone.
+    """
+
+    def __init__(self, shard_id: int):
+        self.shard_id = shard_id
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self.row_of_user = {}
+        self.vectors = None
+        self.levels = None
+        self.ratings = None
+        self.build_seconds = None
+
+    def build(self, users_df: pd.DataFrame, skill_names: List[str]) -> Dict:
+        """Build this shard's CSR vectors from its users' rows."""
+        start = time.perf_counter()
+        skill_index = {name: i for i, name in enumerate(skill_names)}
+
+        # Same interaction strength (and duplicate handling) as CollaborativeFilterEngine's pivot
+        grouped = (
+            users_df.assign(interaction_strength=users_df['skill_level'] * users_df['rating'])
+            .groupby(['user_id', 'skills'], sort=True)
+            .agg(strength=('interaction_strength', 'mean'), level=('skill_level', 'first'), rating=('rating', 'first'))
+            .reset_index()
+        )
+
+        self.user_ids = grouped['user_id'].unique()
+        self.row_of_user = {int(uid): i for i, uid in enumerate(self.user_ids)}
+        rows = grouped['user_id'].map(self.row_of_user).to_numpy()
+        cols = grouped['skills'].map(skill_index).to_numpy()
+        shape = (len(self.user_ids), len(skill_names))
+
+        # Rows are sorted by (user, skill), so the three matrices share one sparsity structure
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=shape[0]))))
+        strength = grouped['strength'].to_numpy(dtype=np.float64)
+        norms = np.sqrt(np.bincount(rows, weights=strength ** 2, minlength=shape[0]))
+        norms[norms == 0] = 1.0
+
+        self.vectors = sparse.csr_matrix((strength / norms[rows], cols, indptr), shape=shape)
+        self.levels = sparse.csr_matrix((grouped['level'].to_numpy(), cols, indptr), shape=shape)
+        self.ratings = sparse.csr_matrix((grouped['rating'].to_numpy(dtype=np.float64), cols, indptr), shape=shape)
+
+        self.build_seconds = time.perf_counter() - start
+        return self.get_stats()
+
+    def vector(self, user_id: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """The user's normalized vector as (skill indices, values), if they live on this shard."""
+        row = self.row_of_user.get(user_id)
+        if row is None:
+            return None
+        start, end = self.vectors.indptr[row], self.vectors.indptr[row + 1]
+        return self.vectors.indices[start:end].copy(), self.vectors.data[start:end].copy()
+
+    def query(self, indices: np.ndarray, values: np.ndarray, exclude_user_id: int, k: int) -> List[Tuple]:
+        """
+        Top-k most similar users on this shard to the broadcast vector.
+
+        Returns (user_id, similarity, skill indices, levels, ratings) per neighbor.
+        """
+        if self.vectors is None or self.vectors.shape[0] == 0:
+            return []
+
+        query = np.zeros(self.vectors.shape[1])
+        query[indices] = values
+        similarities = self.vectors @ query
+
+        excluded = self.row_of_user.get(exclude_user_id)
+        if excluded is not None:
+            similarities[excluded] = -np.inf
+
+        k = min(k, len(similarities) - (excluded is not None))
+        if k <= 0:
+            return []
+        top = np.argpartition(-similarities, k - 1)[:k]
+
+        neighbors = []
+        for row in top:
+            start, end = self.vectors.indptr[row], self.vectors.indptr[row + 1]
+            neighbors.append((
+                int(self.user_ids[row]),
+                float(similarities[row]),
+                self.vectors.indices[start:end].copy(),
+                self.levels.data[start:end].copy(),
+                self.ratings.data[start:end].copy()
+            ))
+        return neighbors
+
+    def get_stats(self) -> Dict:
+        return {
+            'shard_id': self.shard_id,
+            'users': len(self.user_ids),
+            'nonzero': int(self.vectors.nnz) if self.vectors is not None else 0,
+            'build_seconds': round(self.build_seconds, 4) if self.build_seconds is not None else None,
+            'memory_bytes': memory_footprint(vectors=self.vectors, levels=self.levels,
+                                             ratings=self.ratings)['total']
+        }
+
+
+def _shard_worker(connection, shard_id: int):
+    """Command loop of a worker process holding one shard."""
+    logging.getLogger().setLevel(logging.WARNING)
+    shard = CollaborativeShard(shard_id)
+    while True:
+        command, args = connection.recv()
+        if command == 'stop':
+            break
+        try:
+            connection.send(('ok', getattr(shard, command)(*args)))
+        except Exception as e:
+            connection.send(('error', f"{type(e).__name__}: {e}"))
+    connection.close()
+
+
+class ShardedCollaborativeEngine:
+    """
+    User-user collaborative filtering with users partitioned across shards.
+
+    Each shard lives in its own worker process (standing in for a node) and
+    holds only its users' normalized vectors. A query fetches the user's
+    vector from its owning shard, broadcasts it to every shard, gathers each
+    shard's top-K neighbors and merges them, so no process ever holds the full
+    user-skill matrix or a pairwise similarity structure.
+
+    Each pipe has its own lock, taken in shard order, so concurrent queries
+    pipeline through the shards instead of running one at a time. A worker
+    that dies or misses reply_timeout is marked failed: queries then skip it
+    until the next load_data restarts it.
+    """
+
+    def __init__(self, n_shards: int = 4, n_similar: int = 10, min_similarity: float = 0.1,
+                 use_processes: bool = True, start_method: str = 'spawn', reply_timeout: float = 30.0):
+        if n_shards < 1:
+            raise ValueError("n_shards must be at least 1")
+        self.n_shards = n_shards
+        self.n_similar = n_similar
+        self.min_similarity = min_similarity
+        self.use_processes = use_processes
+        self.start_method = start_method
+        self.reply_timeout = reply_timeout
+
+        self.skill_names = None
+        self.shard_stats = []
+        self.build_seconds = None
+        self.worker_start_seconds = None
+        self.last_built = None
+
+        self._local_shards = []
+        self._processes = []
+        self._connections = []
+        # One request in flight per pipe
+        self._locks = [threading.Lock() for _ in range(n_shards)]
+        self.failed_shards = set()
+
+    def shard_of(self, user_id: int) -> int:
+        """Hash partitioning by user id."""
+        return int(user_id) % self.n_shards
+
+    def _start_worker(self, context, shard_id: int):
+        parent, child = context.Pipe()
+        process = context.Process(target=_shard_worker, args=(child, shard_id), daemon=True,
+                                  name=f'collab-shard-{shard_id}')
+        process.start()
+        child.close()
+        return process, parent
+
+    def _start_workers(self):
+        """Start the workers, or restart the ones marked failed."""
+        if not self.use_processes:
+            if not self._local_shards:
+                self._local_shards = [CollaborativeShard(i) for i in range(self.n_shards)]
+            return
+        if self._processes and not self.failed_shards:
+            return
+
+        start = time.perf_counter()
+        context = multiprocessing.get_context(self.start_method)
+        if not self._processes:
+            for shard_id in range(self.n_shards):
+                process, connection = self._start_worker(context, shard_id)
+                self._processes.append(process)
+                self._connections.append(connection)
+            started = list(range(self.n_shards))
+        else:
+            started = sorted(self.failed_shards)
+            for shard_id in started:
+                with self._locks[shard_id]:
+                    self._processes[shard_id].terminate()
+                    self._connections[shard_id].close()
+                    self._processes[shard_id], self._connections[shard_id] = self._start_worker(context, shard_id)
+                    self.failed_shards.discard(shard_id)
+        # Wait until every worker has imported its modules, so build time excludes process start-up
+        self._call(started, 'get_stats', [()] * len(started))
+        self.worker_start_seconds = time.perf_counter() - start
+        logger.info(f"Started {len(started)} collaborative shard workers in {self.worker_start_seconds:.2f}s")
+
+    def _fail(self, shard_id: int, reason: str):
+        self.failed_shards.add(shard_id)
+        logger.error(f"Collaborative shard {shard_id} marked failed: {reason}")
+
+    def _call(self, shard_ids: List[int], command: str, args_per_shard: List[tuple]) -> List:
+        """Send a command to the given shards (in increasing order) and gather their replies, in order."""
+        if not self.use_processes:
+            return [getattr(self._local_shards[shard_id], command)(*args)
+                    for shard_id, args in zip(shard_ids, args_per_shard)]
+
+        failed = [shard_id for shard_id in shard_ids if shard_id in self.failed_shards]
+        if failed:
+            raise RuntimeError(f"Shard {command} failed: shards {failed} are down")
+
+        # Locks are taken in shard order, so two callers never wait on each other in a cycle;
+        # each is released as soon as that shard has replied
+        locks = [self._locks[shard_id] for shard_id in shard_ids]
+        for lock in locks:
+            lock.acquire()
+        replies, errors, released = [], [], 0
+        try:
+            sent = set()
+            for shard_id, args in zip(shard_ids, args_per_shard):
+                try:
+                    self._connections[shard_id].send((command, args))
+                    sent.add(shard_id)
+                except (OSError, BrokenPipeError) as e:
+                    self._fail(shard_id, f"{type(e).__name__}: {e}")
+            for shard_id, lock in zip(shard_ids, locks):
+                try:
+                    if shard_id not in sent:
+                        errors.append(f"shard {shard_id} is down")
+                        continue
+                    connection = self._connections[shard_id]
+                    if not connection.poll(self.reply_timeout):
+                        # A late reply would answer the next request, so the pipe is unusable
+                        self._fail(shard_id, f"no reply to {command} within {self.reply_timeout}s")
+                        errors.append(f"shard {shard_id} timed out")
+                        continue
+                    status, payload = connection.recv()
+                    if status == 'error':
+                        errors.append(payload)
+                    replies.append(payload)
+                except (EOFError, OSError) as e:
+                    self._fail(shard_id, f"{type(e).__name__}: {e}")
+                    errors.append(f"shard {shard_id} is down")
+                finally:
+                    lock.release()
+                    released += 1
+        finally:
+            for lock in locks[released:]:
+                lock.release()
+        if errors:
+            raise RuntimeError(f"Shard {command} failed: {'; '.join(errors)}")
+        return replies
+
+    def load_data(self, users_df: pd.DataFrame, swaps_df: pd.DataFrame):
+        """Partition users across shards and build every shard in parallel."""
+        logger.info(f"Loading data for sharded collaborative engine ({self.n_shards} shards)...")
+        self._start_workers()
+        start = time.perf_counter()
+
+        self.skill_names = sorted(users_df['skills'].unique())
+        shard_of_row = users_df['user_id'].to_numpy() % self.n_shards
+        columns = ['user_id', 'skills', 'skill_level', 'rating']
+        partitions = [(users_df.loc[shard_of_row == shard_id, columns], self.skill_names)
+                      for shard_id in range(self.n_shards)]
+
+        self.shard_stats = self._call(list(range(self.n_shards)), 'build', partitions)
+        self.build_seconds = time.perf_counter() - start
+        self.last_built = datetime.now().isoformat()
+
+        logger.info(f"Sharded collaborative engine built in {self.build_seconds:.3f}s")
+
+    def get_recommendations(self, user_id: int, n_recommendations: int = 5) -> List[Dict]:
+        """Same output as CollaborativeFilterEngine user mode, merged from per-shard top-K."""
+        if self.skill_names is None:
+            return []
+
+        try:
+            owner = self.shard_of(user_id)
+            vector = self._call([owner], 'vector', [(user_id,)])[0]
+            if vector is None:
+                return []
+            indices, values = vector
+
+            # Neighbors from the shards that are up; a failed shard only loses its own users
+            shard_ids = [shard_id for shard_id in range(self.n_shards) if shard_id not in self.failed_shards]
+            gathered = self._call(shard_ids, 'query', [(indices, values, user_id, self.n_similar)] * len(shard_ids))
+
+            # Merge: global top-K neighbors, most similar first
+            neighbors = sorted((n for shard in gathered for n in shard), key=lambda n: n[1], reverse=True)
+            neighbors = neighbors[:self.n_similar]
+
+            owned = set(indices.tolist())
+            recommendations = {}
+            for neighbor_id, similarity, skills, levels, ratings in neighbors:
+                if similarity < self.min_similarity:
+                    continue
+                for skill_idx, level, rating in zip(skills, levels, ratings):
+                    # The first (most similar) neighbor holding a skill recommends it
+                    if skill_idx in owned or skill_idx in recommendations:
+                        continue
+                    recommendations[skill_idx] = {
+                        'skill': self.skill_names[skill_idx],
+                        'similarity_score': similarity,
+                        'recommended_by': neighbor_id,
+                        'skill_level': int(level),
+                        'skill_rating': float(rating),
+                        'recommendation_type': 'collaborative'
+                    }
+
+            return list(recommendations.values())[:n_recommendations]
+
+        except Exception as e:
+            logger.error(f"Error getting sharded collaborative recommendations for user {user_id}: {e}")
+            return []
+
+    def get_stats(self) -> Dict:
+        """Get statistics about the sharded engine."""
+        if self.skill_names is None:
+            return {}
+
+        return {
+            'n_shards': self.n_shards,
+            'total_users': sum(stats['users'] for stats in self.shard_stats),
+            'total_skills': len(self.skill_names),
+            'workers': 'processes' if self.use_processes else 'in_process',
+            'failed_shards': sorted(self.failed_shards),
+            'build_seconds': round(self.build_seconds, 4),
+            'worker_start_seconds': round(self.worker_start_seconds, 3) if self.worker_start_seconds is not None else None,
+            'last_built': self.last_built,
+            'shards': self.shard_stats,
+            'engine_type': 'collaborative_sharded'
+        }
+
+    def shutdown(self):
+        """Stop the shard worker processes."""
+        for connection in self._connections:
+            try:
+                connection.send(('stop', ()))
+                connection.close()
+            except (OSError, BrokenPipeError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._processes, self._connections, self._local_shards = [], [], []
+        self.failed_shards = set()
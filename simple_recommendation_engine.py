@@ -1,12 +1,26 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional
+import copy
 import logging
+import time
 from datetime import datetime
 
+from availability import AvailabilityIndex
+from data_aggregates import DataAggregates, memory_footprint
+from seeking_index import SeekingIndex
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Blend weights advertised with every recommendation response
+RECOMMENDATION_WEIGHTS = {
+    'skill_level': 0.4,
+    'rating': 0.3,
+    'popularity': 0.2,
+    'recency': 0.1
+}
+
 class SimpleRecommendationEngine:
     """
     Simplified recommendation engine that works with users.csv and swaps.csv only.
@@ -18,9 +32,21 @@ class SimpleRecommendationEngine:
         self.swaps_df = None
         self.user_skill_matrix = None
         
+        # Seeking/offered skill ids per user, parsed once per load
+        self.seeking_index = SeekingIndex()
+        
+        # Who is busy today (bitmap) and on other dates (per-user intervals)
+        self.availability = AvailabilityIndex()
+        
+        # Kept in step with the data so get_stats is an O(1) read
+        self.aggregates = DataAggregates()
+        self.build_seconds = None
+        self.memory_bytes = {}
+        
     def load_data(self, users_df: pd.DataFrame, swaps_df: pd.DataFrame):
         """Load and prepare data for recommendations."""
         logger.info("Loading data for simple recommendation engine...")
+        start = time.perf_counter()
         
         self.users_df = users_df.copy()
         self.swaps_df = swaps_df.copy()
@@ -28,7 +54,30 @@ class SimpleRecommendationEngine:
         # Create user-skill matrix from user data
         self._create_user_skill_matrix()
         
+        self.seeking_index = SeekingIndex.from_users(self.users_df)
+        self.availability = AvailabilityIndex.from_swaps(self.swaps_df)
+        
+        self.aggregates = DataAggregates.from_frames(self.users_df, self.swaps_df)
+        self.build_seconds = time.perf_counter() - start
+        self.memory_bytes = memory_footprint(users_df=self.users_df, swaps_df=self.swaps_df,
+                                             user_skill_matrix=self.user_skill_matrix,
+                                             seeking_index=self.seeking_index.get_stats()['memory_bytes'],
+                                             availability=self.availability.get_stats()['memory_bytes'])
+        
         logger.info("Simple recommendation engine loaded successfully")
+    
+    def clone(self) -> 'SimpleRecommendationEngine':
+        """A copy that add_swaps can update while this one keeps serving."""
+        clone = copy.copy(self)
+        clone.availability = self.availability.clone()
+        clone.aggregates = copy.copy(self.aggregates)
+        return clone
+    
+    def add_swaps(self, swaps_df: pd.DataFrame):
+        """Append new swaps without reloading; availability is updated incrementally."""
+        self.swaps_df = pd.concat([self.swaps_df, swaps_df], ignore_index=True)
+        self.availability.add_swaps(swaps_df)
+        self.aggregates.add_swaps(len(swaps_df))
         
     def _create_user_skill_matrix(self):
         """Create user-skill matrix from user data."""
@@ -81,12 +130,7 @@ class SimpleRecommendationEngine:
                 'learning_history': learning_history,
                 'current_status': current_status,
                 'active_sessions': len([h for h in learning_history if h.get('is_active', False)]),
-                'weights': {
-                    'skill_level': 0.4,
-                    'rating': 0.3,
-                    'popularity': 0.2,
-                    'recency': 0.1
-                },
+                'weights': dict(RECOMMENDATION_WEIGHTS),
                 'timestamp': datetime.now().isoformat()
             }
             
@@ -96,13 +140,12 @@ class SimpleRecommendationEngine:
     
     def _get_user_skills(self, user_id: int) -> List[Dict]:
         """Get user's current skills with levels."""
-        user_data = self.users_df[self.users_df['user_id'] == user_id]
-        
-        if user_data.empty:
-            return []
-        
+        return self._skill_dicts(self.users_df[self.users_df['user_id'] == user_id])
+    
+    @staticmethod
+    def _skill_dicts(user_rows: pd.DataFrame) -> List[Dict]:
         skills = []
-        for _, row in user_data.iterrows():
+        for _, row in user_rows.iterrows():
             skills.append({
                 'skill': row['skills'],
                 'level': row['skill_level'],
@@ -114,43 +157,42 @@ class SimpleRecommendationEngine:
         return skills
     
     def _get_seeking_skills(self, user_id: int) -> List[str]:
-        """Get skills the user is seeking to learn."""
-        user_data = self.users_df[self.users_df['user_id'] == user_id]
-        
-        if user_data.empty:
-            return []
-        
-        seeking_skills = []
-        for _, row in user_data.iterrows():
-            if pd.notna(row['skill_user_is_seeking_for']):
-                seeking_skills.append(row['skill_user_is_seeking_for'])
-        
-        return list(set(seeking_skills))  # Remove duplicates
+        """Get skills the user is seeking to learn (each comma-separated entry, without repeats)."""
+        return self.seeking_index.seeking_skills(user_id)
     
-    def _get_skills_to_learn(self, user_id: int, seeking_skills: List[str], n_recommendations: int) -> List[Dict]:
-        """Get skills the user should learn based on what they're seeking."""
+    def _get_skills_to_learn(self, user_id: int, seeking_skills: List[str], n_recommendations: int,
+                             owned: Optional[set] = None, popularity: Optional[pd.DataFrame] = None,
+                             best_rows: Optional[Dict[str, Optional[int]]] = None) -> List[Dict]:
+        """
+        Get skills the user should learn based on what they're seeking.
+        
+        owned (the user's skill names), popularity (from _skill_popularity) and
+        best_rows (a teacher memo per skill) let a batch compute them once.
+        """
+        if owned is None:
+            owned = set([skill['skill'] for skill in self._get_user_skills(user_id)])
         if not seeking_skills:
             # If no specific seeking skills, recommend popular skills user doesn't have
-            return self._get_popular_skills_to_learn(user_id, n_recommendations)
+            return self._get_popular_skills_to_learn(user_id, n_recommendations, owned, popularity)
         
         recommendations = []
-        user_skills = set([skill['skill'] for skill in self._get_user_skills(user_id)])
-        
         for seeking_skill in seeking_skills:
-            if seeking_skill not in user_skills:
+            if seeking_skill not in owned:
                 # Find users who have this skill at high level
-                skilled_users = self.users_df[
-                    (self.users_df['skills'] == seeking_skill) & 
-                    (self.users_df['skill_level'] >= 4)
-                ]
+                if best_rows is None:
+                    best = self._best_teacher_row(seeking_skill)
+                elif seeking_skill in best_rows:
+                    best = best_rows[seeking_skill]
+                else:
+                    best = best_rows[seeking_skill] = self._best_teacher_row(seeking_skill)
                 
-                if not skilled_users.empty:
-                    best_user = skilled_users.loc[skilled_users['skill_level'].idxmax()]
+                if best is not None:
+                    best_user = self.users_df.iloc[best]
                     recommendations.append({
                         'skill': seeking_skill,
-                        'recommended_by': best_user['user_id'],
-                        'teacher_rating': best_user['rating'],
-                        'teacher_level': best_user['skill_level'],
+                        'recommended_by': int(best_user['user_id']),
+                        'teacher_rating': float(best_user['rating']),
+                        'teacher_level': int(best_user['skill_level']),
                         'confidence': 0.9,
                         'reason': f"Based on your interest in {seeking_skill}"
                     })
@@ -159,30 +201,40 @@ class SimpleRecommendationEngine:
         recommendations.sort(key=lambda x: x['confidence'], reverse=True)
         return recommendations[:n_recommendations]
     
-    def _get_popular_skills_to_learn(self, user_id: int, n_recommendations: int) -> List[Dict]:
-        """Get popular skills that user doesn't have."""
-        user_skills = set([skill['skill'] for skill in self._get_user_skills(user_id)])
-        
-        # Get all skills and their popularity
+    def _best_teacher_row(self, skill: str) -> Optional[int]:
+        """Row of the highest-level holder (level >= 4) of the normalized skill, earliest on ties (as idxmax)."""
+        holders = self.seeking_index.holder_rows(self.seeking_index.skill_id(skill))
+        levels = self.users_df['skill_level'].to_numpy()
+        skilled = holders[levels[holders] >= 4]
+        if not len(skilled):
+            return None
+        return int(skilled[levels[skilled] == levels[skilled].max()].min())
+    
+    def _skill_popularity(self) -> pd.DataFrame:
+        """Every skill with its mean level and rating and holder count, most popular first."""
         skill_popularity = self.users_df.groupby('skills').agg({
             'skill_level': 'mean',
             'rating': 'mean',
             'user_id': 'count'
         }).reset_index()
         
-        # Filter out skills user already has
-        available_skills = skill_popularity[~skill_popularity['skills'].isin(user_skills)]
-        
-        if available_skills.empty:
-            return []
-        
         # Sort by popularity (count) and rating
-        available_skills['popularity_score'] = (
-            available_skills['user_id'] * 0.6 + 
-            available_skills['rating'] * 0.4
+        skill_popularity['popularity_score'] = (
+            skill_popularity['user_id'] * 0.6 + 
+            skill_popularity['rating'] * 0.4
         )
+        return skill_popularity.sort_values('popularity_score', ascending=False, kind='stable')
+    
+    def _get_popular_skills_to_learn(self, user_id: int, n_recommendations: int, owned: Optional[set] = None,
+                                     popularity: Optional[pd.DataFrame] = None) -> List[Dict]:
+        """Get popular skills that user doesn't have."""
+        if owned is None:
+            owned = set([skill['skill'] for skill in self._get_user_skills(user_id)])
+        if popularity is None:
+            popularity = self._skill_popularity()
         
-        top_skills = available_skills.nlargest(n_recommendations, 'popularity_score')
+        # Filter out skills user already has
+        top_skills = popularity[~popularity['skills'].isin(owned)].head(n_recommendations)
         
         recommendations = []
         for _, skill in top_skills.iterrows():
@@ -197,9 +249,11 @@ class SimpleRecommendationEngine:
         
         return recommendations
     
-    def _get_skills_to_offer(self, user_id: int, n_recommendations: int) -> List[Dict]:
+    def _get_skills_to_offer(self, user_id: int, n_recommendations: int,
+                             user_skills: Optional[List[Dict]] = None) -> List[Dict]:
         """Get skills the user can offer to teach."""
-        user_skills = self._get_user_skills(user_id)
+        if user_skills is None:
+            user_skills = self._get_user_skills(user_id)
         
         # Filter skills with high level (>= 4) and good rating (>= 4.0)
         teachable_skills = [
@@ -225,61 +279,89 @@ class SimpleRecommendationEngine:
     
     def _get_learning_history(self, user_id: int) -> List[Dict]:
         """Get user's learning history from swaps."""
-        user_swaps = self.swaps_df[self.swaps_df['user_id_of_learner'] == user_id]
+        positions = np.flatnonzero(self.swaps_df['user_id_of_learner'].to_numpy() == user_id)
+        
+        seeking_ids = self.seeking_index.seeking_skill_ids(user_id)
+        active = self.availability.active_swaps()
         
         history = []
-        for _, swap in user_swaps.iterrows():
-            # Find the teacher's skill info
-            teacher_skills = self.users_df[
-                (self.users_df['user_id'] == swap['user_id_of_teacher']) &
-                (self.users_df['skills'].isin(self._get_seeking_skills(user_id)))
-            ]
+        for position in positions.tolist():
+            swap = self.swaps_df.iloc[position]
+            # Find the teacher's skill info: their first offered row for a skill the learner seeks
+            teacher_rows = self.seeking_index.offered_matches(int(swap['user_id_of_teacher']), seeking_ids)
             
-            if not teacher_skills.empty:
-                skill_info = teacher_skills.iloc[0]
+            if len(teacher_rows):
+                skill_info = self.users_df.iloc[teacher_rows[0]]
                 history.append({
-                    'teacher_id': swap['user_id_of_teacher'],
+                    'teacher_id': int(swap['user_id_of_teacher']),
                     'skill': skill_info['skills'],
                     'start_date': swap['starting_date_of_learning_or_teaching'],
                     'end_date': swap['ending_date_of_learning_or_teaching'],
-                    'teacher_level': skill_info['skill_level'],
-                    'teacher_rating': skill_info['rating'],
-                    'is_active': self._is_learning_session_active(swap['starting_date_of_learning_or_teaching'], 
-                                                                 swap['ending_date_of_learning_or_teaching'])
+                    'teacher_level': int(skill_info['skill_level']),
+                    'teacher_rating': float(skill_info['rating']),
+                    'is_active': bool(active[position])
                 })
         
         return history
     
-    def _is_learning_session_active(self, start_date: str, end_date: str) -> bool:
-        """Check if a learning session is currently active."""
-        try:
-            from datetime import datetime
-            current_date = datetime.now().date()
-            start = datetime.strptime(start_date, '%Y-%m-%d').date()
-            end = datetime.strptime(end_date, '%Y-%m-%d').date()
-            
-            return start <= current_date <= end
-        except:
-            return False
-    
     def get_user_status(self, user_id: int) -> str:
         """Get current user status based on active learning sessions."""
-        user_swaps = self.swaps_df[
-            (self.swaps_df['user_id_of_learner'] == user_id) |
-            (self.swaps_df['user_id_of_teacher'] == user_id)
-        ]
-        
-        active_sessions = 0
-        for _, swap in user_swaps.iterrows():
-            if self._is_learning_session_active(swap['starting_date_of_learning_or_teaching'], 
-                                              swap['ending_date_of_learning_or_teaching']):
-                active_sessions += 1
-        
-        if active_sessions > 0:
+        if self.availability.is_busy(user_id):
             return "busy"
         else:
             return "available"
     
+    def get_batch_recommendations(self, user_ids: List[int], n_recommendations: int = 5) -> Dict[int, Dict]:
+        """
+        Get recommendations for many users at once.
+        
+        Uses the same helpers as get_recommendations; popularity, swap counts and
+        the best teacher per skill are computed once for the whole batch instead
+        of per user.
+        Returns the fields of get_recommendations that do not depend on today's date.
+        """
+        if self.users_df is None or self.swaps_df is None or self.users_df.empty:
+            return {uid: self._get_empty_recommendations(uid) for uid in user_ids}
+        
+        timestamp = datetime.now().isoformat()
+        batch_users = self.users_df[self.users_df['user_id'].isin(user_ids)]
+        
+        # Shared by every user of the batch
+        popularity = self._skill_popularity()
+        best_rows = {}
+        
+        # Swap count: learner swaps whose teacher offers one of the learner's seeking skills
+        seeking_pairs = self.seeking_index.pairs(user_ids, kind='seeking')
+        batch_swaps = self.swaps_df[self.swaps_df['user_id_of_learner'].isin(user_ids)].reset_index()
+        matched = (
+            batch_swaps.merge(seeking_pairs, left_on='user_id_of_learner', right_on='user_id')
+            .merge(self.seeking_index.pairs(kind='offered'), left_on=['user_id_of_teacher', 'skill_id'],
+                   right_on=['user_id', 'skill_id'])
+        )
+        swap_counts = matched.drop_duplicates('index').groupby('user_id_of_learner').size().to_dict()
+        
+        results = {}
+        grouped = dict(tuple(batch_users.groupby('user_id')))
+        no_rows = self.users_df.iloc[:0]
+        for user_id in user_ids:
+            user_skills = self._skill_dicts(grouped.get(user_id, no_rows))
+            owned = set(skill['skill'] for skill in user_skills)
+            seeking = self._get_seeking_skills(user_id)
+            
+            results[user_id] = {
+                'user_id': user_id,
+                'user_swap_count': int(swap_counts.get(user_id, 0)),
+                'recommendation_type': 'simple',
+                'skills_to_learn': self._get_skills_to_learn(user_id, seeking, n_recommendations,
+                                                             owned, popularity, best_rows),
+                'skills_to_offer': self._get_skills_to_offer(user_id, n_recommendations, user_skills),
+                'seeking_skills': seeking,
+                'weights': dict(RECOMMENDATION_WEIGHTS),
+                'timestamp': timestamp
+            }
+        
+        return results
+    
     def _get_empty_recommendations(self, user_id: int) -> Dict:
         """Return empty recommendations when data is not available."""
         return {
@@ -291,12 +373,7 @@ class SimpleRecommendationEngine:
             'current_skills': [],
             'seeking_skills': [],
             'learning_history': [],
-            'weights': {
-                'skill_level': 0.4,
-                'rating': 0.3,
-                'popularity': 0.2,
-                'recency': 0.1
-            },
+            'weights': dict(RECOMMENDATION_WEIGHTS),
             'timestamp': datetime.now().isoformat()
         }
     
@@ -305,18 +382,10 @@ class SimpleRecommendationEngine:
         if self.users_df is None or self.swaps_df is None:
             return {}
         
-        total_users = self.users_df['user_id'].nunique()
-        total_skills = self.users_df['skills'].nunique()
-        total_swaps = len(self.swaps_df)
-        
-        avg_skill_level = self.users_df['skill_level'].mean()
-        avg_rating = self.users_df['rating'].mean()
-        
         return {
-            'total_users': total_users,
-            'total_skills': total_skills,
-            'total_swaps': total_swaps,
-            'avg_skill_level': round(avg_skill_level, 2),
-            'avg_rating': round(avg_rating, 2),
+            **self.aggregates.summary(),
+            'build_seconds': round(self.build_seconds, 4),
+            'memory_bytes': self.memory_bytes,
+            'availability': self.availability.get_stats(),
             'engine_type': 'simple'
-        } 
\ No newline at end of file
+        }
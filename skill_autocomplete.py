@@ -0,0 +1,101 @@
+"""
+Type-ahead over skill names.
+
+Names are normalized (lowercased, whitespace collapsed) and kept in one sorted
+list, so the skills sharing a prefix are a contiguous range found with two
+binary searches. Short prefixes match wide ranges, so their most popular
+completions are precomputed; longer prefixes match few names and are ranked
+on the fly with a partial sort over the range.
+"""
+
+import bisect
+import logging
+import sys
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from data_aggregates import memory_footprint
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_skill_name(skill_name: str) -> str:
+    """Case-insensitive, whitespace-collapsed form of a skill name."""
+    return ' '.join(skill_name.lower().split())
+
+
+class SkillAutocompleteIndex:
+    def __init__(self, max_results: int = 10, precomputed_prefix_length: int = 2):
+        self.max_results = max_results
+        self.precomputed_prefix_length = precomputed_prefix_length
+
+        self.keys = []
+        self.names = ()
+        self.popularity = np.empty(0)
+        self.top_completions = {}
+        self.build_seconds = None
+        self.memory_bytes = 0
+
+    def build(self, skill_names: Sequence[str], popularity: Dict[str, float]):
+        """Index the skill names, ranked by popularity (skills without a score rank last)."""
+        start = time.perf_counter()
+
+        entries = sorted((normalize_skill_name(name), name) for name in skill_names)
+        self.keys = [key for key, _ in entries]
+        self.names = tuple(name for _, name in entries)
+        self.popularity = np.asarray([popularity.get(name, 0.0) for name in self.names], dtype=np.float64)
+
+        # Most popular first, ties in name order
+        ranked = np.lexsort((np.arange(len(self.names)), -self.popularity))
+        completions = {}
+        for row in ranked:
+            key = self.keys[row]
+            for length in range(1, min(self.precomputed_prefix_length, len(key)) + 1):
+                rows = completions.setdefault(key[:length], [])
+                if len(rows) < self.max_results:
+                    rows.append(row)
+        self.top_completions = {prefix: np.asarray(rows, dtype=np.int32) for prefix, rows in completions.items()}
+
+        self.build_seconds = time.perf_counter() - start
+        self.memory_bytes = (sum(sys.getsizeof(key) for key in self.keys)
+                             + memory_footprint(popularity=self.popularity,
+                                                top_completions=self.top_completions)['total'])
+        logger.info(f"Skill autocomplete index built for {len(self.names)} skills in {self.build_seconds:.4f}s")
+
+    def complete(self, prefix: str, limit: Optional[int] = None) -> List[Dict]:
+        """Most popular skills whose normalized name starts with the prefix."""
+        limit = self.max_results if limit is None else min(limit, self.max_results)
+        prefix = normalize_skill_name(prefix)
+        if not prefix or limit <= 0:
+            return []
+
+        rows = self.top_completions.get(prefix) if len(prefix) <= self.precomputed_prefix_length else None
+        if rows is None:
+            lo = bisect.bisect_left(self.keys, prefix)
+            # U+FFFF sorts after any character a name can continue the prefix with
+            hi = bisect.bisect_left(self.keys, prefix + '\uffff', lo)
+            if lo == hi:
+                return []
+            scores = self.popularity[lo:hi]
+            if hi - lo > limit:
+                # Everything scoring at least the limit-th best, so ties keep name order
+                cutoff = np.partition(scores, hi - lo - limit)[hi - lo - limit]
+                candidates = np.flatnonzero(scores >= cutoff)
+            else:
+                candidates = np.arange(hi - lo)
+            rows = lo + candidates[np.lexsort((candidates, -scores[candidates]))]
+
+        return [
+            {'skill': self.names[row], 'popularity_score': float(self.popularity[row])}
+            for row in rows[:limit].tolist()
+        ]
+
+    def get_stats(self) -> Dict:
+        return {
+            'skills': len(self.names),
+            'precomputed_prefixes': len(self.top_completions),
+            'build_seconds': round(self.build_seconds, 4) if self.build_seconds is not None else None,
+            'memory_bytes': self.memory_bytes
+        }
@@ -0,0 +1,191 @@
+"""
+Multi-party swap cycles over the user-level want/offer graph.
+
+There is an edge a -> b when user a offers a skill user b seeks (a can teach
+b). A cycle through a user is a chain of swaps in which everyone teaches the
+next person and learns from the previous one. The graph is kept as CSR
+adjacency arrays in both directions, built from the seeking index postings.
+Per request, a bounded reverse BFS records how many hops each nearby user is
+from the requesting user. The forward DFS then only follows edges that can
+still close the cycle within the length bound, and it stops at a time budget.
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from data_aggregates import memory_footprint
+from seeking_index import SeekingIndex
+
+logger = logging.getLogger(__name__)
+
+# Checking the clock on every expansion would dominate small searches
+DEADLINE_CHECK_INTERVAL = 256
+
+
+def _csr(sources: np.ndarray, targets: np.ndarray, n_nodes: int):
+    """(offsets, targets) adjacency of the edges, targets ascending within a source."""
+    order = np.lexsort((targets, sources))
+    offsets = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n_nodes), out=offsets[1:])
+    return offsets, targets[order].astype(np.int32)
+
+
+def _neighbors(offsets: np.ndarray, targets: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """All targets of the given nodes, concatenated."""
+    starts = offsets[nodes]
+    counts = offsets[nodes + 1] - starts
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=targets.dtype)
+    shift = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return targets[shift + np.arange(total)]
+
+
+class SwapCycleEngine:
+    def __init__(self, max_length: int = 4, time_budget: float = 0.05, max_cycles: int = 20):
+        self.max_length = max_length
+        self.time_budget = time_budget
+        self.max_cycles = max_cycles
+
+        self.index = SeekingIndex()
+        self.out_offsets = np.zeros(1, dtype=np.int64)
+        self.out_targets = np.empty(0, dtype=np.int32)
+        self.in_offsets = np.zeros(1, dtype=np.int64)
+        self.in_sources = np.empty(0, dtype=np.int32)
+        self.build_seconds = None
+
+    def build(self, index: SeekingIndex):
+        """Build the teach-to graph from a seeking index."""
+        start = time.perf_counter()
+        n_users = len(index.user_ids)
+
+        sources, targets = [], []
+        for skill_id in range(len(index.skill_names)):
+            holders = index.holders[index.holders_offsets[skill_id]:index.holders_offsets[skill_id + 1]]
+            seekers = index.seekers[index.seekers_offsets[skill_id]:index.seekers_offsets[skill_id + 1]]
+            if len(holders) and len(seekers):
+                sources.append(np.repeat(holders, len(seekers)))
+                targets.append(np.tile(seekers, len(holders)))
+
+        if sources:
+            # One edge per (teacher, learner) pair, whatever the number of skills between them
+            codes = np.concatenate(sources).astype(np.int64) * n_users + np.concatenate(targets)
+            codes = np.unique(codes)
+            sources, targets = codes // n_users, codes % n_users
+            keep = sources != targets
+            sources, targets = sources[keep], targets[keep]
+        else:
+            sources = targets = np.empty(0, dtype=np.int64)
+
+        self.out_offsets, self.out_targets = _csr(sources, targets, n_users)
+        self.in_offsets, self.in_sources = _csr(targets, sources, n_users)
+        self.index = index
+
+        self.build_seconds = time.perf_counter() - start
+        logger.info(f"Swap cycle graph built with {n_users} users and {len(self.out_targets)} edges "
+                    f"in {self.build_seconds:.3f}s")
+
+    def _hops_to(self, root: int, max_hops: int) -> np.ndarray:
+        """Fewest edges from each user to root, up to max_hops (others get max_hops + 1)."""
+        hops = np.full(len(self.index.user_ids), max_hops + 1, dtype=np.int8)
+        hops[root] = 0
+        frontier = np.array([root])
+        for distance in range(1, max_hops + 1):
+            reached = _neighbors(self.in_offsets, self.in_sources, frontier)
+            reached = reached[hops[reached] > distance]
+            if not len(reached):
+                break
+            hops[reached] = distance
+            # Deduplicates the frontier; a scan of the hops array is cheaper than sorting
+            frontier = np.flatnonzero(hops == distance)
+        return hops
+
+    def find_cycles(self, user_id: int, max_length: Optional[int] = None, n_cycles: Optional[int] = None,
+                    time_budget: Optional[float] = None) -> Dict:
+        """
+        Swap cycles of 3 up to max_length users that include the user, shortest first.
+        max_length and n_cycles are capped at the engine's own limits.
+
+        Returns the cycles found (as user id lists, starting with the user),
+        and whether the search stopped at n_cycles or the time budget before
+        exhausting every cycle.
+        """
+        start = time.perf_counter()
+        max_length = self.max_length if max_length is None else min(max_length, self.max_length)
+        n_cycles = self.max_cycles if n_cycles is None else min(n_cycles, self.max_cycles)
+        deadline = start + (self.time_budget if time_budget is None else time_budget)
+
+        root = self.index.row_of_user.get(user_id)
+        cycles, truncated, expanded = [], False, 0
+        if root is not None and max_length >= 3 and n_cycles > 0:
+            hops = self._hops_to(root, max_length - 1)
+            offsets, targets = self.out_offsets, self.out_targets
+            path, on_path = [root], {root}
+
+            def extend(length: int) -> bool:
+                """Grow path into cycles of exactly length users; False once the search must stop."""
+                nonlocal expanded
+                expanded += 1
+                if expanded % DEADLINE_CHECK_INTERVAL == 0 and time.perf_counter() > deadline:
+                    return False
+                nxt = targets[offsets[path[-1]]:offsets[path[-1] + 1]]
+                # Only users that can still get back to root in the edges left
+                nxt = nxt[hops[nxt] <= length - len(path)]
+                for node in nxt.tolist():
+                    if node == root:
+                        # Shorter cycles were found by an earlier pass
+                        if len(path) == length:
+                            cycles.append(path.copy())
+                            if len(cycles) >= n_cycles:
+                                return False
+                    elif node not in on_path:
+                        path.append(node)
+                        on_path.add(node)
+                        keep_going = extend(length)
+                        path.pop()
+                        on_path.discard(node)
+                        if not keep_going:
+                            return False
+                return True
+
+            for length in range(3, max_length + 1):
+                if not extend(length):
+                    truncated = True
+                    break
+
+        user_ids = self.index.user_ids
+        return {
+            'cycles': [[int(user_ids[row]) for row in cycle] for cycle in cycles],
+            'truncated': truncated,
+            'expanded_paths': expanded,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 3)
+        }
+
+    def exchanges(self, cycle: List[int]) -> List[Dict]:
+        """Who teaches whom, and which skills, around a cycle of user ids."""
+        exchanges = []
+        for teacher, learner in zip(cycle, cycle[1:] + cycle[:1]):
+            offered = self.index.offered_skill_ids(teacher)
+            skills = offered[np.isin(offered, self.index.seeking_skill_ids(learner))]
+            exchanges.append({
+                'teacher_id': teacher,
+                'learner_id': learner,
+                'skills': [self.index.skill_names[i] for i in skills.tolist()]
+            })
+        return exchanges
+
+    def get_stats(self) -> Dict:
+        return {
+            'users': len(self.index.user_ids),
+            'edges': len(self.out_targets),
+            'max_length': self.max_length,
+            'time_budget_ms': round(self.time_budget * 1000, 3),
+            'build_seconds': round(self.build_seconds, 4) if self.build_seconds is not None else None,
+            'memory_bytes': memory_footprint(
+                out_offsets=self.out_offsets, out_targets=self.out_targets,
+                in_offsets=self.in_offsets, in_sources=self.in_sources
+            )['total']
+        }
@@ -0,0 +1,211 @@
+"""
+Global learner -> teacher assignment under teacher capacity.
+
+Every (learner, sought skill) pair is a demand; every user offering a skill at
+min_teacher_level or above can teach it to teacher_capacity learners, minus
+the sessions they are teaching today. Demands are served greedily, scarcest
+skill first, each by the best (level, rating) teacher of that skill with room
+left, popped from a per-skill priority queue. Exhausted teachers leave the
+queues lazily, so a full run is O((demands + offers) log offers), and users
+arriving later are matched against the remaining capacity without redoing
+earlier work.
+"""
+
+import copy
+import heapq
+import logging
+import time
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+from availability import AvailabilityIndex
+from seeking_index import split_seeking
+from skill_autocomplete import normalize_skill_name
+
+logger = logging.getLogger(__name__)
+
+
+class SwapMatchingEngine:
+    def __init__(self, teacher_capacity: int = 3, min_teacher_level: int = 4, as_of: Optional[date] = None):
+        self.teacher_capacity = teacher_capacity
+        self.min_teacher_level = min_teacher_level
+        self.as_of = as_of
+        self._reset()
+
+    def _reset(self):
+        self.known_users = set()
+        self.skill_names = {}
+        self.offers = {}
+        self.capacity = {}
+        self.teacher_load = Counter()
+        self.skill_queues = {}
+        self.assignments = {}
+        self.unmatched = {}
+        self.busy_teachers = {}
+        self.build_seconds = None
+        self.last_built = None
+        self.incremental_updates = 0
+
+    def load_data(self, users_df: pd.DataFrame, swaps_df: pd.DataFrame,
+                  availability: Optional[AvailabilityIndex] = None):
+        """Match every user from scratch; busy teachers come from availability when given."""
+        logger.info("Building swap matching...")
+        start = time.perf_counter()
+
+        self._reset()
+        if availability is None:
+            availability = AvailabilityIndex.from_swaps(swaps_df, clock=lambda: self.as_of or date.today())
+        self.busy_teachers = availability.active_counts('teacher')
+        self._add_rows(users_df)
+
+        self.build_seconds = time.perf_counter() - start
+        self.last_built = datetime.now().isoformat()
+        logger.info(f"Swap matching built for {len(self.known_users)} users in {self.build_seconds:.3f}s")
+
+    def clone(self) -> 'SwapMatchingEngine':
+        """A copy that add_users/apply_changes can update while this one keeps serving."""
+        clone = copy.copy(self)
+        clone.known_users = set(self.known_users)
+        clone.skill_names = dict(self.skill_names)
+        clone.offers = dict(self.offers)
+        clone.capacity = dict(self.capacity)
+        clone.teacher_load = Counter(self.teacher_load)
+        clone.skill_queues = {key: list(queue) for key, queue in self.skill_queues.items()}
+        clone.assignments = dict(self.assignments)
+        clone.unmatched = dict(self.unmatched)
+        return clone
+
+    def add_users(self, users_df: pd.DataFrame) -> int:
+        """Match users not seen before against the remaining capacity; returns how many were added."""
+        added = self._add_rows(users_df)
+        self.incremental_updates += 1
+        return added
+
+    def apply_changes(self, users_df: pd.DataFrame, swaps_df: pd.DataFrame, changed_user_ids: Iterable[int],
+                      availability: Optional[AvailabilityIndex] = None):
+        """
+        Bring the matching up to date after an incremental load.
+
+        Only brand-new users can be matched incrementally; a changed existing
+        user may free or need capacity anywhere, so that triggers a full rebuild.
+        """
+        changed = set(changed_user_ids)
+        if self.last_built is None or changed & self.known_users:
+            self.load_data(users_df, swaps_df, availability)
+        else:
+            self.add_users(users_df[users_df['user_id'].isin(changed)])
+
+    def _add_rows(self, users_df: pd.DataFrame) -> int:
+        if users_df is None or users_df.empty:
+            return 0
+        rows = users_df[~users_df['user_id'].isin(self.known_users)]
+
+        # Offers: the first row of a (user, skill) wins, as elsewhere
+        skill_keys = {skill: normalize_skill_name(str(skill)) for skill in rows['skills'].unique().tolist()}
+        new_offers = {}
+        for user_id, skill, level, rating in zip(rows['user_id'].tolist(), rows['skills'].tolist(),
+                                                 rows['skill_level'].tolist(), rows['rating'].tolist()):
+            key = skill_keys[skill]
+            offers = self.offers.setdefault(user_id, {})
+            if key in offers:
+                continue
+            offers[key] = (level, rating)
+            self.skill_names.setdefault(key, skill)
+            if level >= self.min_teacher_level:
+                new_offers.setdefault(key, []).append((-level, -rating, user_id))
+
+        new_users = rows['user_id'].unique().tolist()
+        for user_id in new_users:
+            self.capacity[user_id] = max(0, self.teacher_capacity - self.busy_teachers.get(user_id, 0))
+        for key, entries in new_offers.items():
+            queue = self.skill_queues.setdefault(key, [])
+            for entry in entries:
+                heapq.heappush(queue, entry)
+
+        # Demands: sought skills the learner does not already offer
+        demands, seen = [], set()
+        parsed = {}
+        seeking = rows[['user_id', 'skill_user_is_seeking_for']].drop_duplicates()
+        for user_id, value in zip(seeking['user_id'].tolist(), seeking['skill_user_is_seeking_for'].tolist()):
+            if value not in parsed:
+                parsed[value] = [(normalize_skill_name(name), name) for name in split_seeking(value)]
+            for key, name in parsed[value]:
+                self.skill_names.setdefault(key, name)
+                if key not in self.offers[user_id] and (user_id, key) not in seen:
+                    seen.add((user_id, key))
+                    demands.append((user_id, key))
+
+        # Scarcest skills first, so their few teachers are not used up by common skills
+        demands.sort(key=lambda demand: (len(self.skill_queues.get(demand[1], ())), demand[0]))
+        for user_id in new_users:
+            self.assignments[user_id] = []
+            self.unmatched[user_id] = []
+        for user_id, key in demands:
+            self._assign(user_id, key)
+
+        self.known_users.update(new_users)
+        return len(new_users)
+
+    def _assign(self, user_id: int, key: str):
+        """Give the learner the best teacher of the skill with capacity left, if any."""
+        queue = self.skill_queues.get(key, [])
+        own_entry = None
+        teacher = None
+        while queue:
+            neg_level, neg_rating, candidate = queue[0]
+            if self.capacity.get(candidate, 0) <= 0:
+                heapq.heappop(queue)
+            elif candidate == user_id:
+                own_entry = heapq.heappop(queue)
+            else:
+                teacher = candidate
+                break
+        if own_entry is not None:
+            heapq.heappush(queue, own_entry)
+
+        if teacher is None:
+            self.unmatched[user_id].append(self.skill_names[key])
+            return
+
+        self.capacity[teacher] -= 1
+        self.teacher_load[teacher] += 1
+        level, rating = self.offers[teacher][key]
+        self.assignments[user_id].append({
+            'skill': self.skill_names[key],
+            'teacher_id': int(teacher),
+            'teacher_level': int(level),
+            'teacher_rating': float(rating),
+            'recommendation_type': 'swap_matching'
+        })
+
+    def get_suggested_teachers(self, user_id: int) -> Dict:
+        """Precomputed teacher per sought skill, plus the sought skills no teacher had room for."""
+        return {
+            'suggestions': list(self.assignments.get(user_id, [])),
+            'unmatched_skills': list(self.unmatched.get(user_id, []))
+        }
+
+    def get_stats(self) -> Dict:
+        """Get statistics about the matching."""
+        if self.last_built is None:
+            return {}
+
+        matched = sum(len(assigned) for assigned in self.assignments.values())
+        demands = matched + sum(len(skills) for skills in self.unmatched.values())
+        return {
+            'users': len(self.known_users),
+            'demands': demands,
+            'matched': matched,
+            'coverage': round(matched / demands, 4) if demands else 0.0,
+            'teachers_used': len(self.teacher_load),
+            'max_teacher_load': max(self.teacher_load.values(), default=0),
+            'teacher_capacity': self.teacher_capacity,
+            'busy_teachers': len(self.busy_teachers),
+            'build_seconds': round(self.build_seconds, 4),
+            'incremental_updates': self.incremental_updates,
+            'last_built': self.last_built,
+            'engine_type': 'swap_matching'
+        }
@@ -1,10 +1,26 @@
 import pytest
+import asyncio
+import time
+import threading
+import httpx
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from simple_recommendation_engine import SimpleRecommendationEngine
 from faiss_engine import FAISSContentEngine
 from collab_filter import CollaborativeFilterEngine
+from mf_engine import MatrixFactorizationEngine
+from hybrid_ranker import HybridRanker
+from sharded_collab import ShardedCollaborativeEngine
+from skill_autocomplete import SkillAutocompleteIndex
+from batch_recommendations import run_batch, PrecomputedStore
+from http_cache import build_etag, conditional_response
+from admission import AdmissionController, AdmissionRejected, TokenBucketLimiter
+from profiling import ProfilingMiddleware, RequestProfiler, StackSampler
+from load_generator import LoadRecorder, TrafficGenerator, ZipfSampler, parse_mix, run_load
+from pagination import decode_cursor, encode_cursor, ndjson_lines, take_page, validate_page_request, wants_ndjson
+from starlette.requests import Request
 
 # Sample test data for advanced features
 @pytest.fixture
@@ -122,6 +138,67 @@ def test_similar_skills(advanced_sample_data):
             assert 'recommendation_type' in rec
             assert rec['recommendation_type'] == 'similar_skills'
 
+def test_similar_skills_table(advanced_sample_data):
+    """Test that the precomputed (background-built) table answers like the full-row scan."""
+    users_df, swaps_df = advanced_sample_data
+    reference = FAISSContentEngine(similar_skills_k=0)
+    reference.load_data(users_df, swaps_df)
+    engine = FAISSContentEngine(similar_skills_k=3, background_similarity_build=True)
+    engine.load_data(users_df, swaps_df)
+    
+    assert engine.wait_for_similar_skills(timeout=10)
+    assert engine.similar_skills['indices'].shape == (len(engine.skill_descriptions), 3)
+    assert engine.get_stats()['similar_skills_table']['status'] == 'ready'
+    
+    for skill in reference.skill_descriptions['skills']:
+        for difficulty in (None, 'Intermediate', 'Expert'):
+            expected = reference.find_similar_skills(skill, 5, difficulty)
+            actual = engine.find_similar_skills(skill, 5, difficulty)
+            assert [r['skill'] for r in actual] == [r['skill'] for r in expected]
+
+def test_skill_name_index(advanced_sample_data):
+    """Test exact, normalized and prefix skill lookups."""
+    users_df, swaps_df = advanced_sample_data
+    engine = FAISSContentEngine()
+    engine.load_data(users_df, swaps_df)
+
+    row = engine.find_skill_row('Machine Learning')
+    assert engine.skill_names[row] == 'Machine Learning'
+    assert engine.find_skill_row('  machine   LEARNING ') == row
+    assert engine.find_skill_row('Quantum Computing') is None
+
+    assert [engine.skill_names[r] for r in engine.find_skill_rows_by_prefix('d')] == ['Data Analysis', 'Deep Learning', 'DevOps']
+    assert len(engine.find_skill_rows_by_prefix('D', limit=2)) == 2
+    assert engine.find_skill_rows_by_prefix('  ') == []
+
+    # Normalized names resolve to the same similar skills as the exact name
+    assert engine.find_similar_skills('machine learning', 3) == engine.find_similar_skills('Machine Learning', 3)
+
+def test_skill_autocomplete(advanced_sample_data):
+    """Test prefix completion ranked by collaborative popularity."""
+    users_df, swaps_df = advanced_sample_data
+    content = FAISSContentEngine(similar_skills_k=0)
+    content.load_data(users_df, swaps_df)
+    collab = CollaborativeFilterEngine()
+    collab.load_data(users_df, swaps_df)
+
+    index = SkillAutocompleteIndex(max_results=5, precomputed_prefix_length=1)
+    index.build(content.skill_names, collab.skill_popularity_scores)
+
+    # Precomputed (one character) and range-scanned prefixes rank the same way
+    for prefix in ('d', 'De', 'dev'):
+        suggestions = index.complete(prefix)
+        expected = sorted((s for s in content.skill_names if s.lower().startswith(prefix.lower())),
+                          key=lambda s: -collab.get_skill_popularity(s)['popularity_score'])
+        assert [s['skill'] for s in suggestions] == expected
+        assert suggestions[0]['popularity_score'] == pytest.approx(
+            collab.get_skill_popularity(expected[0])['popularity_score'])
+
+    assert len(index.complete('d', limit=2)) == 2
+    assert index.complete('xyz') == []
+    assert index.complete('') == []
+    assert index.get_stats()['skills'] == len(content.skill_names)
+
 def test_skills_by_difficulty(advanced_sample_data):
     """Test filtering skills by difficulty."""
     users_df, swaps_df = advanced_sample_data
@@ -175,6 +252,58 @@ def test_keyword_search(advanced_sample_data):
             assert 'recommendation_type' in rec
             assert rec['recommendation_type'] == 'keyword_search'
 
+@pytest.mark.parametrize('precision', ['float32', 'int8'])
+def test_reduced_precision_rankings(advanced_sample_data, precision):
+    """Test that reduced-precision storage keeps the float64 rankings on the sample data."""
+    users_df, swaps_df = advanced_sample_data
+    reference = FAISSContentEngine()
+    reference.load_data(users_df, swaps_df)
+    engine = FAISSContentEngine(precision=precision)
+    engine.load_data(users_df, swaps_df)
+    
+    expected = reference.find_skills_by_keywords(['python', 'programming'], 3)
+    actual = engine.find_skills_by_keywords(['python', 'programming'], 3)
+    assert [r['skill'] for r in actual] == [r['skill'] for r in expected]
+    for got, want in zip(actual, expected):
+        assert got['keyword_match_score'] == pytest.approx(want['keyword_match_score'], abs=0.02)
+    
+    similar = engine.find_similar_skills('Python', 3)
+    assert [r['skill'] for r in similar] == [r['skill'] for r in reference.find_similar_skills('Python', 3)]
+    assert engine.get_stats()['precision'] == precision
+    
+    collab = CollaborativeFilterEngine(precision=precision)
+    collab.load_data(users_df, swaps_df)
+    assert collab.skill_neighbor_scores.dtype == (np.int8 if precision == 'int8' else np.float32)
+
+def test_invalid_precision():
+    """Test that an unknown precision mode is rejected."""
+    with pytest.raises(ValueError):
+        FAISSContentEngine(precision='float16')
+
+def test_query_cache(advanced_sample_data):
+    """Test that repeated searches are served from the memo and reloads invalidate it."""
+    users_df, swaps_df = advanced_sample_data
+    engine = FAISSContentEngine()
+    engine.load_data(users_df, swaps_df)
+    
+    first = engine.find_skills_by_keywords(['Python', ' programming '], 3)
+    first[0]['skill'] = 'mutated'
+    second = engine.find_skills_by_keywords(['python', 'programming'], 3)
+    assert second[0]['skill'] != 'mutated'
+    assert engine.result_cache.hits == 1
+    
+    # Same keywords with another limit reuse the query vector
+    engine.find_skills_by_keywords(['python', 'programming'], 5)
+    assert engine.query_vector_cache.hits == 1
+    
+    engine.find_similar_skills('Python Programming', 3)
+    engine.find_similar_skills('Python Programming', 3)
+    assert engine.get_stats()['result_cache']['hits'] == 2
+    
+    engine.load_data(users_df, swaps_df)
+    assert len(engine.result_cache) == 0
+    assert len(engine.query_vector_cache) == 0
+
 def test_collab_engine_initialization():
     """Test that the collaborative engine initializes correctly."""
     engine = CollaborativeFilterEngine()
@@ -214,6 +343,76 @@ def test_collaborative_recommendations(advanced_sample_data):
             assert 'recommendation_type' in rec
             assert rec['recommendation_type'] == 'collaborative'
 
+def test_item_based_recommendations(advanced_sample_data):
+    """Test item-item (skill-skill) collaborative recommendations."""
+    users_df, swaps_df = advanced_sample_data
+    engine = CollaborativeFilterEngine()
+    engine.load_data(users_df, swaps_df)
+    
+    assert engine.skill_neighbors is not None
+    assert engine.skill_neighbors.shape == engine.skill_neighbor_scores.shape
+    
+    recommendations = engine.get_recommendations(1, 3, mode='item')
+    
+    assert isinstance(recommendations, list)
+    assert len(recommendations) <= 3
+    
+    user_skills = {'Python Programming', 'Data Analysis'}
+    for rec in recommendations:
+        assert rec['skill'] not in user_skills
+        assert rec['similar_to'] in user_skills
+        assert rec['similarity_score'] > 0
+        assert rec['recommendation_type'] == 'collaborative_item'
+
+def test_invalid_recommendation_mode(advanced_sample_data):
+    """Test that an unknown collaborative mode is rejected."""
+    users_df, swaps_df = advanced_sample_data
+    engine = CollaborativeFilterEngine()
+    engine.load_data(users_df, swaps_df)
+    
+    with pytest.raises(ValueError):
+        engine.get_recommendations(1, 3, mode='bogus')
+
+def test_sharded_collaborative_matches_single_process(advanced_sample_data):
+    """Test that merged per-shard neighbors give the same recommendations as the unsharded engine."""
+    users_df, swaps_df = advanced_sample_data
+    engine = CollaborativeFilterEngine()
+    engine.load_data(users_df, swaps_df)
+    
+    sharded = ShardedCollaborativeEngine(n_shards=2)
+    try:
+        sharded.load_data(users_df, swaps_df)
+        stats = sharded.get_stats()
+        assert stats['total_users'] == users_df['user_id'].nunique()
+        assert len(stats['shards']) == 2
+        
+        for user_id in users_df['user_id'].unique():
+            expected = engine.get_recommendations(int(user_id), 5)
+            actual = sharded.get_recommendations(int(user_id), 5)
+            assert {r['skill'] for r in actual} == {r['skill'] for r in expected}
+            assert all(r['recommendation_type'] == 'collaborative' for r in actual)
+        
+        assert sharded.get_recommendations(999, 5) == []
+        
+        # Concurrent queries share the pipes without mixing up replies
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            user_ids = [int(user_id) for user_id in users_df['user_id'].unique()] * 4
+            results = list(pool.map(lambda user_id: sharded.get_recommendations(user_id, 5), user_ids))
+        for user_id, actual in zip(user_ids, results):
+            assert {r['skill'] for r in actual} == {r['skill'] for r in engine.get_recommendations(user_id, 5)}
+        
+        # A dead worker is marked failed instead of wedging later queries, and load_data restarts it
+        sharded._processes[1].terminate()
+        sharded._processes[1].join()
+        owned_by_0 = next(int(user_id) for user_id in users_df['user_id'].unique() if user_id % 2 == 0)
+        assert sharded.get_recommendations(owned_by_0, 5) is not None
+        assert sharded.get_stats()['failed_shards'] == [1]
+        sharded.load_data(users_df, swaps_df)
+        assert sharded.failed_shards == set()
+        assert sharded.get_stats()['total_users'] == users_df['user_id'].nunique()
+    finally:
+        sharded.shutdown()
+
 def test_similar_users(advanced_sample_data):
     """Test finding similar users."""
     users_df, swaps_df = advanced_sample_data
@@ -271,6 +470,282 @@ def test_recommendation_explanation(advanced_sample_data):
     assert isinstance(explanation, str)
     assert len(explanation) > 0
 
+def test_mf_recommendations(advanced_sample_data):
+    """Test matrix factorization recommendations."""
+    users_df, swaps_df = advanced_sample_data
+    engine = MatrixFactorizationEngine(n_factors=4)
+    engine.load_data(users_df, swaps_df)
+    
+    assert engine.model['user_factors'].shape == (5, 4)
+    assert engine.model['skill_factors'].shape == (10, 4)
+    
+    recommendations = engine.get_recommendations(1, 3)
+    
+    assert isinstance(recommendations, list)
+    assert len(recommendations) == 3
+    for rec in recommendations:
+        assert rec['skill'] not in ('Python Programming', 'Data Analysis')
+        assert rec['recommendation_type'] == 'matrix_factorization'
+    
+    assert engine.get_recommendations(999, 3) == []
+
+def test_mf_warm_start_retrain(advanced_sample_data):
+    """Test that retraining warm-starts from the previous factors."""
+    users_df, swaps_df = advanced_sample_data
+    engine = MatrixFactorizationEngine(n_factors=4)
+    engine.load_data(users_df, swaps_df)
+    first_rmse = engine.train_rmse
+    
+    engine.retrain_async().join()
+    
+    stats = engine.get_stats()
+    assert stats['warm_started'] is True
+    assert stats['engine_type'] == 'matrix_factorization'
+    assert engine.train_rmse <= first_rmse + 1e-6
+
+def _build_hybrid_ranker(users_df, swaps_df, **kwargs):
+    simple_engine = SimpleRecommendationEngine()
+    content_engine = FAISSContentEngine()
+    collab_engine = CollaborativeFilterEngine()
+    for engine in (simple_engine, content_engine, collab_engine):
+        engine.load_data(users_df, swaps_df)
+    ranker = HybridRanker(simple_engine, content_engine, collab_engine, **kwargs)
+    ranker.refresh(users_df, swaps_df)
+    return ranker
+
+def test_hybrid_ranker(advanced_sample_data):
+    """Test blended hybrid recommendations."""
+    users_df, swaps_df = advanced_sample_data
+    ranker = _build_hybrid_ranker(users_df, swaps_df)
+    
+    result = asyncio.run(ranker.rank(1, 3))
+    
+    assert result['recommendation_type'] == 'hybrid'
+    assert result['partial'] is False
+    assert set(result['engines']) == {'simple', 'content', 'collaborative'}
+    assert len(result['recommendations']) <= 3
+    
+    scores = [rec['score'] for rec in result['recommendations']]
+    assert scores == sorted(scores, reverse=True)
+    for rec in result['recommendations']:
+        assert rec['skill'] not in ('Python Programming', 'Data Analysis')
+        assert set(rec['features']) == set(result['weights'])
+    ranker.shutdown()
+
+def test_hybrid_ranker_partial_results(advanced_sample_data):
+    """Test that a slow engine is dropped instead of failing the request."""
+    users_df, swaps_df = advanced_sample_data
+    ranker = _build_hybrid_ranker(users_df, swaps_df, timeouts={'collaborative': 0.05})
+    ranker.collab_engine.get_recommendations = lambda *args, **kwargs: time.sleep(0.5) or []
+    
+    result = asyncio.run(ranker.rank(1, 3))
+    
+    assert result['partial'] is True
+    assert result['engines']['collaborative']['status'] == 'timeout'
+    assert result['engines']['simple']['status'] == 'ok'
+    ranker.shutdown()
+
+def test_batch_engine_methods(advanced_sample_data):
+    """Test vectorized batch methods against the per-user methods."""
+    users_df, swaps_df = advanced_sample_data
+    collab_engine = CollaborativeFilterEngine()
+    collab_engine.load_data(users_df, swaps_df)
+    content_engine = FAISSContentEngine()
+    content_engine.load_data(users_df, swaps_df)
+    
+    collab_batch = collab_engine.get_batch_recommendations([1, 2, 999], 3)
+    for user_id in (1, 2):
+        single = collab_engine.get_recommendations(user_id, 3)
+        assert {r['skill'] for r in collab_batch[user_id]} == {r['skill'] for r in single}
+    assert collab_batch[999] == []
+    
+    user_skills = {1: ['Python Programming', 'Data Analysis'], 3: ['React Development']}
+    content_batch = content_engine.get_batch_user_skill_recommendations(user_skills, 3)
+    for user_id, skills in user_skills.items():
+        single = content_engine.get_user_skill_recommendations(skills, 3)
+        assert [r['skill'] for r in content_batch[user_id]] == [r['skill'] for r in single]
+
+def test_batch_job_and_precomputed_store(advanced_sample_data, tmp_path):
+    """Test the batch job output and serving it from the precomputed store."""
+    users_df, swaps_df = advanced_sample_data
+    users_path, swaps_path = tmp_path / 'users.csv', tmp_path / 'swaps.csv'
+    users_df.to_csv(users_path, index=False)
+    swaps_df.to_csv(swaps_path, index=False)
+    output_dir = tmp_path / 'precomputed'
+    
+    manifest = run_batch(str(users_path), str(swaps_path), str(output_dir), workers=2, n_shards=3)
+    assert manifest['users'] == 5
+    assert manifest['shards'] == 3
+    
+    store = PrecomputedStore(str(output_dir), max_age_seconds=3600)
+    assert store.is_fresh()
+    row = store.get(1)
+    assert row['user_id'] == 1
+    assert row['simple']['recommendation_type'] == 'simple'
+    assert isinstance(row['collaborative'], list)
+    assert isinstance(row['content'], list)
+    assert store.get(999) is None
+    
+    stale_store = PrecomputedStore(str(output_dir), max_age_seconds=0)
+    assert stale_store.get(1) is None
+    
+    # Invalidated users, and every user once the service data moves on, miss the store
+    store.invalidate([1])
+    assert store.get(1) is None and store.get(2) is not None
+    store.data_generation = 2
+    assert not store.is_fresh() and store.get(2) is None
+    assert store.get(1, n_recommendations=manifest['n_recommendations'] + 1) is None
+    
+    # A new run is picked up on the next check, with a fresh set of invalidated users
+    first_run = store.run
+    run_batch(str(users_path), str(swaps_path), str(output_dir), workers=1, n_shards=1, data_generation=2)
+    store._next_check = 0.0
+    assert store.get(1)['user_id'] == 1
+    assert store.run is not first_run and not store.run.invalidated_users
+
+def _request_with_headers(headers):
+    return Request({'type': 'http', 'method': 'GET', 'path': '/',
+                    'headers': [(k.lower().encode(), v.encode()) for k, v in headers.items()]})
+
+def test_conditional_response():
+    """Test 304 on a matching ETag and compression above the size threshold."""
+    etag = 'W/' + build_etag('g1', 1, 123)
+    body = b'{"skills": "' + b'x' * 2000 + b'"}'
+    encoded_bodies = {}
+    
+    response = conditional_response(_request_with_headers({'Accept-Encoding': 'gzip'}), body, etag,
+                                    datetime(2024, 1, 1), min_compress_size=1024, encoded_bodies=encoded_bodies)
+    assert response.status_code == 200
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['etag'] == etag
+    assert 'gzip' in encoded_bodies and len(encoded_bodies['gzip']) < len(body)
+    
+    not_modified = conditional_response(_request_with_headers({'If-None-Match': etag}), body, etag)
+    assert not_modified.status_code == 304
+    assert not_modified.body == b''
+    
+    small = conditional_response(_request_with_headers({'Accept-Encoding': 'gzip'}), b'{}', etag)
+    assert 'content-encoding' not in small.headers
+
+def test_admission_control():
+    """Test that requests beyond the concurrency limit queue, then are shed once the queue is full."""
+    controller = AdmissionController({'tfidf': 1, 'star': 0}, max_queue=1, queue_timeout=0.05)
+    assert controller.limiter('star') is None
+    limiter = controller.limiter('tfidf')
+    
+    async def scenario():
+        admitted_at = await limiter.acquire()
+        # One request may wait; it times out while the slot stays busy
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await limiter.acquire()
+        assert timed_out.value.status_code == 503 and timed_out.value.retry_after >= 1
+        
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected):
+            await limiter.acquire()
+        limiter.release(admitted_at)
+        limiter.release(await waiter)
+    
+    asyncio.run(scenario())
+    stats = controller.get_stats()['tfidf']
+    assert (stats['admitted'], stats['queued'], stats['shed_timeout'], stats['shed_queue_full']) == (2, 2, 1, 1)
+    assert stats['running'] == 0 and stats['waiting'] == 0
+    
+    bucket = TokenBucketLimiter(rate=10, burst=2)
+    assert bucket.take('key') == 0 and bucket.take('key') == 0
+    assert 0 < bucket.take('key') <= 0.1
+    assert bucket.take('other') == 0
+    assert bucket.get_stats()['limited'] == 1
+
+def test_pagination_helpers():
+    """Test cursor round trips, page splitting and NDJSON encoding."""
+    state = {'after': 'recommendations:12', 'g': 3}
+    assert decode_cursor(encode_cursor(state)) == state
+    assert decode_cursor(None) is None
+    for bad in ('not a cursor!', encode_cursor([1, 2])):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+    
+    rows = ({'n': n} for n in range(5))
+    assert take_page(rows, 2) == ([{'n': 0}, {'n': 1}], True)
+    assert take_page(iter([{'n': 0}]), 2) == ([{'n': 0}], False)
+    assert b''.join(ndjson_lines(iter([{'n': 1}, {'n': np.int64(2)}]))) == b'{"n":1}\n{"n":2}\n'
+    
+    assert wants_ndjson(None, 'application/x-ndjson') and not wants_ndjson('json', 'application/x-ndjson')
+    with pytest.raises(ValueError):
+        validate_page_request(0, None)
+    with pytest.raises(ValueError):
+        validate_page_request(10, 'xml')
+
+def test_profilers():
+    """Test that the stack sampler sees a busy thread and cProfile only runs on claimed requests."""
+    stop = threading.Event()
+    
+    def busy_loop():
+        while not stop.is_set():
+            sum(range(1000))
+    
+    worker = threading.Thread(target=busy_loop, name="busy")
+    worker.start()
+    sampler = StackSampler(interval=0.002)
+    sampler.start()
+    time.sleep(0.1)
+    sampler.stop()
+    stop.set()
+    worker.join()
+    summary = sampler.summary()
+    assert summary['samples'] > 0 and 0 <= summary['overhead_pct'] < 100
+    assert any(line.startswith('busy;') and 'busy_loop' in line for line in sampler.collapsed().splitlines())
+    
+    async def route_app(scope, receive, send):
+        sum(range(1000))
+    
+    async def scenario():
+        profiler = RequestProfiler()
+        middleware = ProfilingMiddleware(route_app, profiler)
+        profiler.start('/recommend/star', 2)
+        with pytest.raises(RuntimeError):
+            profiler.start('/stats', 1)
+        for path in ('/stats', '/recommend/star/1', '/recommend/starred', '/recommend/star/2', '/recommend/star/3'):
+            await middleware({'type': 'http', 'path': path}, None, None)
+        assert profiler.done.is_set()
+        profiler.stop()
+        return profiler
+    
+    profiler = asyncio.run(scenario())
+    assert profiler.profiled == 2
+    assert any('route_app' in row['function'] for row in profiler.functions('tottime'))
+    assert 'function calls' in profiler.report()
+
+def test_load_generator():
+    """Test the Zipf traffic mix and the per-endpoint load report."""
+    assert parse_mix('recommend=3,stats') == {'recommend': 3.0, 'stats': 1.0}
+    with pytest.raises(ValueError):
+        parse_mix('unknown=1')
+    
+    draws = ZipfSampler(list(range(100)), exponent=1.0, rng=np.random.default_rng(0)).sample(20000)
+    counts = np.sort(np.bincount(draws, minlength=100))[::-1]
+    # The hottest user gets about 1 / H(100) of the traffic, roughly 19%
+    assert 0.15 < counts[0] / 20000 < 0.23 and counts[0] > 20 * counts[-1]
+    
+    traffic = TrafficGenerator([1, 2, 3], ['Data Analysis'], {'similar_skills': 1, 'stats': 0})
+    assert traffic.next_request() == ('similar_skills', '/similar-skills/Data%20Analysis')
+    
+    def handler(request):
+        return httpx.Response(500 if request.url.path == '/stats' else 200)
+    
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url='http://test') as client:
+            return await run_load(client, TrafficGenerator([1, 2], ['Python'], {'recommend': 1, 'stats': 1}),
+                                  duration=0.2, concurrency=2)
+    
+    report = asyncio.run(scenario())
+    assert set(report['endpoints']) == {'recommend', 'stats'}
+    assert report['endpoints']['stats']['error_rate'] == 1.0 and report['endpoints']['recommend']['error_rate'] == 0.0
+    assert report['overall']['requests'] == sum(row['requests'] for row in report['endpoints'].values())
+    assert LoadRecorder().summary(1.0)['overall'] == {}
+
 def test_content_engine_stats(advanced_sample_data):
     """Test content engine statistics."""
     users_df, swaps_df = advanced_sample_data
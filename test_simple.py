@@ -3,6 +3,13 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from simple_recommendation_engine import SimpleRecommendationEngine
+from data_aggregates import DataAggregates
+from data_ingest import parse_stream, merge_delta
+from seeking_index import SeekingIndex
+from swap_matching import SwapMatchingEngine
+from swap_cycles import SwapCycleEngine
+from availability import AvailabilityIndex
+import json
 
 # Sample test data
 @pytest.fixture
@@ -137,26 +144,25 @@ def test_get_learning_history(sample_data):
 
 def test_is_learning_session_active():
     """Test active session detection."""
-    engine = SimpleRecommendationEngine()
-    
-    # Test active session
     current_date = datetime.now().date()
-    start_date = (current_date - timedelta(days=5)).strftime('%Y-%m-%d')
-    end_date = (current_date + timedelta(days=5)).strftime('%Y-%m-%d')
+    sessions = [(-5, 5), (-20, -10), (10, 20)]
+    index = AvailabilityIndex.from_swaps(pd.DataFrame({
+        'user_id_of_learner': [1, 2, 3],
+        'user_id_of_teacher': [11, 12, 13],
+        'starting_date_of_learning_or_teaching': [(current_date + timedelta(days=start)).strftime('%Y-%m-%d')
+                                                  for start, _ in sessions],
+        'ending_date_of_learning_or_teaching': [(current_date + timedelta(days=end)).strftime('%Y-%m-%d')
+                                                for _, end in sessions]
+    }))
     
-    assert engine._is_learning_session_active(start_date, end_date) == True
+    # Test active session
+    assert index.is_busy(1) == True
     
     # Test inactive session (past)
-    past_start = (current_date - timedelta(days=20)).strftime('%Y-%m-%d')
-    past_end = (current_date - timedelta(days=10)).strftime('%Y-%m-%d')
-    
-    assert engine._is_learning_session_active(past_start, past_end) == False
+    assert index.is_busy(2) == False
     
     # Test inactive session (future)
-    future_start = (current_date + timedelta(days=10)).strftime('%Y-%m-%d')
-    future_end = (current_date + timedelta(days=20)).strftime('%Y-%m-%d')
-    
-    assert engine._is_learning_session_active(future_start, future_end) == False
+    assert index.is_busy(3) == False
 
 def test_get_user_status(sample_data):
     """Test getting user status."""
@@ -167,6 +173,55 @@ def test_get_user_status(sample_data):
     status = engine.get_user_status(1)
     assert status in ['available', 'busy']
 
+def test_availability_index(sample_data):
+    """Test busy checks from the day bitmap and interval lists, incremental swaps and date rollover."""
+    _, swaps_df = sample_data
+    today = [datetime(2024, 3, 22).date()]
+    index = AvailabilityIndex.from_swaps(swaps_df, clock=lambda: today[0])
+    
+    # User 15 taught user 2 until 03-20; user 1 learns from 8 until 04-10
+    assert index.is_busy(1) and index.is_busy(8) and not index.is_busy(15)
+    assert index.is_busy(15, datetime(2024, 3, 20).date())
+    assert not index.is_busy(1, datetime(2024, 1, 1).date())
+    assert not index.is_busy(999)
+    assert index.available_mask([1, 15, 999]).tolist() == [False, True, True]
+    assert index.active_counts('teacher') == {5: 1, 8: 2, 12: 2, 13: 2, 19: 1}
+    
+    index.add_swaps(pd.DataFrame({
+        'user_id_of_learner': [15, 30], 'user_id_of_teacher': [31, 15],
+        'starting_date_of_learning_or_teaching': ['2024-03-01', 'not a date'],
+        'ending_date_of_learning_or_teaching': ['2024-03-31', '2024-03-31']
+    }))
+    assert index.is_busy(15) and index.is_busy(31) and not index.is_busy(30)
+    assert index.available_mask([15, 30]).tolist() == [False, True]
+    
+    today[0] = datetime(2024, 5, 1).date()
+    assert not index.is_busy(1) and not index.is_busy(15)
+    assert index.get_stats()['rollovers'] == 1
+    
+    # Intervals merged in one swap at a time answer like a single build
+    merged = AvailabilityIndex.from_swaps(swaps_df.iloc[:1], clock=lambda: today[0])
+    for position in range(1, len(swaps_df)):
+        merged.add_swaps(swaps_df.iloc[position:position + 1])
+    built = AvailabilityIndex.from_swaps(swaps_df, clock=lambda: today[0])
+    days = [datetime(2024, 1, 1).date() + timedelta(days=offset) for offset in range(0, 150, 5)]
+    for user_id in built.positions:
+        assert [merged.is_busy(user_id, day) for day in days] == [built.is_busy(user_id, day) for day in days]
+    
+    loaded = SimpleRecommendationEngine()
+    loaded.load_data(*sample_data)
+    engine = loaded.clone()
+    current = datetime.now().strftime('%Y-%m-%d')
+    engine.add_swaps(pd.DataFrame({'user_id_of_learner': [3], 'user_id_of_teacher': [4],
+                                   'starting_date_of_learning_or_teaching': [current],
+                                   'ending_date_of_learning_or_teaching': [current]}))
+    assert engine.get_user_status(3) == engine.get_user_status(4) == 'busy'
+    assert engine.availability.active_swaps()[-1]
+    assert engine.get_stats()['total_swaps'] == len(swaps_df) + 1
+    # The engine it was cloned from is untouched
+    assert len(loaded.swaps_df) == len(loaded.availability.active_swaps()) == len(swaps_df)
+    assert loaded.get_stats()['total_swaps'] == len(swaps_df)
+
 def test_get_recommendations(sample_data):
     """Test getting recommendations."""
     users_df, swaps_df = sample_data
@@ -221,6 +276,161 @@ def test_get_stats(sample_data):
     assert stats['total_swaps'] == 10
     assert stats['engine_type'] == 'simple'
 
+def test_data_aggregates(sample_data):
+    """Test that the running aggregates match a full recomputation, and swap counts follow add_swaps."""
+    users_df, swaps_df = sample_data
+    
+    aggregates = DataAggregates.from_frames(users_df, swaps_df)
+    summary = aggregates.summary()
+    assert summary['total_users'] == users_df['user_id'].nunique()
+    assert summary['total_skills'] == users_df['skills'].nunique()
+    assert summary['avg_skill_level'] == round(users_df['skill_level'].mean(), 2)
+    assert summary['avg_rating'] == round(users_df['rating'].mean(), 2)
+    
+    aggregates.add_swaps(3)
+    assert aggregates.summary()['total_swaps'] == len(swaps_df) + 3
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1 << 20])
+def test_streaming_ingest(sample_data, chunk_size):
+    """Test that the Node data payload parses the same in any chunking, as JSON or NDJSON."""
+    users_df, swaps_df = sample_data
+    users = json.loads(users_df.to_json(orient='records'))
+    swaps = json.loads(swaps_df.to_json(orient='records'))
+    body = json.dumps({'success': True, 'data': {'users': users, 'swaps': swaps},
+                       'metadata': {'total_users': 5, 'counts': [1, 2.5, None]}}).encode()
+    ndjson = b''.join(json.dumps(row).encode() + b'\n' for row in users + swaps)
+    
+    for payload, format in ((body, 'json'), (ndjson, 'ndjson')):
+        chunks = (payload[i:i + chunk_size] for i in range(0, len(payload), chunk_size))
+        parsed_users, parsed_swaps = parse_stream(chunks, format, batch_size=3)
+        assert parsed_users['skills'].tolist() == users_df['skills'].tolist()
+        assert parsed_users['skill_level'].tolist() == users_df['skill_level'].tolist()
+        assert parsed_swaps.astype(str).values.tolist() == swaps_df.astype(str).values.tolist()
+    
+    with pytest.raises(ValueError):
+        parse_stream(iter([body[:-1]]))
+
+def test_ingest_delta(sample_data):
+    """Test that a delta replaces changed users' rows and appends new swaps once."""
+    users_df, swaps_df = sample_data
+    delta = json.dumps({'data': {
+        'users': [{'user_id': 1, 'skills': 'Rust', 'skill_level': 'Beginner', 'description': None,
+                   'rating': '4.2', 'feedback': None, 'status': 'available', 'skill_user_is_seeking_for': None}],
+        'swaps': [{'user_id_of_learner': 1, 'user_id_of_teacher': 3,
+                   'starting_date_of_learning_or_teaching': '2024-05-01T09:30:00.000Z',
+                   'ending_date_of_learning_or_teaching': None}]
+    }}).encode()
+    users_delta, swaps_delta = parse_stream(iter([delta]))
+    assert users_delta.iloc[0]['skill_level'] == 1
+    assert swaps_delta.iloc[0]['starting_date_of_learning_or_teaching'] == '2024-05-01'
+    
+    users, swaps = merge_delta(users_df, swaps_df, users_delta, swaps_delta)
+    assert users[users['user_id'] == 1]['skills'].tolist() == ['Rust']
+    assert len(users) == len(users_df) - 1
+    assert len(swaps) == len(swaps_df) + 1
+    assert len(merge_delta(users, swaps, users_delta, swaps_delta)[1]) == len(swaps)
+
+def test_multi_valued_seeking_skills(sample_data):
+    """Test that comma-separated seeking lists are split for lookups, history and mutual matches."""
+    users_df, swaps_df = sample_data
+    users_df = users_df.copy()
+    users_df.loc[users_df['user_id'] == 1, 'skill_user_is_seeking_for'] = 'Machine Learning, ux design,  Machine Learning'
+    users_df.loc[users_df['user_id'] == 4, 'skill_user_is_seeking_for'] = 'Data Analysis, Kubernetes'
+    
+    engine = SimpleRecommendationEngine()
+    engine.load_data(users_df, swaps_df)
+    
+    assert engine._get_seeking_skills(1) == ['Machine Learning', 'UX Design']
+    learned = [rec['skill'] for rec in engine.get_recommendations(1)['skills_to_learn']]
+    assert learned == ['Machine Learning', 'UX Design']
+    assert [h['skill'] for h in engine._get_learning_history(1)] == ['Machine Learning']
+    
+    index = engine.seeking_index
+    # User 1 offers Data Analysis (sought by 4) and seeks UX Design (offered by 4)
+    assert index.mutual_matches(1).tolist() == [4]
+    assert index.mutual_matches(4).tolist() == [1]
+    assert index.mutual_matches(999).tolist() == []
+    assert SeekingIndex.from_users(users_df.iloc[:0]).get_stats()['seeking_entries'] == 0
+
+def test_swap_matching_capacity(sample_data):
+    """Test that suggested teachers respect capacity, busy teachers and incremental arrivals."""
+    users_df, swaps_df = sample_data
+    users_df = users_df.copy()
+    users_df.loc[users_df['user_id'].isin([3, 4]), 'skill_user_is_seeking_for'] = 'Machine Learning'
+    
+    # User 2 is teaching user 1 on this date, leaving one of two slots
+    matcher = SwapMatchingEngine(teacher_capacity=2, as_of=datetime(2024, 1, 25).date())
+    matcher.load_data(users_df, swaps_df)
+    
+    assert matcher.busy_teachers[2] == 1
+    assert [s['teacher_id'] for s in matcher.get_suggested_teachers(1)['suggestions']] == [2]
+    for user_id in (3, 4):
+        assert matcher.get_suggested_teachers(user_id) == {'suggestions': [], 'unmatched_skills': ['Machine Learning']}
+    assert matcher.get_stats()['max_teacher_load'] == 1
+    
+    new_user = users_df[users_df['user_id'] == 5].assign(user_id=6, skill_user_is_seeking_for='UX Design, Python Programming, DevOps')
+    merged = pd.concat([users_df, new_user], ignore_index=True)
+    matcher.apply_changes(merged, swaps_df, [6])
+    assert matcher.get_stats()['incremental_updates'] == 1
+    # DevOps is already one of user 6's own skills
+    suggested = matcher.get_suggested_teachers(6)
+    assert [(s['skill'], s['teacher_id']) for s in suggested['suggestions']] == [('UX Design', 4), ('Python Programming', 1)]
+    
+    # A changed existing user rebuilds from scratch
+    matcher.apply_changes(merged, swaps_df, [3])
+    assert matcher.get_stats()['incremental_updates'] == 0
+    assert matcher.get_stats()['users'] == 6
+
+def test_swap_cycles(sample_data):
+    """Test that swap cycles through a user are found, shortest first, with their exchanges."""
+    users_df, swaps_df = sample_data
+    users_df = users_df.copy()
+    seeking = {1: 'Machine Learning, Cloud Computing', 2: 'React Development', 3: 'Data Analysis',
+               4: 'Python Programming', 5: 'User Research'}
+    users_df['skill_user_is_seeking_for'] = users_df['user_id'].map(seeking)
+    
+    engine = SwapCycleEngine(max_length=4)
+    engine.build(SeekingIndex.from_users(users_df))
+    
+    # 1 -> 3 -> 2 -> 1 and 1 -> 4 -> 5 -> 1, no direct mutual match
+    result = engine.find_cycles(1)
+    assert result['cycles'] == [[1, 3, 2], [1, 4, 5]]
+    assert result['truncated'] is False
+    assert engine.exchanges([1, 3, 2]) == [
+        {'teacher_id': 1, 'learner_id': 3, 'skills': ['Data Analysis']},
+        {'teacher_id': 3, 'learner_id': 2, 'skills': ['React Development']},
+        {'teacher_id': 2, 'learner_id': 1, 'skills': ['Machine Learning']}
+    ]
+    assert engine.find_cycles(3)['cycles'] == [[3, 2, 1]]
+    limited = engine.find_cycles(1, n_cycles=1)
+    assert limited['cycles'] == [[1, 3, 2]] and limited['truncated'] is True
+    assert engine.find_cycles(999)['cycles'] == []
+    
+    # n_cycles is capped at the engine's max_cycles
+    capped = SwapCycleEngine(max_length=4, max_cycles=1)
+    capped.build(SeekingIndex.from_users(users_df))
+    assert capped.find_cycles(1, n_cycles=1000)['cycles'] == [[1, 3, 2]]
+
+def test_get_batch_recommendations(sample_data):
+    """Test that batch recommendations equal the per-user path, unknown users included."""
+    users_df, swaps_df = sample_data
+    # A case and whitespace variant of an offered skill still finds its teacher
+    users_df = users_df.copy()
+    users_df.loc[users_df['user_id'] == 2, 'skill_user_is_seeking_for'] = 'python programming '
+    engine = SimpleRecommendationEngine()
+    engine.load_data(users_df, swaps_df)
+    
+    user_ids = sorted(users_df['user_id'].unique().tolist()) + [999]
+    batch = engine.get_batch_recommendations(user_ids, n_recommendations=5)
+    
+    assert set(batch) == set(user_ids)
+    for user_id in user_ids:
+        single = engine.get_recommendations(user_id, n_recommendations=5)
+        assert {key: value for key, value in batch[user_id].items() if key != 'timestamp'} == \
+            {key: single[key] for key in batch[user_id] if key != 'timestamp'}
+    assert batch[2]['skills_to_learn'][0]['recommended_by'] == 1
+    assert batch[999]['skills_to_learn'] == engine.get_recommendations(999)['skills_to_learn']
+
 def test_empty_data():
     """Test engine behavior with empty data."""
     engine = SimpleRecommendationEngine()
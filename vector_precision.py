@@ -0,0 +1,118 @@
+"""
+Reduced-precision storage for similarity vectors and neighbor scores.
+
+'float64' keeps the original behaviour. 'float32' halves memory. 'int8' stores
+each row quantized to [-127, 127] with one float32 scale per row (about a
+quarter of float64 for dense data; sparse matrices keep their int32 indices).
+Quantized sparse matrices are stored term-major (CSC), and similarities are
+accumulated from the posting lists of the query's terms, then rescaled per
+row, so a full-precision copy is never materialized.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+PRECISION_MODES = ('float64', 'float32', 'int8')
+
+INT8_MAX = 127
+
+
+def validate_precision(precision: str) -> str:
+    if precision not in PRECISION_MODES:
+        raise ValueError(f"Unknown precision mode: {precision}. Use one of: {', '.join(PRECISION_MODES)}")
+    return precision
+
+
+def compute_dtype(precision: str):
+    """Float dtype used for query vectors and similarity kernels."""
+    return np.float64 if precision == 'float64' else np.float32
+
+
+def _row_scales(row_max: np.ndarray) -> np.ndarray:
+    scales = (row_max / INT8_MAX).astype(np.float32)
+    scales[scales == 0] = 1.0
+    return scales
+
+
+def quantize_sparse(matrix: sparse.spmatrix, precision: str) -> Tuple[sparse.spmatrix, Optional[np.ndarray]]:
+    """Return (stored matrix, per-row scales or None): CSR for float modes, CSC for int8."""
+    matrix = sparse.csr_matrix(matrix)
+    if precision == 'float64':
+        return matrix.astype(np.float64), None
+    if precision == 'float32':
+        return matrix.astype(np.float32), None
+
+    row_lengths = np.diff(matrix.indptr)
+    row_max = np.zeros(matrix.shape[0])
+    nonempty = row_lengths > 0
+    row_max[nonempty] = np.maximum.reduceat(np.abs(matrix.data), matrix.indptr[:-1][nonempty])
+    scales = _row_scales(row_max)
+    data = np.rint(matrix.data / np.repeat(scales, row_lengths)).astype(np.int8)
+    quantized = sparse.csr_matrix((data, matrix.indices.copy(), matrix.indptr.copy()), shape=matrix.shape)
+    return quantized.tocsc(), scales
+
+
+def quantize_dense(values: np.ndarray, precision: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Return (stored 2-D array, per-row scales or None) for the precision mode."""
+    if precision == 'float64':
+        return values.astype(np.float64), None
+    if precision == 'float32':
+        return values.astype(np.float32), None
+
+    scales = _row_scales(np.abs(values).max(axis=1) if values.size else np.zeros(len(values)))
+    return np.rint(values / scales[:, None]).astype(np.int8), scales
+
+
+def dequantize_rows(values: np.ndarray, scales: Optional[np.ndarray], rows=None) -> np.ndarray:
+    """Float view of (a subset of) rows of a dense stored array."""
+    selected = values if rows is None else values[rows]
+    if scales is None:
+        return selected
+    row_scales = scales if rows is None else scales[rows]
+    return selected.astype(np.float32) * np.asarray(row_scales)[..., None]
+
+
+def sparse_similarities(queries: sparse.spmatrix, stored: sparse.spmatrix,
+                        scales: Optional[np.ndarray], precision: str) -> np.ndarray:
+    """
+    Dot products of query rows with every stored row, as a dense (queries x rows) array.
+
+    Stored rows are L2-normalized TF-IDF vectors, so for normalized queries this
+    is the cosine similarity.
+    """
+    dtype = compute_dtype(precision)
+    queries = sparse.csr_matrix(queries, dtype=dtype)
+    if scales is None:
+        return (queries @ stored.T).toarray()
+
+    # int8: walk the posting list of every query term
+    products = np.zeros((queries.shape[0], stored.shape[0]), dtype=dtype)
+    for i in range(queries.shape[0]):
+        start, end = queries.indptr[i], queries.indptr[i + 1]
+        for term, weight in zip(queries.indices[start:end], queries.data[start:end]):
+            rows = slice(stored.indptr[term], stored.indptr[term + 1])
+            products[i, stored.indices[rows]] += weight * stored.data[rows]
+    return products * scales[None, :]
+
+
+def sparse_rows(stored: sparse.spmatrix, scales: Optional[np.ndarray], start: int,
+                stop: Optional[int] = None) -> sparse.csr_matrix:
+    """Stored rows [start, stop) (one row by default) as float CSR, dequantized if needed."""
+    stop = start + 1 if stop is None else stop
+    rows = sparse.csr_matrix(stored[start:stop])
+    if scales is None:
+        return rows
+    return sparse.csr_matrix(sparse.diags(scales[start:stop]) @ rows.astype(np.float32))
+
+
+def stored_nbytes(values, scales: Optional[np.ndarray] = None) -> int:
+    """Bytes held by a stored matrix/array and its scales."""
+    if values is None:
+        return 0
+    if sparse.issparse(values):
+        total = values.data.nbytes + values.indices.nbytes + values.indptr.nbytes
+    else:
+        total = values.nbytes
+    return int(total + (scales.nbytes if scales is not None else 0))